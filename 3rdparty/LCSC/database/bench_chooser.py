@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Time KiCad's database-library queries against parts.db
+
+KiCad's database library reads the table, key and columns from
+parts.kicad_dbl and issues two kinds of query through ODBC: a SELECT of
+every referenced column over the whole table when the library is loaded
+into the symbol chooser, and a SELECT of the same columns by key for each
+symbol placed or refreshed. This replays both against SQLite and reports
+p50/p99 latency for the table parts.kicad_dbl uses, and for the full parts
+table as a baseline if that is a different table.
+
+With --parts N the database is copied to a temporary directory and padded
+with cloned rows (through the real triggers) until it holds N parts, so
+the chooser can be checked at catalog scale without a catalog.
+
+Run from any directory:
+    python3 bench_chooser.py
+    python3 bench_chooser.py --parts 100000
+    python3 bench_chooser.py --parts 100000 --max-p99 50   # fail if slower
+
+Timings exclude the ODBC driver itself, which adds a roughly constant
+per-row cost on top of SQLite's.
+"""
+
+import argparse
+import json
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Script directory (where parts.db and parts.kicad_dbl live)
+SCRIPT_DIR = Path(__file__).parent.resolve()
+DB_PATH = SCRIPT_DIR / "parts.db"
+DBL_PATH = SCRIPT_DIR / "parts.kicad_dbl"
+
+BASE_TABLE = "parts"
+
+# Cloned rows get keys above this so they never collide with real parts
+CLONE_KEY_BASE = 900_000_000
+
+
+def read_libraries(dbl_path):
+    """Return [(table, key, columns)] for each library in a .kicad_dbl file."""
+    with open(dbl_path, 'r', encoding='utf-8') as f:
+        dbl = json.load(f)
+    libraries = []
+    for library in dbl.get("libraries", []):
+        key = library["key"]
+        columns = []
+        referenced = [key, library.get("symbols"), library.get("footprints")]
+        referenced += [field.get("column") for field in library.get("fields", [])]
+        columns.extend(col for col in referenced if col and col not in columns)
+        libraries.append((library["table"], key, columns))
+    return libraries
+
+
+def pad_database(conn, target):
+    """Clone existing parts rows until the parts table holds target rows.
+
+    Returns:
+        Number of rows added
+    """
+    columns = [r[1] for r in conn.execute(f'PRAGMA table_info("{BASE_TABLE}")')]
+    others = [col for col in columns if col != "LCSC"]
+    columns_list = ", ".join(f'"{col}"' for col in ["LCSC"] + others)
+    others_list = ", ".join(f'"{col}"' for col in others)
+
+    (count,) = conn.execute(f"SELECT count(*) FROM {BASE_TABLE}").fetchone()
+    if count == 0:
+        raise ValueError(f"{BASE_TABLE} is empty, nothing to clone")
+    added = 0
+    with conn:
+        while count < target:
+            inserted = conn.execute(
+                f"INSERT INTO {BASE_TABLE} ({columns_list}) "
+                f"SELECT 'C' || ({CLONE_KEY_BASE} + ? + row_number() OVER ()), {others_list} "
+                f"FROM {BASE_TABLE} LIMIT ?",
+                (added, target - count)
+            ).rowcount
+            count += inserted
+            added += inserted
+    return added
+
+
+def time_query(conn, sql, params_list):
+    """Run sql once per params tuple, fetching every row.
+
+    Returns:
+        List of latencies in milliseconds
+    """
+    latencies = []
+    for params in params_list:
+        start = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def percentiles(latencies):
+    """Return (p50, p99) of a list of latencies."""
+    if len(latencies) < 2:
+        return latencies[0], latencies[0]
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return cuts[49], cuts[98]
+
+
+def bench_table(conn, table, key, columns, loads, lookups):
+    """Replay the library-load and key-lookup queries against one table.
+
+    Returns:
+        {"load": (p50, p99), "lookup": (p50, p99)} in milliseconds
+    """
+    columns_list = ", ".join(f'"{col}"' for col in columns)
+    keys = [k for (k,) in conn.execute(f'SELECT "{key}" FROM "{table}"')]
+    sample = [(random.choice(keys),) for _ in range(lookups)]
+
+    load = time_query(conn, f'SELECT {columns_list} FROM "{table}"', [()] * loads)
+    lookup = time_query(conn, f'SELECT {columns_list} FROM "{table}" WHERE "{key}" = ?', sample)
+    return {"load": percentiles(load), "lookup": percentiles(lookup)}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report p50/p99 latency of KiCad's database-library queries"
+    )
+    parser.add_argument(
+        "--db",
+        type=Path,
+        default=DB_PATH,
+        help="Path to parts.db (default: next to this script)"
+    )
+    parser.add_argument(
+        "--dbl",
+        type=Path,
+        default=DBL_PATH,
+        help="Path to the .kicad_dbl file (default: parts.kicad_dbl next to this script)"
+    )
+    parser.add_argument(
+        "--parts",
+        type=int,
+        help="Pad a temporary copy of the database with cloned rows up to this many parts"
+    )
+    parser.add_argument(
+        "--loads",
+        type=int,
+        default=20,
+        help="Number of full library loads to time (default: 20)"
+    )
+    parser.add_argument(
+        "--lookups",
+        type=int,
+        default=2000,
+        help="Number of random key lookups to time (default: 2000)"
+    )
+    parser.add_argument(
+        "--max-p99",
+        type=float,
+        metavar="MS",
+        help="Exit with status 1 if any p99 on the .kicad_dbl tables exceeds MS milliseconds"
+    )
+    args = parser.parse_args()
+
+    for path in (args.db, args.dbl):
+        if not path.exists():
+            print(f"ERROR: {path} not found", file=sys.stderr)
+            return 1
+    if args.loads < 1 or args.lookups < 1:
+        parser.error("--loads and --lookups must be at least 1")
+
+    libraries = read_libraries(args.dbl)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = args.db
+        if args.parts:
+            db_path = Path(tmpdir) / args.db.name
+            shutil.copy2(args.db, db_path)
+            conn = sqlite3.connect(db_path)
+            try:
+                added = pad_database(conn, args.parts)
+            except ValueError as e:
+                print(f"ERROR: {e}", file=sys.stderr)
+                return 1
+            finally:
+                conn.close()
+            print(f"Padded a copy of {args.db.name} with {added} cloned rows", file=sys.stderr)
+
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            targets = [(table, key, columns, True) for table, key, columns in libraries]
+            if BASE_TABLE not in {table for table, _, _ in libraries}:
+                _, key, columns = libraries[0]
+                targets.append((BASE_TABLE, key, columns, False))
+
+            (count,) = conn.execute(f"SELECT count(*) FROM {BASE_TABLE}").fetchone()
+            print(f"{count} parts, {args.loads} loads, {args.lookups} lookups per table")
+            print(f"{'table':<20} {'load p50':>10} {'load p99':>10} {'lookup p50':>11} {'lookup p99':>11}")
+
+            failed = False
+            for table, key, columns, used in targets:
+                try:
+                    result = bench_table(conn, table, key, columns, args.loads, args.lookups)
+                except sqlite3.OperationalError as e:
+                    print(f"ERROR: {table}: {e} (rebuild with rebuild_db.py)", file=sys.stderr)
+                    return 1
+                (load50, load99), (lookup50, lookup99) = result["load"], result["lookup"]
+                label = table if used else f"{table} (baseline)"
+                print(f"{label:<20} {load50:>8.2f}ms {load99:>8.2f}ms {lookup50:>9.3f}ms {lookup99:>9.3f}ms")
+                if used and args.max_p99 is not None and max(load99, lookup99) > args.max_p99:
+                    failed = True
+        finally:
+            conn.close()
+
+    if failed:
+        print(f"ERROR: p99 above {args.max_p99} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Merge an LCSC/JLCPCB catalog export into parts.csv
+
+Both files are sorted by LCSC number with a memory-bounded external sort
+(sorted runs of --chunk-size rows spilled to temporary files, then a
+k-way heap merge), and the two sorted streams are merge-joined on the
+LCSC key. For parts present in both, FIELD_RULES decides per column
+whether our curated value is kept, the catalog value wins, or the catalog
+only fills empty cells. The result is written as a new canonical parts.csv
+sorted by LCSC number, plus a changelog CSV of every change.
+
+Run from any directory:
+    python3 import_catalog.py jlcpcb_export.csv                # update existing parts
+    python3 import_catalog.py export.csv --add-new             # also add new parts
+    python3 import_catalog.py export.csv --drop-missing        # remove parts not in export
+    python3 import_catalog.py export.csv --rule Description=theirs
+    python3 import_catalog.py export.csv --map "Part Number=LCSC" --dry-run
+
+Rows added with --add-new must still pass rebuild_db.py's validation
+(Symbol, Footprint, Type, ...); catalog rows that do not are skipped.
+Repeated LCSC numbers in the export are collapsed to their first row, but
+repeats in parts.csv itself are an error, reported with their line
+numbers, since all but one of the rows would be lost.
+"""
+
+import argparse
+import csv
+import heapq
+import os
+import re
+import sys
+import tempfile
+from itertools import islice
+from pathlib import Path
+
+from rebuild_db import KEY_COLUMN, validate_row
+
+# Script directory (where parts.csv lives)
+SCRIPT_DIR = Path(__file__).parent.resolve()
+CSV_PATH = SCRIPT_DIR / "parts.csv"
+CHANGELOG_PATH = SCRIPT_DIR / "parts.changelog.csv"
+
+# Rows held in memory per sorted run
+CHUNK_SIZE = 100_000
+
+# Carries each parts.csv row's line number through the sort (not written out)
+LINE_KEY = "_line"
+
+# Catalog export column -> parts.csv column. Columns that already carry a
+# parts.csv name map to themselves.
+COLUMN_MAP = {
+    "LCSC Part": "LCSC",
+    "LCSC Part #": "LCSC",
+    "JLCPCB Part #": "LCSC",
+    "MFR.Part": "MPN",
+    "MFR.Part #": "MPN",
+    "Manufacturer Part": "MPN",
+    "Manufacture": "Manufacturer",
+}
+
+# How a catalog value is merged into an existing part:
+#   keep   - our value always wins (curated columns)
+#   theirs - a non-empty catalog value replaces ours
+#   fill   - the catalog value is used only if ours is empty
+# Columns not listed default to keep.
+FIELD_RULES = {
+    "MPN": "theirs",
+    "Manufacturer": "theirs",
+    "Description": "fill",
+    "Keywords": "fill",
+    "Datasheet": "fill",
+}
+
+RULES = ("keep", "theirs", "fill")
+
+LCSC_NUMBER_RE = re.compile(r'C(\d+)')
+
+
+def key_order(key):
+    """Sort key for LCSC numbers: C2 < C10 < C100, non-standard keys last."""
+    match = LCSC_NUMBER_RE.fullmatch(key)
+    if match:
+        return (0, int(match.group(1)), "")
+    return (1, 0, key)
+
+
+def read_catalog(path, fieldnames, column_map):
+    """Stream catalog rows mapped onto parts.csv column names.
+
+    Raises:
+        ValueError: if no column maps to the LCSC key
+    """
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.DictReader(f)
+        mapping = {}
+        for col in reader.fieldnames or []:
+            target = column_map.get(col.strip(), col.strip())
+            if target in fieldnames and target not in mapping.values():
+                mapping[col] = target
+        if KEY_COLUMN not in mapping.values():
+            raise ValueError(f"{path.name} has no column mapping to {KEY_COLUMN} "
+                             f"(columns: {', '.join(reader.fieldnames or [])})")
+        for row in reader:
+            mapped = {target: (row.get(col) or "").strip() for col, target in mapping.items()}
+            mapped[KEY_COLUMN] = mapped[KEY_COLUMN].upper()
+            yield mapped
+
+
+def read_parts(path):
+    """Stream parts.csv rows, each with its line number under LINE_KEY."""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            row[LINE_KEY] = str(reader.line_num)
+            yield row
+
+
+def external_sort(rows, columns, chunk_size, tmpdir):
+    """Yield rows (dicts) ordered by key_order(LCSC) using bounded memory.
+
+    Rows are sorted in chunks of chunk_size; if there is more than one
+    chunk, each is spilled to a temporary CSV run and the runs are
+    k-way merged with heapq.merge.
+    """
+    def sort_key(row):
+        return key_order(row.get(KEY_COLUMN) or "")
+
+    iterator = iter(rows)
+    runs = []
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            break
+        chunk.sort(key=sort_key)
+        if not runs and len(chunk) < chunk_size:
+            # Everything fit in one chunk, no need to touch the disk
+            yield from chunk
+            return
+        run_path = Path(tmpdir) / f"run{len(runs)}.csv"
+        with open(run_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerows([row.get(col) or "" for col in columns] for row in chunk)
+        runs.append(run_path)
+
+    def read_run(run_path):
+        with open(run_path, 'r', encoding='utf-8', newline='') as f:
+            for values in csv.reader(f):
+                yield dict(zip(columns, values))
+
+    yield from heapq.merge(*(read_run(p) for p in runs), key=sort_key)
+
+
+def merge_join(ours, theirs, repeats=None):
+    """Join two key-ordered row streams on LCSC.
+
+    Yields:
+        (key, our_row, their_row) with None for the side lacking the key.
+        Repeated keys on either side are collapsed to the first row; every
+        row of ours sharing a key, the first included, is appended to
+        repeats, if given.
+    """
+    def dedup(rows, repeats=None):
+        last = first = None
+        for row in rows:
+            key = row.get(KEY_COLUMN) or ""
+            if key != last:
+                last, first = key, row
+                yield key, row
+            elif repeats is not None:
+                if not repeats or repeats[-1].get(KEY_COLUMN) != key:
+                    repeats.append(first)
+                repeats.append(row)
+
+    ours = dedup(ours, repeats)
+    theirs = dedup(theirs)
+    a = next(ours, None)
+    b = next(theirs, None)
+    while a is not None or b is not None:
+        if b is None or (a is not None and key_order(a[0]) < key_order(b[0])):
+            yield a[0], a[1], None
+            a = next(ours, None)
+        elif a is None or key_order(b[0]) < key_order(a[0]):
+            yield b[0], None, b[1]
+            b = next(theirs, None)
+        else:
+            yield a[0], a[1], b[1]
+            a = next(ours, None)
+            b = next(theirs, None)
+
+
+def merge_fields(ours, theirs, fieldnames, rules):
+    """Apply per-column rules to one part.
+
+    Returns:
+        (merged_row, changes) where changes is a list of (column, old, new)
+    """
+    merged = dict(ours)
+    changes = []
+    for col in fieldnames:
+        if col == KEY_COLUMN or col not in theirs:
+            continue
+        old = ours.get(col) or ""
+        new = theirs[col]
+        rule = rules.get(col, "keep")
+        if not new or new == old or rule == "keep":
+            continue
+        if rule == "theirs" or (rule == "fill" and not old):
+            merged[col] = new
+            changes.append((col, old, new))
+    return merged, changes
+
+
+def merge_catalog(csv_path, catalog_path, output_path, changelog_path, rules, column_map,
+                  add_new=False, drop_missing=False, chunk_size=CHUNK_SIZE, dry_run=False):
+    """Merge catalog_path into csv_path, writing output_path and a changelog.
+
+    Returns:
+        Dict of counts: parts, updated, added, removed, skipped
+
+    Raises:
+        ValueError: if csv_path repeats an LCSC number (neither output_path nor
+            changelog_path is written)
+    """
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        fieldnames = next(csv.reader(f))
+
+    stats = {"parts": 0, "updated": 0, "added": 0, "removed": 0, "skipped": 0}
+    tmp_output = output_path.with_name(output_path.name + ".tmp")
+    tmp_changelog = changelog_path.with_name(changelog_path.name + ".tmp")
+
+    with tempfile.TemporaryDirectory(prefix="import_catalog_") as tmpdir:
+        ours_dir = Path(tmpdir) / "ours"
+        theirs_dir = Path(tmpdir) / "theirs"
+        ours_dir.mkdir()
+        theirs_dir.mkdir()
+
+        ours = external_sort(read_parts(csv_path), fieldnames + [LINE_KEY], chunk_size, ours_dir)
+        theirs = external_sort(read_catalog(catalog_path, fieldnames, column_map),
+                               fieldnames, chunk_size, theirs_dir)
+
+        repeats = []
+        out_file = None if dry_run else open(tmp_output, 'w', encoding='utf-8', newline='')
+        try:
+            with open(tmp_changelog, 'w', encoding='utf-8', newline='') as log_file:
+                log = csv.writer(log_file, lineterminator='\n')
+                log.writerow(["action", KEY_COLUMN, "column", "old", "new"])
+                out = None
+                if out_file is not None:
+                    out = csv.DictWriter(out_file, fieldnames=fieldnames, extrasaction='ignore',
+                                         lineterminator='\n')
+                    out.writeheader()
+
+                for key, our_row, their_row in merge_join(ours, theirs, repeats):
+                    if our_row is None:
+                        if not add_new:
+                            continue
+                        row = {col: their_row.get(col, "") for col in fieldnames}
+                        if validate_row(row, fieldnames):
+                            stats["skipped"] += 1
+                            continue
+                        log.writerow(["added", key, "", "", ""])
+                        stats["added"] += 1
+                    elif their_row is None:
+                        if drop_missing:
+                            log.writerow(["removed", key, "", "", ""])
+                            stats["removed"] += 1
+                            continue
+                        row = our_row
+                    else:
+                        row, changes = merge_fields(our_row, their_row, fieldnames, rules)
+                        for col, old, new in changes:
+                            log.writerow(["updated", key, col, old, new])
+                        if changes:
+                            stats["updated"] += 1
+                    stats["parts"] += 1
+                    if out is not None:
+                        out.writerow(row)
+            if repeats:
+                raise ValueError(duplicates_message(csv_path, repeats))
+        except BaseException:
+            if out_file is not None:
+                out_file.close()
+                tmp_output.unlink(missing_ok=True)
+            tmp_changelog.unlink(missing_ok=True)
+            raise
+
+    if out_file is not None:
+        out_file.close()
+        os.replace(tmp_output, output_path)
+    os.replace(tmp_changelog, changelog_path)
+
+    return stats
+
+
+def duplicates_message(csv_path, repeats):
+    """Describe rows of parts.csv that share an LCSC number, with their lines."""
+    lines = {}
+    for row in repeats:
+        lines.setdefault(row[KEY_COLUMN], []).append(row[LINE_KEY])
+    listed = "; ".join(f"{key} on lines {', '.join(found)}" for key, found in lines.items())
+    return f"{csv_path.name} repeats {KEY_COLUMN} numbers, fix these rows first: {listed}"
+
+
+def parse_pairs(pairs, what):
+    """Parse NAME=VALUE arguments into a dict."""
+    result = {}
+    for pair in pairs or []:
+        if '=' not in pair:
+            raise ValueError(f"{what} must look like NAME=VALUE: {pair!r}")
+        name, value = pair.split('=', 1)
+        result[name.strip()] = value.strip()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Merge an LCSC/JLCPCB catalog export into parts.csv"
+    )
+    parser.add_argument(
+        "catalog",
+        type=Path,
+        help="Catalog export CSV"
+    )
+    parser.add_argument(
+        "--csv",
+        type=Path,
+        default=CSV_PATH,
+        help="parts.csv to merge into (default: next to this script)"
+    )
+    parser.add_argument(
+        "--output", "-o",
+        type=Path,
+        help="Where to write the merged CSV (default: overwrite --csv)"
+    )
+    parser.add_argument(
+        "--changelog",
+        type=Path,
+        default=CHANGELOG_PATH,
+        help=f"Changelog CSV (default: {CHANGELOG_PATH.name})"
+    )
+    parser.add_argument(
+        "--add-new",
+        action="store_true",
+        help="Add catalog parts not yet in parts.csv (if they pass validation)"
+    )
+    parser.add_argument(
+        "--drop-missing",
+        action="store_true",
+        help="Remove parts that are not in the catalog"
+    )
+    parser.add_argument(
+        "--rule",
+        action="append",
+        metavar="COLUMN=RULE",
+        help=f"Override a column's merge rule ({'/'.join(RULES)}); repeatable"
+    )
+    parser.add_argument(
+        "--map",
+        action="append",
+        metavar="SOURCE=COLUMN",
+        help="Map a catalog column onto a parts.csv column; repeatable"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=CHUNK_SIZE,
+        help=f"Rows per in-memory sorted run (default: {CHUNK_SIZE})"
+    )
+    parser.add_argument(
+        "--dry-run", "-n",
+        action="store_true",
+        help="Only write the changelog, leave parts.csv untouched"
+    )
+    args = parser.parse_args()
+
+    try:
+        rules = {**FIELD_RULES, **parse_pairs(args.rule, "--rule")}
+        column_map = {**COLUMN_MAP, **parse_pairs(args.map, "--map")}
+    except ValueError as e:
+        parser.error(str(e))
+    bad = {col: rule for col, rule in rules.items() if rule not in RULES}
+    if bad:
+        parser.error(f"unknown rule(s): {bad} (use {', '.join(RULES)})")
+
+    for path in (args.csv, args.catalog):
+        if not path.exists():
+            print(f"ERROR: {path} not found", file=sys.stderr)
+            return 1
+
+    print("=" * 50)
+    print(f"Merge {args.catalog.name} into {args.csv.name}")
+    print("=" * 50)
+
+    output = args.output or args.csv
+    try:
+        stats = merge_catalog(args.csv, args.catalog, output, args.changelog, rules, column_map,
+                              add_new=args.add_new, drop_missing=args.drop_missing,
+                              chunk_size=args.chunk_size, dry_run=args.dry_run)
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+
+    print(f"Updated: {stats['updated']}")
+    print(f"Added: {stats['added']}")
+    print(f"Removed: {stats['removed']}")
+    if stats["skipped"]:
+        print(f"Skipped {stats['skipped']} new catalog parts that fail validation")
+    if args.dry_run:
+        print(f"Dry run: {output.name} not written")
+    else:
+        print(f"Wrote {output.name} with {stats['parts']} parts")
+    print(f"Changelog: {args.changelog}")
+    print("=" * 50)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
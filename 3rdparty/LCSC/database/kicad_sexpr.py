@@ -0,0 +1,310 @@
+"""
+KiCad S-expression reader and writer shared by the library tools
+
+.kicad_sym, .kicad_mod, .net and the sym-lib-table/fp-lib-table files are
+all one format: parenthesised lists whose first element is a keyword,
+with bare atoms (smd, 7, -1.27) and "quoted strings" as the other items.
+
+parse() matches up every parenthesis in one pass and returns a Node for
+the outermost list without tokenizing anything else. A Node materializes
+its own items on first access, leaving child lists as further
+unmaterialized Nodes over the same source text, so reading the head of
+every pad in a footprint never tokenizes the pads' (at ...) and
+(layers ...) lists, and a lib table edit only tokenizes the lib entries
+it looks at. Bare atoms are interned, since the same handful of
+keywords and numbers repeat thousands of times in a library.
+
+dumps() writes a tree back out. Lists that were never modified are copied
+verbatim from the source text, so editing one entry of a file leaves the
+rest of it byte-for-byte intact.
+
+Usage:
+    from kicad_sexpr import Node, QuotedString, load, dumps
+
+    table = load("fp-lib-table")
+    for lib in table.findall("lib"):
+        print(lib.value("name"), lib.value("uri"))
+    table.append(Node("lib", [Node("name", [QuotedString("LCSC")])]))
+    print(dumps(table))
+"""
+
+import re
+import sys
+from pathlib import Path
+
+# Tokens at one level of a list: '(' starts a child, ')' ends the list,
+# otherwise a quoted string or a bare atom. Whitespace is skipped.
+TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|([^\s()"]+))')
+
+# Only the tokens that matter for finding the end of a list
+PAREN_RE = re.compile(r'"(?:[^"\\]|\\.)*"|[()]')
+
+# A quoted string's contents (no quotes), and the escapes inside one
+STRING_RE = re.compile(r'"([^"\\]*(?:\\.[^"\\]*)*)"')
+ESCAPE_RE = re.compile(r'\\(.)')
+ESCAPES = {'n': '\n', 't': '\t'}
+QUOTE_RE = re.compile(r'[\\"\n\t]')
+QUOTES = {'\\': '\\\\', '"': '\\"', '\n': '\\n', '\t': '\\t'}
+
+# Bare atoms that can be written without quotes
+BARE_RE = re.compile(r'[^\s()"\\]+')
+
+
+class QuotedString(str):
+    """A string atom that was (or should be) written in double quotes."""
+    __slots__ = ()
+
+
+def unescape(value: str) -> str:
+    """Undo KiCad's backslash escaping in the contents of a quoted string."""
+    if '\\' not in value:
+        return value
+    return ESCAPE_RE.sub(lambda m: ESCAPES.get(m.group(1), m.group(1)), value)
+
+
+def quote(value: str) -> str:
+    """Write a string as a KiCad quoted string."""
+    return '"' + QUOTE_RE.sub(lambda m: QUOTES[m.group()], value) + '"'
+
+
+def match_lists(text: str) -> dict[int, int]:
+    """Map the offset of every '(' in text to the offset just past its ')'.
+
+    Raises:
+        ValueError: if the parentheses are unbalanced
+    """
+    ends = {}
+    stack = []
+    for match in PAREN_RE.finditer(text):
+        token = match.group()
+        if token == '(':
+            stack.append(match.start())
+        elif token == ')':
+            if not stack:
+                raise ValueError(f"unbalanced ')' at offset {match.start()}")
+            ends[stack.pop()] = match.end()
+    if stack:
+        raise ValueError(f"unbalanced '(' at offset {stack[-1]}")
+    return ends
+
+
+def list_end(text: str, start: int) -> int:
+    """Return the offset just past the list opening at text[start].
+
+    Raises:
+        ValueError: if the list is never closed
+    """
+    depth = 0
+    for match in PAREN_RE.finditer(text, start):
+        token = match.group()
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+            if depth == 0:
+                return match.end()
+    raise ValueError(f"unbalanced '(' at offset {start}")
+
+
+class Node:
+    """One (head item item ...) list.
+
+    Items are atoms (str, or QuotedString if quoted in the source) and
+    child Nodes. A Node parsed from text keeps a reference to the text
+    and its span, and only tokenizes that span when its items are first
+    needed.
+    """
+    __slots__ = ("head", "_items", "_text", "_ends", "_start", "_end", "_dirty")
+
+    def __init__(self, head: str, items=()):
+        self.head = head
+        self._items = list(items)
+        self._text = self._ends = None
+        self._start = self._end = 0
+        self._dirty = True
+
+    @classmethod
+    def _lazy(cls, text: str, ends: dict[int, int], start: int) -> "Node":
+        end = ends[start]
+        node = cls.__new__(cls)
+        node._items = None
+        node._text = text
+        node._ends = ends  # shared by every Node over this text
+        node._start = start
+        node._end = end
+        node._dirty = False
+        match = TOKEN_RE.match(text, start + 1, end - 1)
+        if match is None or match.group(4) is None:
+            raise ValueError(f"list at offset {start} does not start with a keyword")
+        node.head = sys.intern(match.group(4))
+        return node
+
+    @property
+    def items(self) -> list:
+        if self._items is None:
+            self._items = self._tokenize()
+        return self._items
+
+    def _tokenize(self) -> list:
+        text, end = self._text, self._end - 1
+        pos = TOKEN_RE.match(text, self._start + 1, end).end()  # past the head
+        items = []
+        while True:
+            match = TOKEN_RE.match(text, pos, end)
+            if match is None:
+                break
+            if match.group(1):
+                child = Node._lazy(text, self._ends, match.start(1))
+                items.append(child)
+                pos = child._end
+            elif match.group(2):
+                raise ValueError(f"unbalanced ')' at offset {match.start(2)}")
+            elif match.group(3) is not None:
+                items.append(QuotedString(unescape(match.group(3))))
+                pos = match.end()
+            else:
+                items.append(sys.intern(match.group(4)))
+                pos = match.end()
+        return items
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+    def __repr__(self):
+        return f"Node({self.head!r}, {len(self.items)} items)"
+
+    @property
+    def atoms(self) -> list[str]:
+        """The atom items, in order."""
+        return [item for item in self.items if not isinstance(item, Node)]
+
+    @property
+    def children(self) -> list["Node"]:
+        """The child list items, in order."""
+        return [item for item in self.items if isinstance(item, Node)]
+
+    def find(self, head: str):
+        """The first child list with this head, or None."""
+        for item in self.items:
+            if isinstance(item, Node) and item.head == head:
+                return item
+        return None
+
+    def findall(self, head: str) -> list["Node"]:
+        """Every child list with this head."""
+        return [item for item in self.items if isinstance(item, Node) and item.head == head]
+
+    def value(self, head: str, default=None):
+        """The first atom of the first (head ...) child, e.g. lib.value("uri")."""
+        child = self.find(head)
+        if child is not None:
+            for item in child.items:
+                if not isinstance(item, Node):
+                    return item
+        return default
+
+    def set(self, head: str, *values):
+        """Set (head values...), replacing the first such child or appending one."""
+        new = Node(head, values)
+        for i, item in enumerate(self.items):
+            if isinstance(item, Node) and item.head == head:
+                self._items[i] = new
+                break
+        else:
+            self._items.append(new)
+        self._dirty = True
+        return new
+
+    def append(self, item):
+        self.items.append(item)
+        self._dirty = True
+
+    def insert(self, index: int, item):
+        self.items.insert(index, item)
+        self._dirty = True
+
+    def remove(self, item):
+        """Remove an item (a child Node is matched by identity)."""
+        for i, existing in enumerate(self.items):
+            if existing is item:
+                del self._items[i]
+                self._dirty = True
+                return
+        raise ValueError(f"{item!r} is not an item of {self!r}")
+
+    def modified(self) -> bool:
+        """True if this list or any materialized descendant was changed."""
+        if self._dirty:
+            return True
+        if self._items is None:
+            return False
+        return any(isinstance(item, Node) and item.modified() for item in self._items)
+
+    def height(self) -> int:
+        """1 for a list of atoms, 2 if its deepest child is a list of atoms, ..."""
+        return 1 + max((item.height() for item in self.items if isinstance(item, Node)), default=0)
+
+
+def parse(text: str) -> Node:
+    """Parse text holding one top-level list (a whole KiCad file).
+
+    Raises:
+        ValueError: if there is no list or its parentheses are unbalanced
+    """
+    start = text.find('(')
+    if start < 0:
+        raise ValueError("no S-expression found")
+    ends = match_lists(text)
+    if ends[start] != len(text.rstrip()):
+        raise ValueError(f"unexpected content after the list ending at offset {ends[start]}")
+    return Node._lazy(text, ends, start)
+
+
+def load(path) -> Node:
+    """Parse a KiCad S-expression file."""
+    return parse(Path(path).read_text(encoding='utf-8'))
+
+
+def format_atom(atom) -> str:
+    if isinstance(atom, QuotedString) or not BARE_RE.fullmatch(atom):
+        return quote(atom)
+    return atom
+
+
+def dumps(node: Node, indent: str = "  ", level: int = 0) -> str:
+    """Write a Node tree as KiCad S-expression text.
+
+    Unmodified lists are copied from their source text. Modified and new
+    lists of height 2 or less go on one line, as KiCad writes lib table
+    entries: (lib (name "LCSC")(type "KiCad")...). Deeper lists put each
+    child list on its own line, indented one level further.
+    """
+    if not node.modified():
+        return node._text[node._start:node._end]
+    if node.height() <= 2:
+        out = "(" + node.head
+        previous = None
+        for item in node.items:
+            if isinstance(item, Node):
+                out += ("" if isinstance(previous, Node) else " ") + dumps(item, indent, level + 1)
+            else:
+                out += " " + format_atom(item)
+            previous = item
+        return out + ")"
+    lines = ["(" + node.head]
+    child_indent = indent * (level + 1)
+    for item in node.items:
+        if isinstance(item, Node):
+            lines.append(child_indent + dumps(item, indent, level + 1))
+        elif len(lines) == 1:
+            lines[0] += " " + format_atom(item)  # atoms before the first child list
+        else:
+            lines.append(child_indent + format_atom(item))
+    lines.append(indent * level + ")")
+    return "\n".join(lines)
@@ -0,0 +1,256 @@
+"""
+Library file index shared by the checking tools
+
+validate_library.py and model_index.py both read every symbol library or
+footprint and resolve the 3D model paths footprints name. This module
+holds the parsing, the model path resolution and the on-disk cache they
+share, so the two tools agree on what a footprint references and a file
+parsed by one is not parsed again by the other.
+
+Files are scanned on a process pool when there are many to scan. Results
+are cached in .library_cache.json by path: an entry is reused while the
+file's mtime and size are unchanged, and a changed file whose content
+hash still matches is not re-parsed.
+
+Usage:
+    from library_index import list_files, load_cache, save_cache, scan_files, scan_text
+
+    cache = load_cache()
+    results, entries, stats = scan_files(list_files("footprint"), scan_text, jobs, cache)
+    save_cache(cache, entries, {"footprint"})
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from kicad_sexpr import parse
+
+# Script directory and the LCSC library root
+SCRIPT_DIR = Path(__file__).parent.resolve()
+LCSC_DIR = SCRIPT_DIR.parent
+SYMBOLS_DIR = LCSC_DIR / "symbols"
+FOOTPRINTS_DIR = LCSC_DIR / "footprints"
+MODELS_DIR = LCSC_DIR / "3dmodels"
+CACHE_PATH = SCRIPT_DIR / ".library_cache.json"
+
+# Bump when scan results change shape, to invalidate old caches
+CACHE_VERSION = 1
+
+# Path variables used in footprint (model ...) entries, as configured by
+# setup_kicad.py
+MODEL_VARS = {
+    "KICAD9_3DMODEL_DIR": MODELS_DIR,
+    "KICAD9_3RD_PARTY": LCSC_DIR.parent,
+}
+
+MODEL_EXTENSIONS = {".step", ".stp", ".wrl"}
+
+# Below this many files to scan, a process pool costs more than it saves
+PARALLEL_THRESHOLD = 16
+
+VAR_RE = re.compile(r'\$\{([^}]+)\}')
+
+
+def parse_symbol_text(text):
+    """Return the top-level symbol names in a .kicad_sym file."""
+    # Unit sub-symbols (NAME_0_1) are nested inside their symbol, not top-level
+    return sorted({symbol[0] for symbol in parse(text).findall("symbol") if symbol.atoms})
+
+
+def xyz(node, head):
+    """The (xyz x y z) numbers of a model's (offset/scale/rotate ...) child."""
+    child = node.find(head)
+    if child is None or child.find("xyz") is None:
+        return None
+    return [float(v) for v in child.find("xyz").atoms]
+
+
+def footprint_extent(footprint):
+    """[width, height] in mm covered by a footprint's pads and graphics, or None."""
+    xs, ys = [], []
+    for item in footprint.children:
+        if item.head == "pad":
+            at, size = item.find("at"), item.find("size")
+            if at is None or size is None:
+                continue
+            x, y = float(at.atoms[0]), float(at.atoms[1])
+            half = max(float(size.atoms[0]), float(size.atoms[1])) / 2
+            xs += [x - half, x + half]
+            ys += [y - half, y + half]
+        elif item.head.startswith("fp_") and item.head != "fp_text":
+            points = [item.find(h) for h in ("start", "end", "mid", "center")]
+            pts = item.find("pts")
+            if pts is not None:
+                points += pts.findall("xy")
+            for point in points:
+                if point is not None:
+                    xs.append(float(point.atoms[0]))
+                    ys.append(float(point.atoms[1]))
+    if not xs:
+        return None
+    return [round(max(xs) - min(xs), 6), round(max(ys) - min(ys), 6)]
+
+
+def parse_footprint_text(text):
+    """Return a .kicad_mod file's 3D model references and its extent."""
+    footprint = parse(text)
+    models = []
+    for model in footprint.findall("model"):
+        if not model.atoms:
+            continue
+        models.append({"path": model.atoms[0], "scale": xyz(model, "scale"),
+                       "rotate": xyz(model, "rotate")})
+    return {"models": models, "extent": footprint_extent(footprint)}
+
+
+PARSERS = {
+    "symbols": parse_symbol_text,
+    "footprint": parse_footprint_text,
+}
+
+# What an unparseable file of each kind contributes
+EMPTY_RESULTS = {
+    "symbols": [],
+    "footprint": {"models": [], "extent": None},
+}
+
+
+def list_files(kind):
+    """Return [(kind, path)] for every symbol library or footprint file."""
+    if kind == "symbols":
+        return [(kind, p) for p in sorted(SYMBOLS_DIR.glob("*.kicad_sym"))]
+    files = []
+    for pretty in sorted(FOOTPRINTS_DIR.glob("*.pretty")):
+        files.extend((kind, p) for p in sorted(pretty.glob("*.kicad_mod")))
+    return files
+
+
+def scan_text(kind, path, known_digest):
+    """Hash and, if changed, parse one symbol library or footprint (runs in worker processes).
+
+    Returns:
+        (digest, result) where result is None if the content hash equals
+        known_digest and the cached result can be reused
+    """
+    data = Path(path).read_bytes()
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    if digest == known_digest:
+        return digest, None
+    try:
+        return digest, PARSERS[kind](data.decode('utf-8', errors='replace'))
+    except (ValueError, IndexError) as e:
+        # Whatever it should define then shows up as dangling references
+        print(f"WARNING: {path}: {e}", file=sys.stderr)
+        return digest, EMPTY_RESULTS[kind]
+
+
+def load_cache(path=CACHE_PATH):
+    """Load the scan cache, or an empty one if missing/stale/corrupt."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get("version") != CACHE_VERSION:
+        return {}
+    return cache.get("files", {})
+
+
+def save_cache(cache, entries, kinds, path=CACHE_PATH):
+    """Atomically write entries over the cached entries of the given kinds.
+
+    Cached entries of other kinds, which the other tool scanned, are kept.
+    Entries for deleted files are dropped by only saving what was seen.
+    Nothing is written if the entries are already what is cached.
+    """
+    others = {key: entry for key, entry in cache.items() if entry["kind"] not in kinds}
+    if len(others) + len(entries) == len(cache) and all(cache.get(k) == e for k, e in entries.items()):
+        return
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({"version": CACHE_VERSION, "files": {**others, **entries}}, f)
+    os.replace(tmp, path)
+
+
+def scan_files(files, scan, jobs, cache, extra=(), usable=None):
+    """Scan [(kind, path)] with scan(kind, path, known_digest, *extra).
+
+    A cache entry is reused while the file's mtime and size match and, if
+    given, usable(path string, entry) is true. Otherwise the file is scanned; a None
+    result from scan means its content hash is unchanged and the cached
+    result is kept.
+
+    Returns:
+        (results, entries, stats) where results maps path string -> scan
+        result, entries are the cache entries to save and stats counts
+        cached, rehashed and scanned files
+    """
+    results = {}
+    entries = {}
+    pending = []
+    stats = {"files": 0, "cached": 0, "rehashed": 0, "scanned": 0}
+
+    for kind, path in files:
+        stats["files"] += 1
+        key = str(path)
+        st = path.stat()
+        entry = cache.get(key)
+        if entry and entry["kind"] != kind:
+            entry = None
+        if (entry and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size
+                and (usable is None or usable(key, entry))):
+            entries[key] = entry
+            results[key] = entry["result"]
+            stats["cached"] += 1
+        else:
+            pending.append((kind, key, entry.get("digest") if entry else None, st))
+
+    if pending:
+        args = ([kind for kind, _, _, _ in pending],
+                [key for _, key, _, _ in pending],
+                [digest for _, _, digest, _ in pending])
+        args += tuple([value] * len(pending) for value in extra)
+        if jobs > 1 and len(pending) >= PARALLEL_THRESHOLD:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                chunksize = max(1, len(pending) // (jobs * 4))
+                scanned = list(pool.map(scan, *args, chunksize=chunksize))
+        else:
+            scanned = list(map(scan, *args))
+
+        for (kind, key, _, st), (digest, result) in zip(pending, scanned):
+            if result is None:
+                result = cache[key]["result"]
+                stats["rehashed"] += 1
+            else:
+                stats["scanned"] += 1
+            entries[key] = {"kind": kind, "mtime_ns": st.st_mtime_ns, "size": st.st_size,
+                            "digest": digest, "result": result}
+            results[key] = result
+
+    return results, entries, stats
+
+
+def resolve_model_path(model, variables=MODEL_VARS):
+    """Expand ${VAR} references in a model path, from variables or the environment.
+
+    Returns:
+        (path, name of an undefined variable or None)
+    """
+    undefined = []
+
+    def expand(match):
+        name = match.group(1)
+        if name in variables:
+            return str(variables[name])
+        if name in os.environ:
+            return os.environ[name]
+        undefined.append(name)
+        return match.group(0)
+
+    path = Path(VAR_RE.sub(expand, model)).expanduser()
+    return path, (undefined[0] if undefined else None)
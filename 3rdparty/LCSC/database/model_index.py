@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Index the 3D models footprints reference and check them before KiCad does
+
+Every footprint names its 3D models with a path such as
+${KICAD9_3DMODEL_DIR}/R0603.step. This tool reads the (model ...) entries
+of footprints/*.pretty, resolves the path variables the way KiCad would
+with the values setup_kicad.py configures, and indexes every model file
+they point at plus everything in 3dmodels/. It then reports:
+
+    missing     references that do not resolve to a file (the 3D viewer
+                stalls on these)
+    unused      files in 3dmodels/ that no footprint references
+    misscaled   STEP models with a footprint (scale) other than 1 (scale
+                is a VRML convention; STEP files carry real units), with no
+                recognisable length unit, or (with --extents) whose size is
+                wildly different from the footprint's
+
+STEP files are streamed, not loaded: only the HEADER section (file name,
+description, schema, originating system) and then DATA up to the first
+LENGTH_UNIT entity are read, usually the first 64 KB of a 1-2 MB file. The
+product name is taken from FILE_NAME, since the PRODUCT entity is
+typically near the end. --extents additionally streams each whole file
+for the bounding box of its vertices. Footprints are parsed, model paths
+resolved and results cached by library_index.py, which validate_library.py
+shares.
+
+Run from any directory:
+    python3 model_index.py                          # JSON report on stdout
+    python3 model_index.py --extents                # also compare model sizes
+    python3 model_index.py --kicad-common ~/.config/kicad/9.0/kicad_common.json
+    python3 model_index.py --var KICAD9_3DMODEL_DIR=/mnt/models --no-cache
+
+Exit status is 1 if any reference is missing or any model is mis-scaled.
+Unused models are reported but do not fail the check.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+from library_index import (MODEL_EXTENSIONS, MODEL_VARS, MODELS_DIR, list_files, load_cache,
+                           resolve_model_path, save_cache, scan_files, scan_text)
+
+STEP_EXTENSIONS = {".step", ".stp"}
+
+# STEP files are read this many bytes at a time
+CHUNK_SIZE = 64 * 1024
+
+# A HEADER section longer than this means the file is not really STEP
+MAX_HEADER_BYTES = 1024 * 1024
+
+# Millimetres per STEP length unit (SI prefixes of METRE, and named units)
+UNIT_MM = {
+    "MICRO": 0.001,
+    "MILLI": 1.0,
+    "CENTI": 10.0,
+    "DECI": 100.0,
+    "METRE": 1000.0,
+    "INCH": 25.4,
+    "FOOT": 304.8,
+}
+
+# A model this many times larger or smaller than its footprint is mis-scaled
+MAX_SIZE_RATIO = 4.0
+
+# STEP comments, which exporters put in the HEADER (licence text, field names)
+COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+
+# One STEP token: a 'string' ('' escapes a quote), punctuation, or anything else
+STEP_TOKEN_RE = re.compile(r"\s*(?:'((?:[^']|'')*)'|([(),])|([^\s(),']+))")
+
+# The entity holding a length unit, e.g.
+#   #5 =( LENGTH_UNIT ( ) NAMED_UNIT ( * ) SI_UNIT ( .MILLI., .METRE. ) );
+#   #9 =( CONVERSION_BASED_UNIT ( 'INCH', #8 ) LENGTH_UNIT ( ) NAMED_UNIT ( #7 ) );
+LENGTH_UNIT_RE = re.compile(rb'=\s*\(([^;]*\bLENGTH_UNIT\b[^;]*);')
+SI_UNIT_RE = re.compile(rb'SI_UNIT\s*\(\s*(?:\.(\w+)\.|\$)\s*,\s*\.METRE\.')
+CONVERSION_UNIT_RE = re.compile(rb"CONVERSION_BASED_UNIT\s*\(\s*'([^']*)'")
+
+# Points, and the vertices of the model's edges. Only vertices count towards
+# its size: other points place axes and infinite lines, often far outside.
+POINT_RE = re.compile(rb"#(\d+)\s*=\s*CARTESIAN_POINT\s*\(\s*'[^']*'\s*,\s*\(\s*"
+                      rb"([-+\d.Ee]+)\s*,\s*([-+\d.Ee]+)\s*,\s*([-+\d.Ee]+)")
+VERTEX_RE = re.compile(rb"VERTEX_POINT\s*\(\s*'[^']*'\s*,\s*#(\d+)")
+
+
+def parse_step_list(text, pos=0):
+    """Parse a parenthesised STEP parameter list starting at text[pos].
+
+    Strings become str, nested lists become lists and anything else ($, *,
+    numbers, .ENUMS.) is kept as its raw text.
+
+    Returns:
+        (values, offset just past the closing parenthesis)
+    """
+    match = STEP_TOKEN_RE.match(text, pos)
+    if match is None or match.group(2) != '(':
+        raise ValueError(f"expected '(' at offset {pos}")
+    pos = match.end()
+    values = []
+    while True:
+        match = STEP_TOKEN_RE.match(text, pos)
+        if match is None:
+            raise ValueError("unterminated parameter list")
+        string, punct, bare = match.groups()
+        if punct == '(':
+            value, pos = parse_step_list(text, match.start(2))
+            values.append(value)
+            continue
+        pos = match.end()
+        if punct == ')':
+            return values, pos
+        if punct == ',':
+            continue
+        values.append(string.replace("''", "'") if string is not None else bare)
+
+
+def step_header_entity(header, name):
+    """The parameters of one HEADER entity (FILE_NAME, ...), or None."""
+    match = re.search(rf'\b{name}\s*(?=\()', header)
+    if match is None:
+        return None
+    return parse_step_list(header, match.end())[0]
+
+
+def parse_step_header(header):
+    """Pull the useful fields out of a STEP HEADER section."""
+    header = COMMENT_RE.sub(" ", header)
+    info = {"name": None, "description": None, "schema": None, "system": None, "timestamp": None}
+    file_name = step_header_entity(header, "FILE_NAME")
+    if file_name:
+        # name, time_stamp, (author), (organization), preprocessor_version,
+        # originating_system, authorization
+        info["name"] = file_name[0] or None
+        info["timestamp"] = file_name[1] if len(file_name) > 1 else None
+        if len(file_name) > 5:
+            info["system"] = file_name[5] or file_name[4] or None
+    description = step_header_entity(header, "FILE_DESCRIPTION")
+    if description and isinstance(description[0], list):
+        info["description"] = " ".join(d for d in description[0] if isinstance(d, str)) or None
+    schema = step_header_entity(header, "FILE_SCHEMA")
+    if schema and isinstance(schema[0], list) and schema[0]:
+        info["schema"] = schema[0][0]
+    return info
+
+
+def length_unit(entity):
+    """Name the unit in a LENGTH_UNIT entity (a key of UNIT_MM), or None."""
+    match = SI_UNIT_RE.search(entity)
+    if match:
+        return match.group(1).decode('ascii').upper() if match.group(1) else "METRE"
+    match = CONVERSION_UNIT_RE.search(entity)
+    if match:
+        return match.group(1).decode('latin-1').upper()
+    return None
+
+
+def read_step_info(path):
+    """Stream a STEP file's HEADER section and its first length unit.
+
+    Reading stops at the first LENGTH_UNIT entity in DATA, so only the start
+    of the file is read.
+
+    Returns:
+        dict of the header fields plus "units" and "bytes_read"
+
+    Raises:
+        ValueError: if the file has no HEADER section
+    """
+    info = None
+    units = None
+    bytes_read = 0
+    buffer = b""
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            bytes_read += len(chunk)
+            buffer += chunk
+            if info is None:
+                end = buffer.find(b"ENDSEC;")
+                if end < 0:
+                    if len(buffer) > MAX_HEADER_BYTES:
+                        break
+                    continue
+                info = parse_step_header(buffer[:end].decode('latin-1'))
+                buffer = buffer[end + len(b"ENDSEC;"):]
+            match = LENGTH_UNIT_RE.search(buffer)
+            if match:
+                units = length_unit(match.group(1))
+                break
+            # Keep only the statement still being read
+            cut = buffer.rfind(b";")
+            if cut >= 0:
+                buffer = buffer[cut + 1:]
+    if info is None:
+        raise ValueError("no STEP HEADER section")
+    info["units"] = units
+    info["bytes_read"] = bytes_read
+    return info
+
+
+def step_extent(path):
+    """Stream a whole STEP file for the size of the bounding box of its vertices.
+
+    Returns:
+        [dx, dy, dz] in the file's length unit, or None if it has no vertices
+    """
+    points = {}
+    vertices = set()
+    buffer = b""
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE * 16)
+            if not chunk:
+                break
+            buffer += chunk
+            cut = buffer.rfind(b";") + 1
+            for number, x, y, z in POINT_RE.findall(buffer, 0, cut):
+                points[number] = (x, y, z)
+            vertices.update(VERTEX_RE.findall(buffer, 0, cut))
+            buffer = buffer[cut:]
+    coords = [[float(v) for v in points[n]] for n in vertices if n in points]
+    if not coords:
+        return None
+    return [round(max(axis) - min(axis), 6) for axis in zip(*coords)]
+
+
+def scan_model(kind, path, known_digest, extents):
+    """Index one model file (runs in worker processes).
+
+    Model files are not hashed, since that would read all of every file.
+
+    Returns:
+        (None, result) where result holds the STEP header fields, units,
+        bytes read and, if extents is set, the model's size
+    """
+    result = {}
+    if Path(path).suffix.lower() in STEP_EXTENSIONS:
+        try:
+            result = read_step_info(path)
+            if extents:
+                result["extent"] = step_extent(path)
+        except (OSError, ValueError) as e:
+            result = {"error": str(e)}
+    return None, result
+
+
+def has_extent(key, entry):
+    """True if a cached model entry has what --extents needs."""
+    return "extent" in entry["result"] or Path(key).suffix.lower() not in STEP_EXTENSIONS
+
+
+def build_index(jobs, variables, use_cache=True, extents=False):
+    """Scan footprints, then every model file they reference or 3dmodels/ holds.
+
+    Returns:
+        (footprints, models, references, stats) where footprints maps
+        "LIB:name" to its scan result, models maps a resolved model path to
+        its scan result, references lists (footprint, model entry, resolved
+        path, undefined variable) and stats counts cached/scanned files
+    """
+    cache = load_cache() if use_cache else {}
+
+    scanned, entries, stats = scan_files(list_files("footprint"), scan_text, jobs, cache)
+    footprints = {f"{Path(key).parent.stem}:{Path(key).stem}": result
+                  for key, result in scanned.items()}
+
+    references = []
+    model_files = {p.resolve() for p in MODELS_DIR.rglob("*") if p.suffix.lower() in MODEL_EXTENSIONS}
+    for name, result in sorted(footprints.items()):
+        for model in result["models"]:
+            resolved, undefined = resolve_model_path(model["path"], variables)
+            if undefined is None and resolved.is_file():
+                resolved = resolved.resolve()
+                model_files.add(resolved)
+            references.append((name, model, resolved, undefined))
+
+    models, model_entries, model_stats = scan_files(
+        [("model", p) for p in sorted(model_files)], scan_model, jobs, cache,
+        extra=(extents,), usable=has_extent if extents else None)
+    entries.update(model_entries)
+    for key in stats:
+        stats[key] += model_stats[key]
+
+    if use_cache:
+        save_cache(cache, entries, {"footprint", "model"})
+
+    return footprints, models, references, stats
+
+
+def scale_problem(model, info, footprint_extent, extents=False):
+    """Return why a STEP model looks mis-scaled in a footprint, or None.
+
+    The model's size is only compared with the footprint's with extents set.
+    """
+    scale = model["scale"]
+    if scale and any(abs(s - 1) > 1e-6 for s in scale):
+        return f"footprint scale {' '.join(f'{s:g}' for s in scale)} (STEP models carry real units)"
+    if "error" in info:
+        return info["error"]
+    units = info.get("units")
+    if units not in UNIT_MM:
+        return f"unknown length unit {units}" if units else "no length unit found"
+    extent = info.get("extent") if extents else None
+    if extent and footprint_extent:
+        model_size = max(extent) * UNIT_MM[units] * (max(scale) if scale else 1)
+        footprint_size = max(footprint_extent)
+        if model_size > 0 and footprint_size > 0:
+            ratio = model_size / footprint_size
+            if ratio > MAX_SIZE_RATIO or ratio < 1 / MAX_SIZE_RATIO:
+                return (f"model is {model_size:g} mm across but the footprint is "
+                        f"{footprint_size:g} mm ({ratio:.3g}x)")
+    return None
+
+
+def check(footprints, models, references, extents=False):
+    """Build the report of indexed, missing, unused and mis-scaled models."""
+    report = {"models": [], "missing": [], "unused": [], "misscaled": []}
+    used_by = {}
+
+    for footprint, model, resolved, undefined in references:
+        entry = {"footprint": footprint, "model": model["path"], "resolved": str(resolved)}
+        info = models.get(str(resolved))
+        if info is None:
+            if undefined:
+                entry["reason"] = f"undefined variable {undefined}"
+            report["missing"].append(entry)
+            continue
+        used_by.setdefault(str(resolved), []).append(footprint)
+        if resolved.suffix.lower() in STEP_EXTENSIONS:
+            problem = scale_problem(model, info, footprints[footprint]["extent"], extents)
+            if problem:
+                entry["reason"] = problem
+                report["misscaled"].append(entry)
+
+    models_dir = MODELS_DIR.resolve()
+    for key, info in sorted(models.items()):
+        path = Path(key)
+        report["models"].append({"path": key, **info, "footprints": used_by.get(key, [])})
+        if key not in used_by and path.is_relative_to(models_dir):
+            report["unused"].append(key)
+
+    report["summary"] = {
+        "footprints": len(footprints),
+        "references": len(references),
+        "models": len(models),
+        "missing": len(report["missing"]),
+        "unused": len(report["unused"]),
+        "misscaled": len(report["misscaled"]),
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Index footprint 3D models and report missing, unused and mis-scaled ones"
+    )
+    parser.add_argument(
+        "--output", "-o",
+        type=Path,
+        help="Write the JSON report to a file instead of stdout"
+    )
+    parser.add_argument(
+        "--extents",
+        action="store_true",
+        help="Also read whole STEP files and compare each model's size with its footprint's"
+    )
+    parser.add_argument(
+        "--kicad-common",
+        type=Path,
+        metavar="PATH",
+        help="Take path variables from KiCad's kicad_common.json, as the 3D viewer would"
+    )
+    parser.add_argument(
+        "--var",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="Set a path variable (repeatable; overrides --kicad-common)"
+    )
+    parser.add_argument(
+        "--jobs", "-j",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes for scanning files (default: CPU count)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore and do not update .library_cache.json"
+    )
+    args = parser.parse_args()
+
+    variables = dict(MODEL_VARS)
+    if args.kicad_common:
+        try:
+            with open(args.kicad_common, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"ERROR: {args.kicad_common}: {e}", file=sys.stderr)
+            return 1
+        variables.update(((config.get("environment") or {}).get("vars")) or {})
+    for assignment in args.var:
+        name, sep, value = assignment.partition("=")
+        if not sep or not name:
+            parser.error(f"--var expects NAME=VALUE, got {assignment!r}")
+        variables[name] = value
+
+    start = time.perf_counter()
+    footprints, models, references, stats = build_index(
+        args.jobs, variables, use_cache=not args.no_cache, extents=args.extents)
+    report = check(footprints, models, references, args.extents)
+    elapsed = time.perf_counter() - start
+
+    print(f"Indexed {stats['files']} files ({stats['cached']} cached, "
+          f"{stats['rehashed']} unchanged content, {stats['scanned']} scanned) "
+          f"in {elapsed * 1000:.0f} ms", file=sys.stderr)
+    summary = report["summary"]
+    print(f"Checked {summary['references']} model references from {summary['footprints']} footprints: "
+          f"{summary['missing']} missing, {summary['misscaled']} mis-scaled, "
+          f"{summary['unused']} unused models", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding='utf-8')
+    else:
+        print(text)
+
+    return 1 if summary["missing"] or summary["misscaled"] else 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -3,73 +3,780 @@
 Rebuild parts.db from parts.csv
 
 Run from any directory:
-    python3 rebuild_db.py
+    python3 rebuild_db.py                  # Full rebuild (backs up old parts.db)
+    python3 rebuild_db.py --incremental    # Apply only changed rows in place
+    python3 rebuild_db.py --benchmark      # Also report load rate in rows/sec
+    python3 rebuild_db.py --strict         # Exit with an error if any row is rejected
+    python3 rebuild_db.py --read-optimized # Also emit a compacted read-only copy
+    python3 rebuild_db.py --configure-dbl  # Also point parts.kicad_dbl at parts.db
 
 Or make executable and run directly:
     chmod +x rebuild_db.py
     ./rebuild_db.py
+
+Incremental mode compares parts.csv with the existing parts table by the
+LCSC key and applies the INSERT/UPDATE/DELETE deltas in a single
+transaction, so KiCad sessions holding the database open never see it
+disappear. If parts.db is missing or its columns no longer match the CSV
+header, a full rebuild is done instead.
+
+The table layout comes from COLUMN_SPEC: LCSC is the primary key (the key
+parts.kicad_dbl declares), the columns KiCad's chooser filters on are
+indexed, and SHADOW_COLUMNS adds numeric columns parsed from the text
+values so range queries are index seeks: value_numeric/value_unit hold
+passive values ("10kΩ", "100nF", "4.7uH") in base units, parsed with the
+InteractiveHtmlBom plugin's value parser (core/units.py).
+
+If SQLite was built with FTS5, a parts_fts full-text index over
+Description, Keywords, MPN and Manufacturer is built alongside (see
+search_parts.py) and kept in sync with the parts table by triggers.
+
+Rows are validated against COLUMN_SPEC as they stream in (column count,
+required cells, allowed Type values, LCSC number format). Bad rows never
+reach the database: they are written to parts.rejects.csv with their CSV
+line number and the reasons, and the rest of the load continues.
+
+A full rebuild streams rows from the CSV into a temporary database file in
+fixed-size executemany batches, with journaling and fsync disabled, and
+then atomically renames it over parts.db. Vendor dumps with 100k+ parts
+load in seconds, and parts.db is never missing while the rebuild runs.
+
+With --configure-dbl (setup_kicad.py passes it) the ODBC connection
+string in parts.kicad_dbl is regenerated from dbl_config.json, so the
+database path follows this checkout instead of being hardcoded. Paths
+there may use ~, ${VARS} or be relative to this directory. parts.kicad_dbl
+is tracked, so plain rebuilds leave it alone rather than write this
+machine's path into it. With read_optimized enabled (or
+--read-optimized), a VACUUMed, page-size-tuned, read-only copy is written
+and parts.kicad_dbl opens it as an immutable URI, which avoids locking
+and journal round-trips when the library is mounted from NFS/SMB.
 """
 
+import argparse
 import csv
+import importlib.util
+import json
+import os
+import re
+import shutil
 import sqlite3
+import time
+from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
+from typing import Callable, Optional
 
 # Script directory (where parts.csv and parts.db live)
 SCRIPT_DIR = Path(__file__).parent.resolve()
 CSV_PATH = SCRIPT_DIR / "parts.csv"
 DB_PATH = SCRIPT_DIR / "parts.db"
+TMP_DB_PATH = SCRIPT_DIR / "parts.db.tmp"
+REJECTS_PATH = SCRIPT_DIR / "parts.rejects.csv"
+DBL_PATH = SCRIPT_DIR / "parts.kicad_dbl"
+DBL_CONFIG_PATH = SCRIPT_DIR / "dbl_config.json"
 
+# Defaults for dbl_config.json; the file only needs the keys it changes
+DEFAULT_DBL_CONFIG = {
+    "driver": "SQLite3",
+    "database": "parts.db",
+    "options": {},
+    "read_optimized": {
+        "enabled": False,
+        "path": "parts.ro.db",
+        "page_size": 65536,
+        "uri_params": "mode=ro&immutable=1",
+    },
+}
+
+CONNECTION_STRING_RE = re.compile(r'("connection_string"\s*:\s*)("(?:[^"\\]|\\.)*")')
+
+# Value parser shared with the InteractiveHtmlBom plugin
+UNITS_PATH = (SCRIPT_DIR.parent.parent / "plugins" / "org_openscopeproject_InteractiveHtmlBom"
+              / "core" / "units.py")
+
+# Key column shared by parts.csv, the parts table and parts.kicad_dbl
+KEY_COLUMN = "LCSC"
+
+# Maximum number of changed keys listed per category in the report
+REPORT_LIMIT = 20
+
+# Rows per executemany call when bulk loading
+BATCH_SIZE = 5000
+
+# Unit implied by the Reference designator when Value has none ("10k" on an R)
+REFERENCE_UNITS = {"R": "R", "RV": "R", "C": "F", "L": "H"}
+
+
+def load_units():
+    """Load the iBOM plugin's units module, or None if it is not installed."""
+    if not UNITS_PATH.exists():
+        return None
+    spec = importlib.util.spec_from_file_location("ibom_units", UNITS_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+units = load_units()
+
+
+@dataclass(frozen=True)
+class Column:
+    """Declarative spec for one column of the parts table."""
+    name: str
+    sql_type: str = "TEXT"
+    primary_key: bool = False
+    indexed: bool = False
+    collate: str = ""
+    parse: Optional[Callable[[dict], object]] = None  # shadow columns: row -> value
+    required: bool = False
+    choices: tuple = ()
+    pattern: Optional[re.Pattern] = None
+
+    def check(self, value) -> Optional[str]:
+        """Return why value is invalid for this column, or None if it is valid."""
+        if not value:
+            return f"{self.name} is empty" if self.required else None
+        if self.choices and value not in self.choices:
+            return f"{self.name} {value!r} is not one of {', '.join(self.choices)}"
+        if self.pattern and not self.pattern.fullmatch(value):
+            return f"{self.name} {value!r} does not match {self.pattern.pattern}"
+        return None
+
+    @property
+    def definition(self) -> str:
+        sql = f'"{self.name}" {self.sql_type}'
+        if self.primary_key:
+            sql += " NOT NULL PRIMARY KEY"
+        if self.collate:
+            sql += f" COLLATE {self.collate}"
+        return sql
+
+    @property
+    def index_name(self) -> str:
+        return f"idx_parts_{self.name.lower()}"
+
+
+@lru_cache(maxsize=4096)
+def parse_value(value, default_unit=None):
+    """Parse a component value like "100nF" or "4k7" into base units.
+
+    Args:
+        value: Value text
+        default_unit: Unit to assume when the value has none
+
+    Returns:
+        (magnitude, unit) with unit one of "R", "F", "H" (or default_unit),
+        or (None, None) if the value is not a recognisable passive value
+    """
+    if units is None or not value:
+        return None, None
+    result = units.compMatch(value)
+    if not result:
+        return None, None
+    magnitude, unit = result
+    unit = unit or default_unit
+    if unit is None:
+        return None, None
+    return float(magnitude), unit
+
+
+def parse_value_numeric(row):
+    """Shadow column: row Value magnitude in base units."""
+    return parse_value(row.get("Value") or "", REFERENCE_UNITS.get(row.get("Reference")))[0]
+
+
+def parse_value_unit(row):
+    """Shadow column: row Value unit ("R", "F" or "H")."""
+    return parse_value(row.get("Value") or "", REFERENCE_UNITS.get(row.get("Reference")))[1]
+
+
+# "LIB:name" symbol/footprint references
+LIB_REF_RE = re.compile(r'[^:\s]+:\S.*')
+
+# Columns with non-default types, keys, indexes or validation rules. CSV
+# columns not listed here are created as plain TEXT and accept anything.
+# Value/MPN/Description/Keywords are what KiCad's chooser filters on;
+# NOCASE lets case-insensitive LIKE 'abc%' prefix filters use the index.
+COLUMN_SPEC = {c.name: c for c in [
+    Column("LCSC", primary_key=True, required=True, pattern=re.compile(r'C\d+')),
+    Column("Reference", required=True),
+    Column("Value", indexed=True, collate="NOCASE", required=True),
+    Column("MPN", indexed=True, collate="NOCASE"),
+    Column("Symbol", required=True, pattern=LIB_REF_RE),
+    Column("Footprint", required=True, pattern=LIB_REF_RE),
+    Column("Description", indexed=True, collate="NOCASE"),
+    Column("Keywords", indexed=True, collate="NOCASE"),
+    Column("Type", required=True, choices=("Active", "Passive")),
+]}
+
+# Numeric columns derived from each CSV row, appended after the CSV columns
+SHADOW_COLUMNS = [
+    Column("value_numeric", sql_type="REAL", parse=parse_value_numeric),
+    Column("value_unit", parse=parse_value_unit),
+]
+
+# Multi-column indexes: name -> columns. Range queries filter on unit and
+# then scan a numeric range ("F between 90e-9 and 110e-9").
+COMPOSITE_INDEXES = {
+    "idx_parts_value_unit_numeric": ("value_unit", "value_numeric"),
+}
+
+# Full-text index over the free-text columns (external content: the text
+# lives only in parts, parts_fts stores the inverted index)
+FTS_TABLE = "parts_fts"
+FTS_COLUMNS = ["Description", "Keywords", "MPN", "Manufacturer"]
+FTS_PREFIXES = "2 3 4"
+
+
+def read_fieldnames(csv_path):
+    """Return the header row of parts.csv."""
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        return next(csv.reader(f), [])
+
+
+def iter_rows(csv_path):
+    """Stream parts.csv rows as (line number, dict) without loading the whole file."""
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, row
+
+
+class RejectWriter:
+    """CSV of rows that failed validation, created on the first reject."""
+
+    def __init__(self, path, fieldnames):
+        self.path = path
+        self.fieldnames = fieldnames
+        self.count = 0
+        self._file = None
+        self._writer = None
+        # A rejects file from an earlier run would be misleading
+        path.unlink(missing_ok=True)
+
+    def write(self, line, errors, row):
+        if self._file is None:
+            self._file = open(self.path, 'w', encoding='utf-8', newline='')
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(["line", "errors"] + list(self.fieldnames))
+        cells = [row.get(col) or "" for col in self.fieldnames] + row.get(None, [])
+        self._writer.writerow([line, "; ".join(errors)] + cells)
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def validate_row(row, fieldnames):
+    """Check one CSV row against COLUMN_SPEC.
+
+    Returns:
+        List of error strings (empty if the row is valid)
+    """
+    errors = []
+    extra = row.get(None)
+    if extra:
+        errors.append(f"{len(extra)} cells more than the {len(fieldnames)} header columns")
+    missing = [col for col in fieldnames if row.get(col) is None]
+    if missing:
+        errors.append(f"missing cells: {', '.join(missing)}")
+    for col in fieldnames:
+        spec = COLUMN_SPEC.get(col)
+        if spec is not None:
+            error = spec.check(row.get(col) or "")
+            if error:
+                errors.append(error)
+    return errors
+
+
+def validated_rows(numbered_rows, fieldnames, rejects):
+    """Yield rows that pass validate_row, sending the rest to rejects."""
+    for line, row in numbered_rows:
+        errors = validate_row(row, fieldnames)
+        if errors:
+            rejects.write(line, errors, row)
+        else:
+            yield row
+
+
+def batched(iterable, size):
+    """Yield lists of up to size items from iterable."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def row_values(row, fieldnames):
+    """Return a row's values in column order, with missing cells as ''."""
+    return tuple(row.get(col) or "" for col in fieldnames)
+
+
+def db_values(row, fieldnames):
+    """Return a row's CSV values followed by its shadow column values."""
+    return row_values(row, fieldnames) + tuple(c.parse(row) for c in SHADOW_COLUMNS)
+
+
+def table_schema(fieldnames):
+    """Return the Column specs for the parts table built from fieldnames."""
+    return [COLUMN_SPEC.get(col, Column(col)) for col in fieldnames] + SHADOW_COLUMNS
+
+
+def table_columns(conn, table="parts"):
+    """Return the column names of a table, or [] if it does not exist."""
+    return [r[1] for r in conn.execute(f'PRAGMA table_info("{table}")')]
+
+
+def create_table(conn, schema):
+    """Create the parts table for schema (indexes are added separately)."""
+    columns_def = ", ".join(c.definition for c in schema)
+    conn.execute(f"CREATE TABLE parts ({columns_def});")
+
+
+def create_indexes(conn, schema):
+    """Create the secondary indexes for schema's indexed columns."""
+    for c in schema:
+        if c.indexed:
+            conn.execute(f'CREATE INDEX IF NOT EXISTS "{c.index_name}" ON parts ("{c.name}");')
+    names = {c.name for c in schema}
+    for index_name, columns in COMPOSITE_INDEXES.items():
+        if names.issuperset(columns):
+            columns_list = ", ".join(f'"{col}"' for col in columns)
+            conn.execute(f'CREATE INDEX IF NOT EXISTS "{index_name}" ON parts ({columns_list});')
+
+
+def has_fts5(conn):
+    """Return True if this SQLite build includes the FTS5 extension."""
+    return any(opt == "ENABLE_FTS5" for (opt,) in conn.execute("PRAGMA compile_options"))
+
+
+def table_exists(conn, name):
+    """Return True if a table (or virtual table) called name exists."""
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+    return row.fetchone() is not None
+
+
+def create_fts(conn, fieldnames):
+    """Create and populate the FTS5 index and the triggers that maintain it.
+
+    Returns:
+        True if the index was created, False if FTS5 is unavailable
+    """
+    if not has_fts5(conn):
+        print("WARNING: SQLite has no FTS5 support, skipping full-text index")
+        return False
+
+    columns = [col for col in FTS_COLUMNS if col in fieldnames]
+    columns_list = ", ".join(f'"{col}"' for col in columns)
+    new_values = ", ".join(f'new."{col}"' for col in columns)
+    old_values = ", ".join(f'old."{col}"' for col in columns)
+
+    conn.execute(
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({columns_list}, "
+        f"content='parts', content_rowid='rowid', prefix='{FTS_PREFIXES}');"
+    )
+    conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild');")
+
+    conn.execute(
+        f"CREATE TRIGGER parts_fts_insert AFTER INSERT ON parts BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, {columns_list}) VALUES (new.rowid, {new_values}); END;"
+    )
+    conn.execute(
+        f"CREATE TRIGGER parts_fts_delete AFTER DELETE ON parts BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns_list}) "
+        f"VALUES ('delete', old.rowid, {old_values}); END;"
+    )
+    conn.execute(
+        f"CREATE TRIGGER parts_fts_update AFTER UPDATE ON parts BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns_list}) "
+        f"VALUES ('delete', old.rowid, {old_values}); "
+        f"INSERT INTO {FTS_TABLE}(rowid, {columns_list}) VALUES (new.rowid, {new_values}); END;"
+    )
+    return True
+
+
+def build_database(fieldnames, rows):
+    """Bulk-load rows into a fresh database and swap it in for parts.db.
+
+    The new database is written to TMP_DB_PATH with journaling and fsync
+    off (a crash only loses the temporary file), then renamed over
+    parts.db in one atomic step. The previous parts.db is kept as a
+    timestamped backup. Secondary indexes are built after the load, and
+    rows repeating an already loaded LCSC number are skipped.
+
+    Returns:
+        Number of rows loaded
+    """
+    if TMP_DB_PATH.exists():
+        TMP_DB_PATH.unlink()
+
+    conn = sqlite3.connect(TMP_DB_PATH)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF;")
+        conn.execute("PRAGMA synchronous = OFF;")
+
+        schema = table_schema(fieldnames)
+        create_table(conn, schema)
+
+        # Insert rows in batches, all inside a single transaction
+        placeholders = ", ".join("?" for _ in schema)
+        columns_list = ", ".join(f'"{c.name}"' for c in schema)
+        insert_sql = f"INSERT OR IGNORE INTO parts ({columns_list}) VALUES ({placeholders});"
+
+        count = 0
+        skipped = 0
+        conn.execute("BEGIN;")
+        for batch in batched((db_values(row, fieldnames) for row in rows), BATCH_SIZE):
+            inserted = conn.executemany(insert_sql, batch).rowcount
+            count += inserted
+            skipped += len(batch) - inserted
+        create_indexes(conn, schema)
+        create_fts(conn, fieldnames)
+        conn.commit()
+    except BaseException:
+        conn.close()
+        TMP_DB_PATH.unlink(missing_ok=True)
+        raise
+    conn.close()
 
-def main():
-    print("=" * 50)
-    print("Rebuild parts.db from parts.csv")
-    print("=" * 50)
-    
-    if not CSV_PATH.exists():
-        print(f"ERROR: {CSV_PATH} not found")
-        return 1
-    
     # Backup existing database
     if DB_PATH.exists():
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         backup = DB_PATH.parent / f"parts.db.{timestamp}.bak"
-        DB_PATH.rename(backup)
+        shutil.copy2(DB_PATH, backup)
         print(f"Backup: {backup}")
-    
-    # Read CSV
-    with open(CSV_PATH, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        fieldnames = reader.fieldnames
-        rows = list(reader)
-    
-    print(f"Read {len(rows)} parts from {CSV_PATH.name}")
-    
-    # Create database
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Create table
-    columns_def = ", ".join(f'"{col}" TEXT' for col in fieldnames)
-    cursor.execute(f"CREATE TABLE parts ({columns_def});")
-    
-    # Insert rows
-    placeholders = ", ".join("?" for _ in fieldnames)
+
+    os.replace(TMP_DB_PATH, DB_PATH)
+
+    if skipped:
+        print(f"WARNING: skipped {skipped} rows with duplicate {KEY_COLUMN}")
+    print(f"Created {DB_PATH.name} with {count} parts")
+    return count
+
+
+def diff_rows(fieldnames, rows, conn):
+    """Compare CSV rows with the parts table by KEY_COLUMN.
+
+    Returns:
+        (inserts, updates, deletes, count) where inserts and updates are
+        lists of db_values() tuples, deletes is a list of keys and count is
+        the number of CSV rows read. Only the CSV columns are compared;
+        shadow columns follow from them.
+    """
+    key_index = fieldnames.index(KEY_COLUMN)
     columns_list = ", ".join(f'"{col}"' for col in fieldnames)
-    insert_sql = f"INSERT INTO parts ({columns_list}) VALUES ({placeholders});"
-    
+    existing = {}
+    for values in conn.execute(f"SELECT {columns_list} FROM parts"):
+        values = tuple(v if v is not None else "" for v in values)
+        existing[values[key_index]] = values
+
+    inserts = []
+    updates = []
+    seen = set()
+    count = 0
     for row in rows:
-        values = [row.get(col, "") for col in fieldnames]
-        cursor.execute(insert_sql, values)
-    
-    conn.commit()
-    conn.close()
-    
-    print(f"Created {DB_PATH.name} with {len(rows)} parts")
+        count += 1
+        values = row_values(row, fieldnames)
+        key = values[key_index]
+        if key in seen:
+            print(f"WARNING: duplicate {KEY_COLUMN} {key} in {CSV_PATH.name}, keeping first")
+            continue
+        seen.add(key)
+        old = existing.get(key)
+        if old is None:
+            inserts.append(db_values(row, fieldnames))
+        elif old != values:
+            updates.append(db_values(row, fieldnames))
+
+    deletes = [key for key in existing if key not in seen]
+    return inserts, updates, deletes, count
+
+
+def apply_diff(conn, fieldnames, inserts, updates, deletes):
+    """Apply INSERT/UPDATE/DELETE deltas to the parts table in one transaction."""
+    columns = [c.name for c in table_schema(fieldnames)]
+    columns_list = ", ".join(f'"{col}"' for col in columns)
+    placeholders = ", ".join("?" for _ in columns)
+    insert_sql = f"INSERT INTO parts ({columns_list}) VALUES ({placeholders});"
+
+    key_index = fieldnames.index(KEY_COLUMN)
+    set_cols = [col for col in columns if col != KEY_COLUMN]
+    set_list = ", ".join(f'"{col}" = ?' for col in set_cols)
+    update_sql = f'UPDATE parts SET {set_list} WHERE "{KEY_COLUMN}" = ?;'
+    delete_sql = f'DELETE FROM parts WHERE "{KEY_COLUMN}" = ?;'
+
+    def update_params(values):
+        return [v for i, v in enumerate(values) if i != key_index] + [values[key_index]]
+
+    with conn:
+        conn.executemany(delete_sql, [(key,) for key in deletes])
+        conn.executemany(update_sql, [update_params(v) for v in updates])
+        conn.executemany(insert_sql, inserts)
+
+
+def report_keys(label, keys):
+    """Print a change category with up to REPORT_LIMIT keys."""
+    print(f"{label}: {len(keys)}")
+    for key in keys[:REPORT_LIMIT]:
+        print(f"  {key}")
+    if len(keys) > REPORT_LIMIT:
+        print(f"  ... and {len(keys) - REPORT_LIMIT} more")
+
+
+def update_database(fieldnames, rows):
+    """Incrementally sync parts.db with rows.
+
+    Returns:
+        Number of CSV rows compared, or None if a full rebuild is needed
+    """
+    if not DB_PATH.exists():
+        print(f"{DB_PATH.name} not found, doing full rebuild")
+        return None
+
+    if KEY_COLUMN not in fieldnames:
+        print(f"{CSV_PATH.name} has no {KEY_COLUMN} column, doing full rebuild")
+        return None
+
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        if table_columns(conn) != [c.name for c in table_schema(fieldnames)]:
+            print("Schema changed, doing full rebuild")
+            return None
+
+        if has_fts5(conn) and not table_exists(conn, FTS_TABLE):
+            print("Full-text index missing, doing full rebuild")
+            return None
+
+        inserts, updates, deletes, count = diff_rows(fieldnames, rows, conn)
+        key_index = fieldnames.index(KEY_COLUMN)
+        print(f"Read {count} parts from {CSV_PATH.name}")
+
+        report_keys("Added", [v[key_index] for v in inserts])
+        report_keys("Updated", [v[key_index] for v in updates])
+        report_keys("Removed", deletes)
+
+        if inserts or updates or deletes:
+            apply_diff(conn, fieldnames, inserts, updates, deletes)
+            print(f"Updated {DB_PATH.name} in place")
+        else:
+            print(f"{DB_PATH.name} already up to date")
+    finally:
+        conn.close()
+
+    return count
+
+
+def load_dbl_config(path):
+    """Load dbl_config.json over DEFAULT_DBL_CONFIG (missing file = defaults).
+
+    Raises:
+        ValueError: if the file is not valid JSON
+    """
+    config = json.loads(json.dumps(DEFAULT_DBL_CONFIG))
+    if path.exists():
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                user = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON in {path.name}: {e}")
+        for key, value in user.items():
+            if isinstance(value, dict) and isinstance(config.get(key), dict):
+                config[key].update(value)
+            else:
+                config[key] = value
+    return config
+
+
+def expand_path(value, base=SCRIPT_DIR):
+    """Expand ~ and ${VARS} in a config path; relative paths are taken from base.
+
+    Raises:
+        ValueError: if the path refers to an undefined environment variable
+    """
+    expanded = os.path.expandvars(os.path.expanduser(value))
+    if "$" in expanded:
+        raise ValueError(f"Undefined variable in path: {value}")
+    path = Path(expanded)
+    if not path.is_absolute():
+        path = base / path
+    return path.resolve()
+
+
+def connection_string(driver, database, options=None, uri_params=""):
+    """Build an SQLite ODBC connection string for parts.kicad_dbl."""
+    if uri_params:
+        database = f"file:{database.as_posix()}?{uri_params}"
+    parts = [f"Driver={driver}", f"Database={database}"]
+    parts.extend(f"{key}={value}" for key, value in (options or {}).items())
+    return ";".join(parts) + ";"
+
+
+def build_read_optimized(src, dest, page_size):
+    """Write a compacted, analyzed, read-only copy of src to dest.
+
+    VACUUM INTO produces a defragmented file with the requested page size
+    (larger pages mean fewer round-trips over a network filesystem); it is
+    then ANALYZEd, made read-only and atomically renamed into place.
+    """
+    tmp = dest.with_name(dest.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+
+    conn = sqlite3.connect(src)
+    try:
+        conn.execute(f"PRAGMA page_size = {int(page_size)};")
+        conn.execute("VACUUM INTO ?;", (str(tmp),))
+    finally:
+        conn.close()
+
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.execute("ANALYZE;")
+        conn.execute("PRAGMA journal_mode = DELETE;")
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.chmod(tmp, 0o444)
+    os.replace(tmp, dest)
+
+
+def write_dbl_connection(dbl_path, conn_str):
+    """Point parts.kicad_dbl at conn_str, preserving the rest of the file.
+
+    Returns:
+        True if the file was changed
+    """
+    text = dbl_path.read_text(encoding='utf-8')
+    new_text, count = CONNECTION_STRING_RE.subn(
+        lambda m: m.group(1) + json.dumps(conn_str), text, count=1)
+    if count == 0:
+        raise ValueError(f"No connection_string in {dbl_path.name}")
+    if new_text == text:
+        return False
+    dbl_path.write_text(new_text, encoding='utf-8')
+    return True
+
+
+def configure_dbl(config, read_optimized=False, write=False):
+    """Emit the read-optimized copy if enabled and, with write, update parts.kicad_dbl.
+
+    Raises:
+        ValueError: on bad paths in the config or a malformed parts.kicad_dbl
+    """
+    database = expand_path(config["database"])
+    uri_params = ""
+
+    ro = config["read_optimized"]
+    if read_optimized or ro["enabled"]:
+        ro_path = expand_path(ro["path"])
+        if not ro_path.exists() or ro_path.stat().st_mtime < DB_PATH.stat().st_mtime:
+            build_read_optimized(DB_PATH, ro_path, ro["page_size"])
+            print(f"Read-optimized copy: {ro_path} (page size {ro['page_size']})")
+        else:
+            print(f"Read-optimized copy up to date: {ro_path}")
+        database = ro_path
+        uri_params = ro["uri_params"]
+
+    if not DBL_PATH.exists():
+        print(f"WARNING: {DBL_PATH.name} not found, connection string not updated")
+        return
+
+    conn_str = connection_string(config["driver"], database, config["options"], uri_params)
+    if not write:
+        match = CONNECTION_STRING_RE.search(DBL_PATH.read_text(encoding='utf-8'))
+        if match is None or json.loads(match.group(2)) != conn_str:
+            print(f"{DBL_PATH.name} not updated (run with --configure-dbl to point it at {database.name})")
+        return
+    if write_dbl_connection(DBL_PATH, conn_str):
+        print(f"Updated {DBL_PATH.name}: {conn_str}")
+    else:
+        print(f"{DBL_PATH.name} already points at {database.name}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild parts.db from parts.csv")
+    parser.add_argument(
+        "--incremental", "-i",
+        action="store_true",
+        help="Apply only changed rows to the existing parts.db (no backup, no downtime)"
+    )
+    parser.add_argument(
+        "--benchmark", "-b",
+        action="store_true",
+        help="Report elapsed time and rows/sec"
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help=f"Exit with status 1 if any row is rejected to {REJECTS_PATH.name}"
+    )
+    parser.add_argument(
+        "--read-optimized",
+        action="store_true",
+        help=f"Emit the read-only compacted copy even if {DBL_CONFIG_PATH.name} does not enable it"
+    )
+    parser.add_argument(
+        "--configure-dbl",
+        action="store_true",
+        help=f"Point the connection string in {DBL_PATH.name} at the database from {DBL_CONFIG_PATH.name}"
+    )
+    args = parser.parse_args(argv)
+
+    print("=" * 50)
+    print("Rebuild parts.db from parts.csv")
+    print("=" * 50)
+
+    if not CSV_PATH.exists():
+        print(f"ERROR: {CSV_PATH} not found")
+        return 1
+
+    try:
+        dbl_config = load_dbl_config(DBL_CONFIG_PATH)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        return 1
+
+    fieldnames = read_fieldnames(CSV_PATH)
+
+    if units is None:
+        print(f"WARNING: {UNITS_PATH} not found, value_numeric/value_unit left empty")
+    start = time.perf_counter()
+
+    rejects = RejectWriter(REJECTS_PATH, fieldnames)
+    try:
+        count = None
+        if args.incremental:
+            count = update_database(fieldnames, validated_rows(iter_rows(CSV_PATH), fieldnames, rejects))
+        if count is None:
+            count = build_database(fieldnames, validated_rows(iter_rows(CSV_PATH), fieldnames, rejects))
+    finally:
+        rejects.close()
+
+    if rejects.count:
+        print(f"WARNING: rejected {rejects.count} invalid rows, see {REJECTS_PATH.name}")
+
+    if args.benchmark:
+        elapsed = time.perf_counter() - start
+        rate = count / elapsed if elapsed > 0 else 0
+        print(f"Loaded {count} rows in {elapsed:.3f}s ({rate:,.0f} rows/sec)")
+
+    try:
+        configure_dbl(dbl_config, args.read_optimized, args.configure_dbl)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        return 1
+
     print("=" * 50)
     print("DONE")
     print("=" * 50)
-    return 0
+    return 1 if args.strict and rejects.count else 0
 
 
 if __name__ == "__main__":
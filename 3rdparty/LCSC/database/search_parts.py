@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Search parts.db by description, keywords, MPN and manufacturer, or by value
+
+Uses the parts_fts full-text index built by rebuild_db.py, ranked with
+bm25 so the best matches come first. Every word is matched as a prefix
+in any order, so "mic mems" finds "audio mems microphone smd sound".
+
+Value ranges use the indexed value_numeric/value_unit columns, so finding
+alternates among thousands of passives is a B-tree range scan.
+
+Run from any directory:
+    python3 search_parts.py mems microphone
+    python3 search_parts.py ldo 3.3v --limit 5
+    python3 search_parts.py --raw 'MPN:esp32* NOT module'    # FTS5 query syntax
+    python3 search_parts.py --range 90nF 110nF --footprint 0603
+    python3 search_parts.py --range 1uF 10uF x7r             # range + text
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from rebuild_db import parse_value
+
+# Script directory (where parts.db lives)
+SCRIPT_DIR = Path(__file__).parent.resolve()
+DB_PATH = SCRIPT_DIR / "parts.db"
+
+FTS_TABLE = "parts_fts"
+
+# bm25 column weights, in parts_fts column order (Description, Keywords,
+# MPN, Manufacturer). An MPN hit is a much stronger signal than a
+# manufacturer hit.
+BM25_WEIGHTS = (2.0, 1.0, 5.0, 0.5)
+
+RESULT_COLUMNS = ["LCSC", "Value", "MPN", "Description"]
+
+# Relative slack on range bounds so "100nF" matches a stored 1e-07 exactly
+RANGE_TOLERANCE = 1e-9
+
+
+def build_query(terms):
+    """Turn plain search words into an FTS5 query of quoted prefix terms.
+
+    Quoting keeps punctuation like "3.3v" or "ESP32-S3" from being read as
+    FTS5 operators; the trailing * makes each word a prefix match.
+    """
+    words = [t for term in terms for t in term.split()]
+    return " ".join('"' + w.replace('"', '""') + '"*' for w in words)
+
+
+def search(conn, query, limit=20):
+    """Run an FTS5 MATCH query against parts_fts.
+
+    Returns:
+        List of (LCSC, Value, MPN, Description, rank) tuples, best first
+    """
+    weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+    columns_list = ", ".join(f'p."{col}"' for col in RESULT_COLUMNS)
+    sql = (
+        f"SELECT {columns_list}, bm25({FTS_TABLE}, {weights}) AS rank "
+        f"FROM {FTS_TABLE} JOIN parts p ON p.rowid = {FTS_TABLE}.rowid "
+        f"WHERE {FTS_TABLE} MATCH ? ORDER BY rank LIMIT ?"
+    )
+    return conn.execute(sql, (query, limit)).fetchall()
+
+
+def find_by_value(conn, low, high, unit, footprint=None, query=None, limit=20):
+    """Find parts whose parsed value lies in [low, high] base units.
+
+    Args:
+        low, high: Range bounds in base units (ohms, farads, henries)
+        unit: "R", "F" or "H"
+        footprint: Optional substring the Footprint must contain (e.g. "0603")
+        query: Optional FTS5 query the part must also match
+
+    Returns:
+        List of (LCSC, Value, MPN, Description, value_numeric) tuples,
+        smallest value first
+    """
+    columns_list = ", ".join(f'"{col}"' for col in RESULT_COLUMNS)
+    sql = (
+        f"SELECT {columns_list}, value_numeric FROM parts "
+        f"WHERE value_unit = ? AND value_numeric BETWEEN ? AND ?"
+    )
+    params = [unit, low * (1 - RANGE_TOLERANCE), high * (1 + RANGE_TOLERANCE)]
+    if footprint:
+        sql += ' AND "Footprint" LIKE ?'
+        params.append(f"%{footprint}%")
+    if query:
+        sql += f" AND rowid IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?)"
+        params.append(query)
+    sql += " ORDER BY value_numeric LIMIT ?"
+    params.append(limit)
+    return conn.execute(sql, params).fetchall()
+
+
+def parse_range(low_text, high_text):
+    """Parse "90nF" "110nF" style bounds into (low, high, unit).
+
+    One bound may omit the unit ("9.5k 10.5kΩ") and takes the other's.
+
+    Raises:
+        ValueError: if a bound cannot be parsed or the units disagree
+    """
+    low, low_unit = parse_value(low_text, default_unit="")
+    high, high_unit = parse_value(high_text, default_unit="")
+    for text, result in ((low_text, low), (high_text, high)):
+        if result is None:
+            raise ValueError(f"cannot parse value: {text!r} (e.g. 100nF, 10kΩ, 4.7uH)")
+    if low_unit and high_unit and low_unit != high_unit:
+        raise ValueError(f"range bounds have different units: {low_text} / {high_text}")
+    unit = low_unit or high_unit
+    if not unit:
+        raise ValueError("at least one range bound needs a unit (Ω, F or H)")
+    return min(low, high), max(low, high), unit
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Search parts.db by text or value range"
+    )
+    parser.add_argument(
+        "terms",
+        nargs="*",
+        help="Search words (matched as prefixes, any order)"
+    )
+    parser.add_argument(
+        "--range", "-r",
+        nargs=2,
+        metavar=("MIN", "MAX"),
+        help="Value range with units, e.g. 90nF 110nF or 9.5kΩ 10.5kΩ"
+    )
+    parser.add_argument(
+        "--footprint", "-f",
+        help="With --range: only footprints containing this text (e.g. 0603)"
+    )
+    parser.add_argument(
+        "--limit", "-n",
+        type=int,
+        default=20,
+        help="Maximum number of results (default: 20)"
+    )
+    parser.add_argument(
+        "--raw",
+        action="store_true",
+        help="Pass terms through as an FTS5 query expression"
+    )
+    parser.add_argument(
+        "--db",
+        type=Path,
+        default=DB_PATH,
+        help="Path to parts.db (default: next to this script)"
+    )
+    args = parser.parse_args()
+
+    if not args.terms and not args.range:
+        parser.error("give search words, --range, or both")
+
+    if args.range:
+        try:
+            low, high, unit = parse_range(*args.range)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if not args.db.exists():
+        print(f"ERROR: {args.db} not found (run rebuild_db.py first)", file=sys.stderr)
+        return 1
+
+    query = None
+    if args.terms:
+        query = " ".join(args.terms) if args.raw else build_query(args.terms)
+
+    conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    try:
+        start = time.perf_counter()
+        if args.range:
+            rows = find_by_value(conn, low, high, unit, args.footprint, query, args.limit)
+        else:
+            rows = search(conn, query, args.limit)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+    except sqlite3.OperationalError as e:
+        if "no such table" in str(e) or "no such column" in str(e):
+            print(f"ERROR: {args.db.name} is out of date (rebuild with rebuild_db.py)", file=sys.stderr)
+        else:
+            print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+
+    for lcsc, value, mpn, description, _ in rows:
+        print(f"{lcsc:<10} {value:<20} {mpn:<24} {description}")
+
+    print(f"\n{len(rows)} results in {elapsed_ms:.1f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -4,9 +4,9 @@ KiCad LCSC Library Setup Script
 
 This script configures a fresh KiCad 9.0 installation to use the LCSC parts library.
 It handles:
-1. ODBC driver installation check
+1. ODBC driver installation check (Homebrew on macOS, apt-get/dnf/zypper on Linux)
 2. ~/.odbcinst.ini configuration
-3. Rebuilding parts.db from parts.csv
+3. Building or updating parts.db from parts.csv (and pointing parts.kicad_dbl at it)
 4. Configuring KiCad path variables
 5. Adding symbol libraries (Generics, LCSC, parts database)
 6. Adding footprint library (LCSC.pretty)
@@ -16,32 +16,100 @@ It handles:
 10. Custom dark color theme for schematic editor (colors/user.json)
 11. Project template defaults (40 mil text size for labels)
 
+KiCad config changes are staged and written together at the end, one atomic
+write per file, and only to files whose content actually changes. Existing
+sym-lib-table/fp-lib-table entries other than Generics, LCSC and parts are
+kept as they are, so re-running setup is a no-op.
+
+The steps form a dependency graph (see main); steps that don't depend
+on each other run concurrently, with each step's output printed in one
+piece when it finishes. parts.db is built or updated in-process by importing
+rebuild_db. --plan runs every step without side effects and prints the
+unified diff of each config file that would change.
+
 Run from any directory:
     python3 setup_kicad.py                      # Full setup
+    python3 setup_kicad.py --plan               # Show what would change
+    python3 setup_kicad.py --yes                # Install ODBC drivers without asking
     python3 setup_kicad.py --patch-project .    # Patch current project only
+    python3 setup_kicad.py --patch-tree ~/Projects --patch netclass   # Patch every project below
+
+--patch-project and --patch-tree apply PROJECT_PATCHES to .kicad_pro files
+(default: text-size only): text-size sets 40 mil default text, netclass
+brings netclasses and patterns in line with the JLCPCB_4Layer template,
+and libraries repoints a project's own lib table rows for Generics/LCSC/
+parts at this install. --patch-tree finds projects with os.scandir,
+patches them on a thread pool and only writes files that change.
 
 Requirements:
-    - macOS with Homebrew
-    - KiCad 9.0 installed (launch once before running this script)
-    - LCSC library cloned to ~/Documents/KiCad/9.0/3rdparty/lcsc/
+    - macOS with Homebrew, or Linux with apt-get, dnf or zypper
+    - KiCad 9.0 installed
+    - macOS: LCSC library cloned to ~/Documents/KiCad/9.0/3rdparty/lcsc/
+    - Linux: the library is used from wherever this checkout is
+
+KiCad's preferences are read from ~/Library/Preferences/kicad/9.0 on
+macOS and $XDG_CONFIG_HOME/kicad/9.0 (~/.config/kicad/9.0) on Linux, or
+$KICAD_CONFIG_HOME/9.0 if that is set. If KiCad has never been launched
+(a headless build agent), the directory and files are created. A missing
+sym-lib-table or fp-lib-table is started from KiCad's stock table in its
+installed template directory, as KiCad's first launch would; setup stops
+if that cannot be found rather than leave KiCad without its libraries.
 
 The JLCPCB_4Layer project template should be placed in:
-    ~/Documents/KiCad/9.0/template/JLCPCB_4Layer/
+    ~/Documents/KiCad/9.0/template/JLCPCB_4Layer/                (macOS)
+    ~/.local/share/kicad/9.0/template/JLCPCB_4Layer/             (Linux)
 """
 
 import argparse
+import contextlib
+import copy
+import difflib
+import glob
+import hashlib
+import importlib.util
+import io
 import json
 import os
+import platform
+import re
+import shutil
 import subprocess
 import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache, partial
 from pathlib import Path
+from typing import Callable, NamedTuple
+
+from kicad_sexpr import Node, QuotedString, dumps, load
 
 # Paths
 HOME = Path.home()
-KICAD_LIB_DIR = HOME / "Documents" / "KiCad" / "9.0"
-KICAD_PREFS_DIR = HOME / "Library" / "Preferences" / "kicad" / "9.0"
+SYSTEM = platform.system()
+if SYSTEM == "Darwin":
+    KICAD_LIB_DIR = HOME / "Documents" / "KiCad" / "9.0"
+    KICAD_PREFS_DIR = HOME / "Library" / "Preferences" / "kicad" / "9.0"
+else:
+    # Linux and other XDG desktops
+    KICAD_LIB_DIR = Path(os.environ.get("XDG_DATA_HOME") or HOME / ".local" / "share") / "kicad" / "9.0"
+    KICAD_PREFS_DIR = Path(os.environ.get("XDG_CONFIG_HOME") or HOME / ".config") / "kicad" / "9.0"
+if os.environ.get("KICAD_CONFIG_HOME"):
+    KICAD_PREFS_DIR = Path(os.environ["KICAD_CONFIG_HOME"]) / "9.0"
 ODBCINST_PATH = HOME / ".odbcinst.ini"
 
+# Where KiCad installs the stock global library tables it copies into the
+# preferences directory on first launch
+if SYSTEM == "Darwin":
+    KICAD_TEMPLATE_DIRS = [Path("/Applications/KiCad/KiCad.app/Contents/SharedSupport/template")]
+else:
+    KICAD_TEMPLATE_DIRS = [
+        Path("/usr/share/kicad/template"),
+        Path("/usr/local/share/kicad/template"),
+        Path("/var/lib/flatpak/app/org.kicad.KiCad/current/active/files/share/kicad/template"),
+    ]
+if os.environ.get("KICAD9_TEMPLATE_DIR"):
+    KICAD_TEMPLATE_DIRS.insert(0, Path(os.environ["KICAD9_TEMPLATE_DIR"]))
+
 # KiCad config files
 SYM_LIB_TABLE = KICAD_PREFS_DIR / "sym-lib-table"
 FP_LIB_TABLE = KICAD_PREFS_DIR / "fp-lib-table"
@@ -62,7 +130,10 @@ HOTKEY_CHANGES = {
 }
 
 # Library paths (absolute)
-LCSC_DIR = KICAD_LIB_DIR / "3rdparty" / "lcsc"
+if SYSTEM == "Darwin":
+    LCSC_DIR = KICAD_LIB_DIR / "3rdparty" / "lcsc"
+else:
+    LCSC_DIR = Path(__file__).resolve().parent.parent
 GENERICS_SYM = LCSC_DIR / "symbols" / "Generics.kicad_sym"
 LCSC_SYM = LCSC_DIR / "symbols" / "LCSC.kicad_sym"
 PARTS_DBL = LCSC_DIR / "database" / "parts.kicad_dbl"
@@ -71,6 +142,23 @@ MODELS_DIR = LCSC_DIR / "3dmodels"
 DATABASE_DIR = LCSC_DIR / "database"
 TEMPLATE_DIR = KICAD_LIB_DIR / "template" / "JLCPCB_4Layer"
 
+# Package manager -> (check command, install command, ODBC packages, index refresh command)
+ODBC_PACKAGES = {
+    "brew": (["brew", "list"], ["brew", "install"], ["unixodbc", "sqliteodbc"], None),
+    "apt-get": (["dpkg", "-s"], ["apt-get", "install", "-y"], ["unixodbc", "libsqliteodbc"],
+                ["apt-get", "update"]),
+    "dnf": (["rpm", "-q"], ["dnf", "install", "-y"], ["unixODBC", "sqliteodbc"], None),
+    "zypper": (["rpm", "-q"], ["zypper", "--non-interactive", "install"], ["unixODBC", "sqliteodbc"], None),
+}
+PACKAGE_MANAGERS = {"Darwin": ["brew"], "Linux": ["apt-get", "dnf", "zypper"]}
+
+# Where each platform's packages put the SQLite ODBC driver
+ODBC_DRIVER_PATHS = {
+    "Darwin": ["/opt/homebrew/lib/libsqlite3odbc.dylib", "/usr/local/lib/libsqlite3odbc.dylib"],
+    "Linux": ["/usr/lib/*/odbc/libsqlite3odbc.so", "/usr/lib64/libsqlite3odbc.so",
+              "/usr/lib/libsqlite3odbc.so", "/usr/local/lib/libsqlite3odbc.so"],
+}
+
 # Default schematic text size: 40 mil (KiCad 9 stores as mils directly)
 DEFAULT_TEXT_SIZE = 40.0
 
@@ -93,19 +181,232 @@ def print_err(msg):
     print(f"  [ERROR] {msg}")
 
 
+def print_plan(msg):
+    print(f"  [PLAN] {msg}")
+
+
+class StepOutput:
+    """Stand-in for sys.stdout while steps run on worker threads.
+    
+    Whatever a step prints is held in a per-thread buffer and written out in
+    one piece when the step finishes, so concurrent steps never interleave
+    their output. Prints from threads not running a step go straight through.
+    """
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+        self.lock = threading.Lock()
+    
+    def write(self, text):
+        buffer = getattr(self.local, "buffer", None)
+        if buffer is not None:
+            buffer.append(text)
+        else:
+            with self.lock:
+                self.stream.write(text)
+        return len(text)
+    
+    def flush(self):
+        with self.lock:
+            self.stream.flush()
+    
+    def capture(self, func):
+        """Run func(), returning (its result, everything it printed)."""
+        outer = getattr(self.local, "buffer", None)
+        self.local.buffer = []
+        try:
+            result = func()
+        finally:
+            text = "".join(self.local.buffer)
+            self.local.buffer = outer
+        return result, text
+    
+    def emit(self, text):
+        with self.lock:
+            self.stream.write(text)
+            self.stream.flush()
+    
+    def ask(self, prompt):
+        """Show this step's output so far, then prompt on the terminal."""
+        with self.lock:
+            buffer = self.local.buffer
+            self.stream.write("".join(buffer) + prompt)
+            self.stream.flush()
+            buffer.clear()
+            return sys.stdin.readline()
+
+
+def capture_output(func):
+    """Run func(), returning (its result, everything it printed)."""
+    if isinstance(sys.stdout, StepOutput):
+        return sys.stdout.capture(func)
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        return func(), out.getvalue()
+
+
+def ask(prompt):
+    """input() that also works from inside a step whose output is being held."""
+    if isinstance(sys.stdout, StepOutput):
+        return sys.stdout.ask(prompt)
+    return input(prompt)
+
+
+def write_if_changed(path, text):
+    """Atomically replace a file with text, unless it already holds exactly that.
+    
+    The content is written to a temporary file in the same directory and
+    renamed over the original, so KiCad never reads a half-written file.
+    
+    Returns:
+        True if the file was written, False if its content was unchanged
+    """
+    path = Path(path)
+    data = text.encode('utf-8')
+    if path.exists() and hashlib.sha256(path.read_bytes()).digest() == hashlib.sha256(data).digest():
+        return False
+    
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if path.exists():
+            shutil.copymode(path, tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return True
+
+
+class ConfigFiles:
+    """Staged edits to KiCad's config files, written once per file by commit().
+    
+    Each configure step gets a file's contents from here and edits them in
+    place, so steps that touch the same file (path variables and mouse
+    settings both live in kicad_common.json) share one copy of it. Nothing
+    is written until commit(), which skips files whose content did not
+    change and replaces the rest atomically, so a failed setup leaves the
+    KiCad config untouched and a repeated one rewrites nothing.
+    
+    Steps running concurrently may load different files; steps that edit
+    the same file must be ordered by the step graph.
+    """
+    
+    def __init__(self):
+        self._files = {}  # path -> [kind, data, original]
+        self._lock = threading.Lock()
+    
+    def json(self, path, reset=False):
+        """The parsed contents of a JSON file ({} if it does not exist).
+        
+        With reset=True the existing contents are discarded and the file is
+        rewritten from {}.
+        
+        Raises:
+            json.JSONDecodeError: if the file is not valid JSON
+        """
+        path = Path(path)
+        with self._lock:
+            if reset or path not in self._files:
+                data = original = None
+                if path.exists() and not reset:
+                    with open(path, 'r') as f:
+                        data = json.load(f)
+                    original = copy.deepcopy(data)
+                if data is None:
+                    data = {}
+                self._files[path] = ["json", data, original]
+            return self._files[path][1]
+    
+    def lib_table(self, path, table_type, seed=None):
+        """The parsed (sym_lib_table ...) or (fp_lib_table ...) in a file.
+        
+        A missing file is read from seed instead, if given, or else gives
+        an empty version 7 table.
+        
+        Raises:
+            ValueError: if the file is not a table of this type
+        """
+        path = Path(path)
+        with self._lock:
+            if path not in self._files:
+                source = path if path.exists() else seed
+                if source is not None:
+                    table = load(source)
+                    if table.head != table_type:
+                        raise ValueError(f"expected ({table_type} ...), found ({table.head} ...)")
+                else:
+                    table = Node(table_type, [Node("version", ["7"])])
+                self._files[path] = ["lib_table", table, None]
+            return self._files[path][1]
+    
+    def text(self, path):
+        """The contents of a text file (None if it does not exist)."""
+        path = Path(path)
+        with self._lock:
+            if path not in self._files:
+                text = path.read_text() if path.exists() else None
+                self._files[path] = ["text", text, text]
+            return self._files[path][1]
+    
+    def set_text(self, path, text):
+        """Replace the staged contents of a text file."""
+        self.text(path)
+        self._files[Path(path)][1] = text
+    
+    def _render(self):
+        """Yield (path, new text), with None as the text for files left unedited."""
+        for path, (kind, data, original) in self._files.items():
+            if kind == "lib_table":
+                yield path, dumps(data) + "\n" if data.modified() else None
+            elif kind == "json":
+                yield path, json.dumps(data, indent=2) if data != original else None
+            else:
+                yield path, data if data != original else None
+    
+    def commit(self):
+        """Write every staged file whose content changed.
+        
+        Returns:
+            (written, unchanged) lists of paths
+        """
+        written, unchanged = [], []
+        for path, text in self._render():
+            if text is not None and write_if_changed(path, text):
+                written.append(path)
+            else:
+                unchanged.append(path)
+        self._files.clear()
+        return written, unchanged
+    
+    def diff(self):
+        """Unified diffs of what commit() would write, as {path: diff text}."""
+        diffs = {}
+        for path, text in self._render():
+            old = path.read_text(encoding='utf-8') if path.exists() else ""
+            if text is None or text == old:
+                continue
+            lines = difflib.unified_diff(
+                old.splitlines(keepends=True), text.splitlines(keepends=True),
+                fromfile=str(path) if path.exists() else "/dev/null", tofile=str(path))
+            diffs[path] = "".join(line if line.endswith("\n") else line + "\n\\ No newline at end of file\n"
+                                  for line in lines)
+        return diffs
+
+
 def check_prerequisites():
     """Verify required files and directories exist."""
     print_step("Checking prerequisites")
     
     errors = []
     
-    if not KICAD_LIB_DIR.exists():
+    if SYSTEM == "Darwin" and not KICAD_LIB_DIR.exists():
         errors.append(f"KiCad library directory not found: {KICAD_LIB_DIR}")
     
-    if not KICAD_PREFS_DIR.exists():
-        errors.append(f"KiCad preferences directory not found: {KICAD_PREFS_DIR}")
-        errors.append("Have you launched KiCad 9.0 at least once?")
-    
     if not GENERICS_SYM.exists():
         errors.append(f"Generics symbol library not found: {GENERICS_SYM}")
     
@@ -127,70 +428,118 @@ def check_prerequisites():
             print_err(e)
         return False
     
+    if not KICAD_PREFS_DIR.exists():
+        print_warn(f"KiCad preferences directory not found: {KICAD_PREFS_DIR}")
+        print_warn("It will be created; KiCad fills in its defaults on first launch")
+    
     print_ok("All required files found")
     return True
 
 
-def check_odbc_installed():
-    """Check if unixodbc and sqliteodbc are installed via Homebrew."""
-    print_step("Checking ODBC installation")
+def find_package_manager():
+    """Return this system's package manager (a key of ODBC_PACKAGES), or None."""
+    for name in PACKAGE_MANAGERS.get(SYSTEM, []):
+        if shutil.which(name):
+            return name
+    return None
+
+
+def check_odbc_installed(manager):
+    """Return the ODBC packages that are not installed."""
+    check, _, packages, _ = ODBC_PACKAGES[manager]
     
-    try:
-        result = subprocess.run(
-            ["brew", "list", "unixodbc"],
-            capture_output=True, text=True
-        )
+    missing = []
+    for package in packages:
+        result = subprocess.run(check + [package], capture_output=True, text=True)
         if result.returncode != 0:
-            print_warn("unixodbc not installed")
+            print_warn(f"{package} not installed")
+            missing.append(package)
+        else:
+            print_ok(f"{package} installed")
+    return missing
+
+
+def install_odbc(manager, packages):
+    """Install ODBC packages with the system package manager."""
+    _, install, _, refresh = ODBC_PACKAGES[manager]
+    
+    # Linux package managers need root; -n makes sudo fail rather than hang without a terminal
+    sudo = []
+    if SYSTEM != "Darwin" and os.geteuid() != 0:
+        sudo = ["sudo"] if sys.stdin.isatty() else ["sudo", "-n"]
+    
+    commands = [sudo + refresh] if refresh else []
+    commands.append(sudo + install + packages)
+    for command in commands:
+        print(f"  Running: {' '.join(command)}")
+        try:
+            result = subprocess.run(command, capture_output=True, text=True)
+        except FileNotFoundError as e:
+            print_err(f"Failed to install ODBC: {e}")
             return False
-        print_ok("unixodbc installed")
-        
-        result = subprocess.run(
-            ["brew", "list", "sqliteodbc"],
-            capture_output=True, text=True
-        )
         if result.returncode != 0:
-            print_warn("sqliteodbc not installed")
+            print_err(f"Failed to install ODBC: exit status {result.returncode}")
+            print(result.stderr)
             return False
-        print_ok("sqliteodbc installed")
-        
-        return True
-    except FileNotFoundError:
-        print_err("Homebrew not found. Please install Homebrew first.")
-        return False
+    
+    for package in packages:
+        print_ok(f"{package} installed")
+    return True
 
 
-def install_odbc():
-    """Install ODBC drivers via Homebrew."""
-    print_step("Installing ODBC drivers")
+def ensure_odbc(assume_yes=False, plan=False):
+    """Check the ODBC driver packages and install any that are missing."""
+    print_step("Checking ODBC installation")
     
-    try:
-        print("  Installing unixodbc...")
-        subprocess.run(["brew", "install", "unixodbc"], check=True)
-        print_ok("unixodbc installed")
-        
-        print("  Installing sqliteodbc...")
-        subprocess.run(["brew", "install", "sqliteodbc"], check=True)
-        print_ok("sqliteodbc installed")
-        
-        return True
-    except subprocess.CalledProcessError as e:
-        print_err(f"Failed to install ODBC: {e}")
+    manager = find_package_manager()
+    if manager is None:
+        if SYSTEM == "Darwin":
+            print_err("Homebrew not found. Please install Homebrew first.")
+        else:
+            print_err(f"No supported package manager found ({', '.join(PACKAGE_MANAGERS.get(SYSTEM, []))})")
+            print_warn("Install unixODBC and the SQLite ODBC driver (sqliteodbc) manually")
         return False
+    
+    missing = check_odbc_installed(manager)
+    if not missing:
+        return True
+    
+    if plan:
+        print_plan(f"Would install via {manager}: {' '.join(missing)}")
+        return True
+    
+    if not assume_yes:
+        if not sys.stdin.isatty():
+            print_err("ODBC drivers required; run with --yes to install them without a prompt")
+            return False
+        response = ask(f"\nInstall ODBC drivers via {manager}? [Y/n]: ").strip().lower()
+        if response not in ('', 'y', 'yes'):
+            print_err("ODBC drivers required")
+            return False
+    
+    return install_odbc(manager, missing)
+
+
+def find_odbc_driver():
+    """Return the path of the installed SQLite3 ODBC driver library, or None."""
+    for pattern in ODBC_DRIVER_PATHS.get(SYSTEM, []):
+        matches = sorted(glob.glob(pattern))
+        if matches:
+            return matches[0]
+    return None
 
 
-def configure_odbcinst():
+def configure_odbcinst(files, plan=False):
     """Create or update ~/.odbcinst.ini for SQLite3 ODBC driver."""
     print_step("Configuring ODBC driver")
     
-    # Determine driver path based on architecture
-    if Path("/opt/homebrew/lib/libsqlite3odbc.dylib").exists():
-        driver_path = "/opt/homebrew/lib/libsqlite3odbc.dylib"
-    elif Path("/usr/local/lib/libsqlite3odbc.dylib").exists():
-        driver_path = "/usr/local/lib/libsqlite3odbc.dylib"
-    else:
-        print_err("Could not find libsqlite3odbc.dylib")
-        print_warn("Checked /opt/homebrew/lib/ and /usr/local/lib/")
+    driver_path = find_odbc_driver()
+    if driver_path is None:
+        if plan:
+            print_plan(f"{ODBCINST_PATH} will point at the driver once it is installed")
+            return True
+        print_err("Could not find the SQLite3 ODBC driver (libsqlite3odbc)")
+        print_warn(f"Checked {', '.join(ODBC_DRIVER_PATHS.get(SYSTEM, []))}")
         return False
     
     odbcinst_content = f"""[SQLite3]
@@ -201,22 +550,24 @@ UsageCount=1
 """
     
     # Check if already configured correctly
-    if ODBCINST_PATH.exists():
-        existing = ODBCINST_PATH.read_text()
-        if "[SQLite3]" in existing and driver_path in existing:
-            print_ok(f"ODBC already configured in {ODBCINST_PATH}")
-            return True
+    existing = files.text(ODBCINST_PATH)
+    if existing and "[SQLite3]" in existing and driver_path in existing:
+        print_ok(f"ODBC already configured in {ODBCINST_PATH}")
+        return True
     
-    # Write config
-    ODBCINST_PATH.write_text(odbcinst_content)
-    print_ok(f"Created {ODBCINST_PATH}")
+    files.set_text(ODBCINST_PATH, odbcinst_content)
+    print_ok(f"{ODBCINST_PATH}: SQLite3")
     print(f"  Driver: {driver_path}")
     
     return True
 
 
-def rebuild_database():
-    """Run rebuild_db.py to create parts.db from parts.csv."""
+def rebuild_database(plan=False):
+    """Update parts.db from parts.csv by running rebuild_db in-process.
+    
+    An existing parts.db is updated incrementally, so re-running setup
+    neither rebuilds it nor leaves another backup behind.
+    """
     print_step("Rebuilding parts database")
     
     rebuild_script = DATABASE_DIR / "rebuild_db.py"
@@ -224,41 +575,50 @@ def rebuild_database():
         print_err(f"rebuild_db.py not found: {rebuild_script}")
         return False
     
-    try:
-        result = subprocess.run(
-            [sys.executable, str(rebuild_script)],
-            cwd=str(DATABASE_DIR),
-            capture_output=True,
-            text=True
-        )
-        
-        if result.returncode != 0:
-            print_err("Failed to rebuild database")
-            print(result.stderr)
-            return False
-        
-        # Show output
-        for line in result.stdout.strip().split('\n'):
-            if line.strip():
-                print(f"  {line}")
-        
+    parts_db = DATABASE_DIR / "parts.db"
+    argv = ["--configure-dbl"]
+    if parts_db.exists():
+        argv.insert(0, "--incremental")
+    
+    if plan:
+        action = "update" if parts_db.exists() else "build"
+        print_plan(f"Would {action} {parts_db} from parts.csv")
         return True
+    
+    try:
+        spec = importlib.util.spec_from_file_location("rebuild_db", rebuild_script)
+        rebuild_db = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(rebuild_db)
+        status, output = capture_output(lambda: rebuild_db.main(argv))
     except Exception as e:
         print_err(f"Error running rebuild_db.py: {e}")
         return False
+    
+    # Show output
+    for line in output.strip().split('\n'):
+        if line.strip():
+            print(f"  {line}")
+    
+    if status != 0:
+        print_err("Failed to rebuild database")
+        return False
+    return True
+
+
+def path_variables():
+    """The KiCad path variables setup configures, by name."""
+    return {
+        "KICAD9_3RD_PARTY": str(KICAD_LIB_DIR / "3rdparty"),  # the 3rdparty folder
+        "KICAD9_3DMODEL_DIR": str(MODELS_DIR),  # footprints' (model ...) paths start with this
+    }
 
 
-def configure_path_variables():
+def configure_path_variables(files):
     """Add required path variables to kicad_common.json."""
     print_step("Configuring KiCad path variables")
     
-    if not KICAD_COMMON.exists():
-        print_err(f"kicad_common.json not found: {KICAD_COMMON}")
-        return False
-    
     try:
-        with open(KICAD_COMMON, 'r') as f:
-            config = json.load(f)
+        config = files.json(KICAD_COMMON)
     except json.JSONDecodeError as e:
         print_err(f"Invalid JSON in kicad_common.json: {e}")
         return False
@@ -273,23 +633,12 @@ def configure_path_variables():
     
     # Add/update path variables
     changes = []
-    
-    # KICAD9_3RD_PARTY - points to 3rdparty folder
-    new_3rdparty = str(KICAD_LIB_DIR / "3rdparty")
-    if vars_section.get("KICAD9_3RD_PARTY") != new_3rdparty:
-        vars_section["KICAD9_3RD_PARTY"] = new_3rdparty
-        changes.append(f"KICAD9_3RD_PARTY = {new_3rdparty}")
-    
-    # KICAD9_3DMODEL_DIR - points to 3dmodels folder
-    new_3dmodel = str(MODELS_DIR)
-    if vars_section.get("KICAD9_3DMODEL_DIR") != new_3dmodel:
-        vars_section["KICAD9_3DMODEL_DIR"] = new_3dmodel
-        changes.append(f"KICAD9_3DMODEL_DIR = {new_3dmodel}")
+    for name, value in path_variables().items():
+        if vars_section.get(name) != value:
+            vars_section[name] = value
+            changes.append(f"{name} = {value}")
     
     if changes:
-        with open(KICAD_COMMON, 'w') as f:
-            json.dump(config, f, indent=2)
-        
         for change in changes:
             print_ok(change)
     else:
@@ -298,47 +647,132 @@ def configure_path_variables():
     return True
 
 
-def configure_symbol_libraries():
-    """Configure sym-lib-table with Generics, LCSC, and parts database."""
-    print_step("Configuring symbol libraries")
-    
+def lib_table_entry(name, lib_type, uri, descr, hidden=False):
+    """Build one (lib ...) row of a sym-lib-table or fp-lib-table."""
+    fields = (("name", name), ("type", lib_type), ("uri", str(uri)), ("options", ""), ("descr", descr))
+    items = [Node(key, [QuotedString(value)]) for key, value in fields]
+    if hidden:
+        items.append(Node("hidden"))
+    return Node("lib", items)
+
+
+def symbol_library_entries():
+    """Our sym-lib-table rows."""
     # Use absolute paths for reliability
     # Generics is visible (power symbols, mounting holes, etc.)
     # LCSC is hidden - only referenced by the parts database
-    sym_lib_content = f"""(sym_lib_table
-  (version 7)
-  (lib (name "Generics")(type "KiCad")(uri "{GENERICS_SYM}")(options "")(descr "Generic symbols and power"))
-  (lib (name "LCSC")(type "KiCad")(uri "{LCSC_SYM}")(options "")(descr "LCSC atomic symbols")(hidden))
-  (lib (name "parts")(type "Database")(uri "{PARTS_DBL}")(options "")(descr "LCSC parts database"))
-)
-"""
+    return [
+        lib_table_entry("Generics", "KiCad", GENERICS_SYM, "Generic symbols and power"),
+        lib_table_entry("LCSC", "KiCad", LCSC_SYM, "LCSC atomic symbols", hidden=True),
+        lib_table_entry("parts", "Database", PARTS_DBL, "LCSC parts database"),
+    ]
+
+
+def footprint_library_entries():
+    """Our fp-lib-table rows."""
+    # Use absolute path
+    return [
+        lib_table_entry("LCSC", "KiCad", LCSC_FP, "LCSC footprints"),
+    ]
+
+
+def merge_lib_table(table, entries):
+    """Add or update our (lib ...) rows in a parsed library table.
     
-    SYM_LIB_TABLE.write_text(sym_lib_content)
-    print_ok(f"Generics: {GENERICS_SYM}")
-    print_ok(f"LCSC: {LCSC_SYM} (hidden)")
-    print_ok(f"parts: {PARTS_DBL}")
+    Rows are matched by name. A matching row keeps its place in the table
+    and only the fields that differ are rewritten; libraries we don't
+    manage are left exactly as they were.
     
-    return True
+    Returns:
+        List of (name, status) with status "added", "updated" or "unchanged"
+    """
+    if table.find("version") is None:
+        table.insert(0, Node("version", ["7"]))
+    existing = {lib.value("name"): lib for lib in table.findall("lib")}
+    
+    results = []
+    for entry in entries:
+        name = entry.value("name")
+        lib = existing.get(name)
+        if lib is None:
+            table.append(entry)
+            results.append((name, "added"))
+            continue
+        
+        changed = False
+        for field in entry.children:
+            if field.head != "hidden" and lib.value(field.head) != field.items[0]:
+                lib.set(field.head, *field.items)
+                changed = True
+        hidden = lib.find("hidden")
+        if entry.find("hidden") is not None and hidden is None:
+            lib.append(Node("hidden"))
+            changed = True
+        elif entry.find("hidden") is None and hidden is not None:
+            lib.remove(hidden)
+            changed = True
+        results.append((name, "updated" if changed else "unchanged"))
+    return results
 
 
-def configure_footprint_libraries():
-    """Configure fp-lib-table with LCSC footprints."""
-    print_step("Configuring footprint libraries")
+def kicad_default_table(name):
+    """KiCad's stock global sym-lib-table or fp-lib-table, or None if not installed."""
+    for directory in KICAD_TEMPLATE_DIRS:
+        if (directory / name).is_file():
+            return directory / name
+    return None
+
+
+def configure_lib_table(files, path, table_type, entries):
+    """Merge entries into a library table, reporting each one."""
+    seed = None
+    if not path.exists():
+        # KiCad only copies its stock table in when there is no table at all,
+        # so a table holding just our rows would hide the standard libraries
+        seed = kicad_default_table(path.name)
+        if seed is None:
+            print_err(f"{path} not found, and neither is KiCad's default {path.name}")
+            print_err("Launch KiCad once so it creates its library tables, or set KICAD9_TEMPLATE_DIR, "
+                      "then run setup again")
+            return False
+        print_ok(f"Starting from KiCad's default table: {seed}")
     
-    # Use absolute path
-    fp_lib_content = f"""(fp_lib_table
-  (version 7)
-  (lib (name "LCSC")(type "KiCad")(uri "{LCSC_FP}")(options "")(descr "LCSC footprints"))
-)
-"""
+    try:
+        table = files.lib_table(path, table_type, seed)
+    except ValueError as e:
+        print_err(f"Could not parse {path}: {e}")
+        print_err("Fix or remove it and run setup again (other libraries would be lost otherwise)")
+        return False
     
-    FP_LIB_TABLE.write_text(fp_lib_content)
-    print_ok(f"LCSC: {LCSC_FP}")
+    for (name, status), entry in zip(merge_lib_table(table, entries), entries):
+        hidden = " (hidden)" if entry.find("hidden") is not None else ""
+        if status == "unchanged":
+            print_ok(f"{name}: already configured{hidden}")
+        else:
+            print_ok(f"{name}: {entry.value('uri')}{hidden} ({status})")
     
+    names = {entry.value("name") for entry in entries}
+    others = sum(1 for lib in table.findall("lib") if lib.value("name") not in names)
+    if others:
+        print_ok(f"Kept {others} other librar{'y' if others == 1 else 'ies'}")
     return True
 
 
-def configure_hotkeys():
+def configure_symbol_libraries(files):
+    """Add Generics, LCSC, and parts database to sym-lib-table."""
+    print_step("Configuring symbol libraries")
+    
+    return configure_lib_table(files, SYM_LIB_TABLE, "sym_lib_table", symbol_library_entries())
+
+
+def configure_footprint_libraries(files):
+    """Add LCSC footprints to fp-lib-table."""
+    print_step("Configuring footprint libraries")
+    
+    return configure_lib_table(files, FP_LIB_TABLE, "fp_lib_table", footprint_library_entries())
+
+
+def configure_hotkeys(files):
     """Apply power-user hotkey bindings and remove conflicting hotkeys."""
     print_step("Configuring hotkeys")
     
@@ -348,7 +782,7 @@ def configure_hotkeys():
         return True  # Non-fatal
     
     # Read and parse
-    lines = HOTKEYS_FILE.read_text().splitlines()
+    lines = files.text(HOTKEYS_FILE).splitlines()
     new_lines = []
     changes_made = []
     
@@ -375,8 +809,7 @@ def configure_hotkeys():
         else:
             new_lines.append(line)
     
-    # Write
-    HOTKEYS_FILE.write_text("\n".join(new_lines) + "\n")
+    files.set_text(HOTKEYS_FILE, "\n".join(new_lines) + "\n")
     
     if changes_made:
         for action, old, new in changes_made:
@@ -387,17 +820,12 @@ def configure_hotkeys():
     return True
 
 
-def configure_mouse_settings():
+def configure_mouse_settings(files):
     """Configure mouse and touchpad pan/zoom settings in kicad_common.json."""
     print_step("Configuring mouse and touchpad settings")
     
-    if not KICAD_COMMON.exists():
-        print_err(f"kicad_common.json not found: {KICAD_COMMON}")
-        return False
-    
     try:
-        with open(KICAD_COMMON, 'r') as f:
-            config = json.load(f)
+        config = files.json(KICAD_COMMON)
     except json.JSONDecodeError as e:
         print_err(f"Invalid JSON in kicad_common.json: {e}")
         return False
@@ -426,8 +854,6 @@ def configure_mouse_settings():
         changes.append(f"auto_pan_acceleration = {auto_pan_speed} (3 of 9)")
     
     if changes:
-        with open(KICAD_COMMON, 'w') as f:
-            json.dump(config, f, indent=2)
         for change in changes:
             print_ok(change)
     else:
@@ -436,20 +862,16 @@ def configure_mouse_settings():
     return True
 
 
-def configure_eeschema_settings():
+def configure_eeschema_settings(files):
     """Configure schematic editor display options in eeschema.json."""
     print_step("Configuring schematic editor settings")
     
     # Load existing config or create new
-    if EESCHEMA_JSON.exists():
-        try:
-            with open(EESCHEMA_JSON, 'r') as f:
-                config = json.load(f)
-        except json.JSONDecodeError as e:
-            print_warn(f"Invalid JSON in eeschema.json, creating new: {e}")
-            config = {}
-    else:
-        config = {}
+    try:
+        config = files.json(EESCHEMA_JSON)
+    except json.JSONDecodeError as e:
+        print_warn(f"Invalid JSON in eeschema.json, creating new: {e}")
+        config = files.json(EESCHEMA_JSON, reset=True)
     
     changes = []
     
@@ -501,8 +923,6 @@ def configure_eeschema_settings():
         changes.append("color_theme = user")
     
     if changes:
-        with open(EESCHEMA_JSON, 'w') as f:
-            json.dump(config, f, indent=2)
         for change in changes:
             print_ok(change)
     else:
@@ -511,13 +931,10 @@ def configure_eeschema_settings():
     return True
 
 
-def configure_color_theme():
+def configure_color_theme(files):
     """Create or update user color theme for schematic editor."""
     print_step("Configuring schematic color theme")
     
-    # Create colors directory if needed
-    COLORS_DIR.mkdir(parents=True, exist_ok=True)
-    
     theme_file = COLORS_DIR / "user.json"
     
     # Default color for all unspecified items (white)
@@ -576,14 +993,10 @@ def configure_color_theme():
     }
     
     # Load existing theme or create new
-    if theme_file.exists():
-        try:
-            with open(theme_file, 'r') as f:
-                theme = json.load(f)
-        except json.JSONDecodeError:
-            theme = {}
-    else:
-        theme = {}
+    try:
+        theme = files.json(theme_file)
+    except json.JSONDecodeError:
+        theme = files.json(theme_file, reset=True)
     
     # Ensure structure exists
     if "meta" not in theme:
@@ -601,10 +1014,6 @@ def configure_color_theme():
                        "component_outline", "pin", "sheet", "brightened", "shadow"]:
                 changes.append(key)
     
-    # Write theme file
-    with open(theme_file, 'w') as f:
-        json.dump(theme, f, indent=2)
-    
     if changes:
         print_ok(f"Updated color theme: {theme_file.name}")
         print_ok("Background: black")
@@ -620,11 +1029,151 @@ def configure_color_theme():
     return True
 
 
-def patch_project_file(project_path):
-    """Patch a .kicad_pro file to set default text size to 40 mil.
+def patch_text_size(files, project):
+    """Set the schematic default text size (labels, text, text boxes) to 40 mil."""
+    config = files.json(project)
+    
+    # Ensure schematic.drawing structure exists
+    if "schematic" not in config or config["schematic"] is None:
+        config["schematic"] = {}
+    if "drawing" not in config["schematic"] or config["schematic"]["drawing"] is None:
+        config["schematic"]["drawing"] = {}
+    
+    drawing = config["schematic"]["drawing"]
+    old_size = drawing.get("default_text_size")
+    if old_size == DEFAULT_TEXT_SIZE:
+        return []
+    
+    drawing["default_text_size"] = DEFAULT_TEXT_SIZE
+    if old_size:
+        return [f"Changed default_text_size: {old_size} → {DEFAULT_TEXT_SIZE:.0f} mil"]
+    return [f"Set default_text_size: {DEFAULT_TEXT_SIZE:.0f} mil"]
+
+
+@lru_cache(maxsize=None)
+def template_net_settings():
+    """The net_settings of the JLCPCB_4Layer template (installed copy, else this checkout's).
+    
+    Raises:
+        ValueError: if neither copy of the template exists or is valid JSON
+    """
+    for template_dir in (TEMPLATE_DIR, LCSC_DIR.parent.parent / "template" / "JLCPCB_4Layer"):
+        template_pro = template_dir / "JLCPCB_4Layer.kicad_pro"
+        if template_pro.exists():
+            with open(template_pro, 'r') as f:
+                return json.load(f).get("net_settings") or {}
+    raise ValueError(f"Project template not found: {TEMPLATE_DIR}")
+
+
+def patch_netclass_defaults(files, project):
+    """Bring netclasses and netclass patterns in line with the JLCPCB_4Layer template.
+    
+    Template classes (Default, Power, High_Current) are added if missing and
+    their fields reset to the template's values; other classes and patterns
+    in the project are kept.
+    """
+    config = files.json(project)
+    template = template_net_settings()
+    net_settings = config.get("net_settings")
+    if not net_settings:
+        return []
+    
+    changes = []
+    classes = net_settings.setdefault("classes", [])
+    by_name = {netclass.get("name"): netclass for netclass in classes}
+    for wanted in template.get("classes") or []:
+        netclass = by_name.get(wanted["name"])
+        if netclass is None:
+            classes.append(copy.deepcopy(wanted))
+            changes.append(f"Added netclass {wanted['name']}")
+            continue
+        fields = [key for key, value in wanted.items() if netclass.get(key) != value]
+        if fields:
+            netclass.update((key, wanted[key]) for key in fields)
+            changes.append(f"Netclass {wanted['name']}: {', '.join(fields)}")
+    
+    if template.get("netclass_patterns"):
+        if net_settings.get("netclass_patterns") is None:
+            net_settings["netclass_patterns"] = []
+        patterns = net_settings["netclass_patterns"]
+        for wanted in template["netclass_patterns"]:
+            if wanted not in patterns:
+                patterns.append(dict(wanted))
+                changes.append(f"Added netclass pattern {wanted['pattern']} → {wanted['netclass']}")
+    return changes
+
+
+def expand_kicad_path(uri, project):
+    """Resolve a library URI the way KiCad would with this setup's path variables."""
+    variables = {"KIPRJMOD": str(project.parent), **path_variables()}
+    expanded = re.sub(r'\$\{(\w+)\}', lambda m: variables.get(m.group(1), os.environ.get(m.group(1), m.group())), uri)
+    return Path(expanded).expanduser().resolve()
+
+
+def patch_library_references(files, project):
+    """Point the project's own sym-lib-table/fp-lib-table rows for our libraries at this install.
+    
+    Only rows that already exist are touched, and only when their URI does
+    not resolve to the installed library; projects without a table of
+    their own use the global one.
+    """
+    changes = []
+    for table_path, table_type, entries in (
+        (project.parent / "sym-lib-table", "sym_lib_table", symbol_library_entries()),
+        (project.parent / "fp-lib-table", "fp_lib_table", footprint_library_entries()),
+    ):
+        if not table_path.exists():
+            continue
+        table = files.lib_table(table_path, table_type)
+        uris = {entry.value("name"): entry.value("uri") for entry in entries}
+        for lib in table.findall("lib"):
+            name = lib.value("name")
+            uri = uris.get(name)
+            if uri is None or lib.value("uri") is None:
+                continue
+            if expand_kicad_path(lib.value("uri"), project) != Path(uri).resolve():
+                lib.set("uri", QuotedString(uri))
+                changes.append(f"{table_path.name}: {name} → {uri}")
+    return changes
+
+
+# --patch NAME -> function(files, project) that edits the project's files
+# through files and returns a description of each change it made
+PROJECT_PATCHES = {
+    "text-size": patch_text_size,
+    "netclass": patch_netclass_defaults,
+    "libraries": patch_library_references,
+}
+DEFAULT_PROJECT_PATCHES = ["text-size"]
+
+
+def patch_project(project, patches, plan=False):
+    """Apply patches to one .kicad_pro (and its lib tables), writing what changed.
+    
+    Returns:
+        ([(patch name, change)], {path: diff}) - the diffs only when plan is set
+    
+    Raises:
+        ValueError: on invalid JSON, a malformed lib table or a missing template
+        OSError: if a file cannot be read or written
+    """
+    files = ConfigFiles()
+    changes = []
+    for name in patches:
+        changes.extend((name, change) for change in PROJECT_PATCHES[name](files, project))
+    if plan:
+        return changes, files.diff()
+    files.commit()
+    return changes, {}
+
+
+def patch_project_file(project_path, patches=DEFAULT_PROJECT_PATCHES, plan=False):
+    """Patch a .kicad_pro file (by default, set default text size to 40 mil).
     
     Args:
         project_path: Path to .kicad_pro file or directory containing one
+        patches: Names of PROJECT_PATCHES to apply
+        plan: Print the diff instead of writing the file
         
     Returns:
         True on success, False on error
@@ -639,6 +1188,7 @@ def patch_project_file(project_path):
             return False
         if len(pro_files) > 1:
             print_warn(f"Multiple .kicad_pro files found, using: {pro_files[0].name}")
+            print_warn("Use --patch-tree to patch all of them")
         project_path = pro_files[0]
     
     if not project_path.exists():
@@ -652,39 +1202,100 @@ def patch_project_file(project_path):
     print_step(f"Patching project: {project_path.name}")
     
     try:
-        with open(project_path, 'r') as f:
-            config = json.load(f)
+        changes, diffs = patch_project(project_path, patches, plan)
     except json.JSONDecodeError as e:
         print_err(f"Invalid JSON: {e}")
         return False
+    except (ValueError, OSError) as e:
+        print_err(str(e))
+        return False
     
-    # Ensure schematic.drawing structure exists
-    if "schematic" not in config or config["schematic"] is None:
-        config["schematic"] = {}
-    if "drawing" not in config["schematic"] or config["schematic"]["drawing"] is None:
-        config["schematic"]["drawing"] = {}
+    for _, change in changes:
+        print_ok(change)
+    if not changes:
+        print_ok("Already up to date")
+    if plan:
+        print_diffs(diffs)
     
-    drawing = config["schematic"]["drawing"]
-    old_size = drawing.get("default_text_size")
-    
-    if old_size == DEFAULT_TEXT_SIZE:
-        print_ok(f"Already set to {DEFAULT_TEXT_SIZE:.0f} mil")
-        return True
+    return True
+
+
+def find_projects(root):
+    """Yield every .kicad_pro under root, skipping hidden directories and symlinks."""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith("."):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith(".kicad_pro") and entry.is_file(follow_symlinks=False):
+                        yield Path(entry.path)
+        except OSError as e:
+            print_warn(f"Skipping {directory}: {e.strerror}")
+
+
+def patch_tree(root, patches=DEFAULT_PROJECT_PATCHES, jobs=8, plan=False):
+    """Patch every .kicad_pro under a directory tree, several at a time.
     
-    drawing["default_text_size"] = DEFAULT_TEXT_SIZE
+    Returns:
+        True if every project was patched (or already up to date)
+    """
+    root = Path(root).expanduser().resolve()
+    if not root.is_dir():
+        print_err(f"Not a directory: {root}")
+        return False
     
-    with open(project_path, 'w') as f:
-        json.dump(config, f, indent=2)
+    print_step(f"Patching projects under {root}")
     
-    if old_size:
-        print_ok(f"Changed default_text_size: {old_size} → {DEFAULT_TEXT_SIZE:.0f} mil")
-    else:
-        print_ok(f"Set default_text_size: {DEFAULT_TEXT_SIZE:.0f} mil")
+    projects = sorted(find_projects(root))
+    if not projects:
+        print_warn("No .kicad_pro files found")
+        return True
     
-    return True
+    def patch(project):
+        try:
+            return patch_project(project, patches, plan), None
+        except json.JSONDecodeError as e:
+            return None, f"Invalid JSON: {e}"
+        except (ValueError, OSError) as e:
+            return None, str(e)
+    
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        results = list(pool.map(patch, projects))
+    
+    patched = failed = 0
+    per_patch = dict.fromkeys(patches, 0)
+    for project, (result, error) in zip(projects, results):
+        name = project.relative_to(root)
+        if error is not None:
+            print_err(f"{name}: {error}")
+            failed += 1
+            continue
+        changes, diffs = result
+        if not changes:
+            continue
+        patched += 1
+        for patch_name in {patch_name for patch_name, _ in changes}:
+            per_patch[patch_name] += 1
+        print_ok(f"{name}: {'; '.join(change for _, change in changes)}")
+        if plan:
+            print_diffs(diffs)
+    
+    unchanged = len(projects) - patched - failed
+    print()
+    print(f"  {len(projects)} projects: {patched} {'to patch' if plan else 'patched'}, "
+          f"{unchanged} already up to date, {failed} failed")
+    for patch_name, count in per_patch.items():
+        print(f"    {patch_name}: {count}")
+    
+    return failed == 0
 
 
-def configure_project_template():
+def configure_project_template(files):
     """Configure default schematic settings in the JLCPCB_4Layer project template."""
     print_step("Configuring project template defaults")
     
@@ -696,8 +1307,7 @@ def configure_project_template():
         return True  # Non-fatal
     
     try:
-        with open(template_pro, 'r') as f:
-            config = json.load(f)
+        config = files.json(template_pro)
     except json.JSONDecodeError as e:
         print_err(f"Invalid JSON in template: {e}")
         return False
@@ -718,8 +1328,6 @@ def configure_project_template():
         changes.append(f"default_text_size = {DEFAULT_TEXT_SIZE:.0f} mil")
     
     if changes:
-        with open(template_pro, 'w') as f:
-            json.dump(config, f, indent=2)
         for change in changes:
             print_ok(change)
     else:
@@ -728,6 +1336,99 @@ def configure_project_template():
     return True
 
 
+def print_diffs(diffs):
+    """Print {path: diff} as returned by ConfigFiles.diff()."""
+    for path, diff in diffs.items():
+        print_plan(f"Would write {path}")
+        print(diff, end="")
+    if not diffs:
+        print_plan("All files already up to date, nothing would be written")
+
+
+def write_config(files, plan=False):
+    """Write every config file the configure steps changed."""
+    print_step("Writing configuration")
+    
+    if plan:
+        print_diffs(files.diff())
+        return True
+    
+    try:
+        written, unchanged = files.commit()
+    except OSError as e:
+        print_err(f"Could not write {e.filename}: {e.strerror}")
+        return False
+    
+    for path in written:
+        print_ok(f"Wrote {path}")
+    if not written:
+        print_ok(f"All {len(unchanged)} files already up to date, nothing written")
+    elif unchanged:
+        print_ok(f"{len(unchanged)} unchanged, left untouched")
+    
+    return True
+
+
+class Step(NamedTuple):
+    """A setup step: func() runs once every step named in after has succeeded."""
+    name: str
+    func: Callable[[], bool]
+    after: tuple = ()
+    failure: str = ""
+
+
+def run_steps(steps, jobs):
+    """Run steps in dependency order, independent ones concurrently.
+    
+    No new step is started after one fails; those already running finish.
+    
+    Returns:
+        The first step that failed, or None
+    """
+    names = {step.name for step in steps}
+    for step in steps:
+        unknown = set(step.after) - names
+        if unknown:
+            raise ValueError(f"step {step.name} depends on unknown steps: {', '.join(sorted(unknown))}")
+    
+    def run(step):
+        try:
+            return bool(step.func())
+        except Exception as e:
+            print_err(f"{type(e).__name__}: {e}")
+            return False
+    
+    output = StepOutput(sys.stdout)
+    sys.stdout = output
+    try:
+        pending = list(steps)
+        running = {}
+        done = set()
+        failed = None
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            while pending or running:
+                if failed is None:
+                    for step in [s for s in pending if done.issuperset(s.after)]:
+                        pending.remove(step)
+                        running[pool.submit(output.capture, lambda step=step: run(step))] = step
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    step = running.pop(future)
+                    ok, text = future.result()
+                    output.emit(text)
+                    if ok:
+                        done.add(step.name)
+                    elif failed is None:
+                        failed = step
+        if failed is None and pending:
+            raise ValueError(f"dependency cycle among steps: {', '.join(s.name for s in pending)}")
+        return failed
+    finally:
+        sys.stdout = output.stream
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="KiCad LCSC Library Setup",
@@ -735,84 +1436,109 @@ def main():
         epilog="""
 Examples:
   python3 setup_kicad.py                    # Full setup
+  python3 setup_kicad.py --plan             # Show what a full setup would change
+  python3 setup_kicad.py --yes              # Headless: install ODBC drivers without asking
   python3 setup_kicad.py --patch-project .  # Patch current directory's project
   python3 setup_kicad.py --patch-project ~/Projects/flipdots/hardware/flipdots
+  python3 setup_kicad.py --patch-tree ~/Projects --patch text-size --patch netclass --plan
 """
     )
-    parser.add_argument(
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument(
         "--patch-project", "-p",
         metavar="PATH",
-        help="Patch an existing project's .kicad_pro to use 40 mil text (skips full setup)"
+        help="Patch an existing project's .kicad_pro, by default to use 40 mil text (skips full setup)"
+    )
+    target.add_argument(
+        "--patch-tree", "-t",
+        metavar="DIR",
+        help="Patch every .kicad_pro under DIR, several at a time (skips full setup)"
+    )
+    parser.add_argument(
+        "--patch",
+        action="append",
+        choices=list(PROJECT_PATCHES),
+        help="Project patch to apply with --patch-project/--patch-tree; repeatable "
+             f"(default: {', '.join(DEFAULT_PROJECT_PATCHES)})"
+    )
+    parser.add_argument(
+        "--plan", "-n",
+        action="store_true",
+        help="Dry run: install nothing, rebuild nothing, and print the diff of each file that would change"
+    )
+    parser.add_argument(
+        "--yes", "-y",
+        action="store_true",
+        help="Install missing ODBC drivers without prompting"
+    )
+    parser.add_argument(
+        "--jobs", "-j",
+        type=int,
+        default=8,
+        help="Maximum number of steps to run at once (default: 8)"
     )
     args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
     
-    # If --patch-project specified, just patch and exit
+    # If --patch-project or --patch-tree specified, just patch and exit
+    patches = list(dict.fromkeys(args.patch or DEFAULT_PROJECT_PATCHES))
     if args.patch_project:
-        success = patch_project_file(args.patch_project)
+        success = patch_project_file(args.patch_project, patches, args.plan)
         return 0 if success else 1
+    if args.patch_tree:
+        success = patch_tree(args.patch_tree, patches, args.jobs, args.plan)
+        return 0 if success else 1
+    if args.patch:
+        parser.error("--patch needs --patch-project or --patch-tree")
     
     print("\n" + "="*60)
-    print("  KiCad LCSC Library Setup")
+    print(f"  KiCad LCSC Library Setup{' (plan only)' if args.plan else ''}")
     print("="*60)
-    
-    # Check prerequisites
-    if not check_prerequisites():
-        print("\nSetup failed: missing prerequisites")
-        return 1
-    
-    # Check/install ODBC
-    if not check_odbc_installed():
-        response = input("\nInstall ODBC drivers via Homebrew? [Y/n]: ").strip().lower()
-        if response in ('', 'y', 'yes'):
-            if not install_odbc():
-                print("\nSetup failed: could not install ODBC")
-                return 1
-        else:
-            print("\nSetup cancelled: ODBC drivers required")
-            return 1
-    
-    # Configure ODBC
-    if not configure_odbcinst():
-        print("\nSetup failed: could not configure ODBC")
+    print(f"  Preferences: {KICAD_PREFS_DIR}")
+    print(f"  Library:     {LCSC_DIR}")
+    
+    # KiCad config edits are staged in files, then written together by the last step
+    files = ConfigFiles()
+    steps = [
+        Step("prerequisites", check_prerequisites,
+             failure="missing prerequisites"),
+        Step("odbc", partial(ensure_odbc, args.yes, args.plan), ("prerequisites",),
+             "ODBC drivers not installed"),
+        Step("odbcinst", partial(configure_odbcinst, files, args.plan), ("odbc",),
+             "could not configure ODBC"),
+        Step("database", partial(rebuild_database, args.plan), ("prerequisites",),
+             "could not rebuild database"),
+        Step("path_variables", partial(configure_path_variables, files), ("prerequisites",),
+             "could not configure path variables"),
+        Step("symbol_libraries", partial(configure_symbol_libraries, files), ("prerequisites",),
+             "could not configure symbol libraries"),
+        Step("footprint_libraries", partial(configure_footprint_libraries, files), ("prerequisites",),
+             "could not configure footprint libraries"),
+        Step("hotkeys", partial(configure_hotkeys, files), ("prerequisites",),
+             "could not configure hotkeys"),
+        # Also edits kicad_common.json, so it waits for path_variables
+        Step("mouse", partial(configure_mouse_settings, files), ("path_variables",),
+             "could not configure mouse settings"),
+        Step("eeschema", partial(configure_eeschema_settings, files), ("prerequisites",),
+             "could not configure schematic editor settings"),
+        Step("color_theme", partial(configure_color_theme, files), ("prerequisites",),
+             "could not configure color theme"),
+        Step("template", partial(configure_project_template, files), ("prerequisites",),
+             "could not configure project template"),
+    ]
+    steps.append(Step("write_config", partial(write_config, files, args.plan),
+                      tuple(step.name for step in steps),
+                      "could not write KiCad configuration"))
+    
+    failed = run_steps(steps, args.jobs)
+    if failed is not None:
+        print(f"\nSetup failed: {failed.failure}")
         return 1
     
-    # Rebuild database
-    if not rebuild_database():
-        print("\nSetup failed: could not rebuild database")
-        return 1
-    
-    # Configure KiCad
-    if not configure_path_variables():
-        print("\nSetup failed: could not configure path variables")
-        return 1
-    
-    if not configure_symbol_libraries():
-        print("\nSetup failed: could not configure symbol libraries")
-        return 1
-    
-    if not configure_footprint_libraries():
-        print("\nSetup failed: could not configure footprint libraries")
-        return 1
-    
-    if not configure_hotkeys():
-        print("\nSetup failed: could not configure hotkeys")
-        return 1
-    
-    if not configure_mouse_settings():
-        print("\nSetup failed: could not configure mouse settings")
-        return 1
-    
-    if not configure_eeschema_settings():
-        print("\nSetup failed: could not configure schematic editor settings")
-        return 1
-    
-    if not configure_color_theme():
-        print("\nSetup failed: could not configure color theme")
-        return 1
-    
-    if not configure_project_template():
-        print("\nSetup failed: could not configure project template")
-        return 1
+    if args.plan:
+        print("\nPlan complete: nothing was installed, rebuilt or written.")
+        return 0
     
     print("\n" + "="*60)
     print("  Setup complete!")
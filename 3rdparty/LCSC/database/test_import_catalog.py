@@ -0,0 +1,56 @@
+"""
+Tests for import_catalog.py's merge into parts.csv
+
+Run from this directory:
+    python -m pytest test_import_catalog.py
+"""
+
+import shutil
+
+import pytest
+
+import import_catalog as importer
+
+
+def merge(csv_path, catalog_path, tmp_path):
+    """Merge catalog_path into csv_path in place, as the command line does."""
+    return importer.merge_catalog(csv_path, catalog_path, csv_path, tmp_path / "changelog.csv",
+                                  importer.FIELD_RULES, importer.COLUMN_MAP)
+
+
+@pytest.fixture
+def parts(tmp_path):
+    """A canonical copy of parts.csv: merged once, so sorted and LF-terminated."""
+    path = tmp_path / "parts.csv"
+    shutil.copy(importer.CSV_PATH, path)
+    catalog = tmp_path / "catalog.csv"
+    catalog.write_bytes(path.read_bytes().splitlines(keepends=True)[0])
+    merge(path, catalog, tmp_path)
+    return path
+
+
+def test_merge_without_changes_keeps_parts_csv_identical(parts, tmp_path):
+    before = parts.read_bytes()
+    assert b"\r" not in before
+
+    catalog = tmp_path / "catalog.csv"
+    shutil.copy(parts, catalog)
+    stats = merge(parts, catalog, tmp_path)
+
+    assert stats["updated"] == stats["added"] == stats["removed"] == 0
+    assert parts.read_bytes() == before
+    assert (tmp_path / "changelog.csv").read_bytes() == b"action,LCSC,column,old,new\n"
+
+
+def test_repeated_lcsc_numbers_write_nothing(parts, tmp_path):
+    lines = parts.read_text(encoding="utf-8").splitlines(keepends=True)
+    parts.write_text("".join(lines + lines[1:2]), encoding="utf-8")
+    before = parts.read_bytes()
+    key = lines[1].split(",", 1)[0]
+    (tmp_path / "changelog.csv").unlink()
+
+    with pytest.raises(ValueError, match=f"{key} on lines 2, {len(lines) + 1}"):
+        merge(parts, parts, tmp_path)
+
+    assert parts.read_bytes() == before
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["catalog.csv", "parts.csv"]
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Validate parts.csv references against the symbol, footprint and 3D model trees
+
+Every parts.csv row names a symbol (Generics:R, LCSC:ESP32-S3) and a
+footprint (LCSC:R_smd_chip_0603), and every footprint names its 3D models
+(${KICAD9_3DMODEL_DIR}/R0603.step). This tool indexes symbols/*.kicad_sym,
+footprints/*.pretty and 3dmodels/ once, then checks each row with set
+lookups and reports dangling references as JSON.
+
+Asset files are parsed on a process pool when there are many to parse,
+and per-file results are cached in .library_cache.json (shared with
+model_index.py, see library_index.py), so repeated runs only re-parse
+files that actually changed.
+
+Run from any directory:
+    python3 validate_library.py                       # JSON report on stdout
+    python3 validate_library.py --output report.json
+    python3 validate_library.py --require-datasheets  # missing PDFs are errors
+    python3 validate_library.py --no-cache --jobs 1
+
+Exit status is 1 if any symbol, footprint or 3D model reference dangles.
+Missing datasheets are reported but only fail with --require-datasheets,
+since datasheets are not distributed with the library.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from library_index import (LCSC_DIR, MODEL_EXTENSIONS, MODELS_DIR, list_files, load_cache,
+                           resolve_model_path, save_cache, scan_files, scan_text)
+
+# Script directory (where parts.csv lives)
+SCRIPT_DIR = Path(__file__).parent.resolve()
+CSV_PATH = SCRIPT_DIR / "parts.csv"
+DATASHEETS_DIR = LCSC_DIR / "datasheets"
+
+# The files this tool indexes, by kind
+ASSET_KINDS = ("symbols", "footprint")
+
+
+def index_assets(jobs, use_cache=True):
+    """Parse (or load from cache) every symbol library and footprint file.
+
+    Returns:
+        (results, stats) where results maps path string -> (kind, parse
+        result) and stats counts cached, rehashed and scanned files
+    """
+    cache = load_cache() if use_cache else {}
+    files = [item for kind in ASSET_KINDS for item in list_files(kind)]
+    scanned, entries, stats = scan_files(files, scan_text, jobs, cache)
+    if use_cache:
+        save_cache(cache, entries, set(ASSET_KINDS))
+    return {key: (entries[key]["kind"], result) for key, result in scanned.items()}, stats
+
+
+def build_index(results):
+    """Build nickname -> name sets for symbols and footprints, plus model refs.
+
+    Returns:
+        (symbols, footprints, models) where symbols and footprints map a
+        library nickname to a set of names, and models maps "LIB:footprint"
+        to its list of model paths
+    """
+    symbols = {}
+    footprints = {}
+    models = {}
+    for key, (kind, result) in results.items():
+        path = Path(key)
+        if kind == "symbols":
+            symbols[path.stem] = set(result)
+        else:
+            lib = path.parent.stem
+            footprints.setdefault(lib, set()).add(path.stem)
+            models[f"{lib}:{path.stem}"] = [model["path"] for model in result["models"]]
+    return symbols, footprints, models
+
+
+def check_reference(ref, index):
+    """Check a "LIB:name" reference against a nickname -> names index.
+
+    Returns:
+        None if the reference resolves, else a short reason string
+    """
+    if not ref:
+        return "empty"
+    if ':' not in ref:
+        return "missing library nickname"
+    lib, name = ref.split(':', 1)
+    if lib not in index:
+        return f"library {lib} not found"
+    if name not in index[lib]:
+        return "not found in library"
+    return None
+
+
+def resolve_datasheet(datasheet):
+    """Return True if a Datasheet cell points at an existing file (or a URL)."""
+    if datasheet.startswith(("http://", "https://")):
+        return True
+    path = Path(datasheet)
+    if not path.is_absolute():
+        path = LCSC_DIR / path
+    # Absolute paths from another workstation: look in our datasheets/ too
+    return path.exists() or (DATASHEETS_DIR / path.name).exists()
+
+
+def validate(csv_path, symbols, footprints, models):
+    """Check every parts.csv row and every footprint's model references.
+
+    Returns:
+        Report dict with dangling symbols, footprints, models and datasheets
+    """
+    report = {"symbols": [], "footprints": [], "models": [], "datasheets": []}
+    rows = 0
+
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            rows += 1
+            line = reader.line_num
+            lcsc = row.get("LCSC") or ""
+            for column, index, key in (("Symbol", symbols, "symbols"),
+                                       ("Footprint", footprints, "footprints")):
+                ref = row.get(column) or ""
+                reason = check_reference(ref, index)
+                if reason:
+                    report[key].append({"line": line, "lcsc": lcsc, "ref": ref, "reason": reason})
+            datasheet = row.get("Datasheet") or ""
+            if datasheet and not resolve_datasheet(datasheet):
+                report["datasheets"].append({"line": line, "lcsc": lcsc, "path": datasheet})
+
+    model_dir_files = {str(p) for p in MODELS_DIR.rglob("*") if p.suffix.lower() in MODEL_EXTENSIONS}
+    for footprint, paths in sorted(models.items()):
+        for model in paths:
+            resolved, _ = resolve_model_path(model)
+            if str(resolved) not in model_dir_files and not resolved.exists():
+                report["models"].append({"footprint": footprint, "model": model,
+                                         "resolved": str(resolved)})
+
+    report["summary"] = {
+        "rows": rows,
+        "symbols": len(report["symbols"]),
+        "footprints": len(report["footprints"]),
+        "models": len(report["models"]),
+        "datasheets": len(report["datasheets"]),
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check parts.csv symbol/footprint/model/datasheet references"
+    )
+    parser.add_argument(
+        "--csv",
+        type=Path,
+        default=CSV_PATH,
+        help="Path to parts.csv (default: next to this script)"
+    )
+    parser.add_argument(
+        "--output", "-o",
+        type=Path,
+        help="Write the JSON report to a file instead of stdout"
+    )
+    parser.add_argument(
+        "--jobs", "-j",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes for parsing asset files (default: CPU count)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore and do not update .library_cache.json"
+    )
+    parser.add_argument(
+        "--require-datasheets",
+        action="store_true",
+        help="Treat missing datasheet files as errors"
+    )
+    args = parser.parse_args()
+
+    if not args.csv.exists():
+        print(f"ERROR: {args.csv} not found", file=sys.stderr)
+        return 1
+
+    start = time.perf_counter()
+    results, stats = index_assets(args.jobs, use_cache=not args.no_cache)
+    symbols, footprints, models = build_index(results)
+    report = validate(args.csv, symbols, footprints, models)
+    elapsed = time.perf_counter() - start
+
+    print(f"Indexed {stats['files']} files ({stats['cached']} cached, "
+          f"{stats['rehashed']} unchanged content, {stats['scanned']} parsed) "
+          f"in {elapsed * 1000:.0f} ms", file=sys.stderr)
+    summary = report["summary"]
+    print(f"Checked {summary['rows']} rows: {summary['symbols']} dangling symbols, "
+          f"{summary['footprints']} dangling footprints, {summary['models']} missing models, "
+          f"{summary['datasheets']} missing datasheets", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding='utf-8')
+    else:
+        print(text)
+
+    failed = summary["symbols"] or summary["footprints"] or summary["models"]
+    if args.require_datasheets and summary["datasheets"]:
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    exit(main())
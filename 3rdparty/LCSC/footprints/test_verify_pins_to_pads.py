@@ -0,0 +1,77 @@
+"""
+Tests for verify_pins_to_pads.py's --geometry pad analysis and --watch
+
+Run from this directory:
+    python -m pytest test_verify_pins_to_pads.py
+"""
+
+from pathlib import Path
+
+import pytest
+
+import verify_pins_to_pads as verify
+
+PRETTY_DIR = Path(__file__).parent.resolve() / "LCSC.pretty"
+
+# Footprints with unnumbered thermal vias on their exposed pad
+THERMAL_VIA_FOOTPRINTS = ["U_smd_HTSSOP_32P", "U_smd_WSON_8P"]
+
+
+@pytest.fixture(params=["numpy", "python"])
+def analyze(request, monkeypatch):
+    """analyze_pad_geometry, batched with NumPy and in pure Python."""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(verify, "np", None)
+    return verify.analyze_pad_geometry
+
+
+@pytest.mark.parametrize("name", THERMAL_VIA_FOOTPRINTS)
+def test_thermal_vias_are_not_stacked_pads(analyze, name):
+    footprint = verify.parse_footprint_file(PRETTY_DIR / f"{name}.kicad_mod")
+    analyze([footprint])
+
+    exposed = [footprint.pads[i] for i in footprint.exposed_pads]
+    assert [pad.number for pad in exposed] == [max(footprint.pad_numbers, key=int)]
+    assert footprint.stacked_pads == []
+
+    symbol = verify.Symbol(name=name, footprint=f"LCSC:{name}",
+                           pin_numbers=set(footprint.pad_numbers))
+    assert verify.pad_geometry_issues(symbol, footprint) == []
+
+
+def test_numbered_pads_sharing_a_position_are_stacked(analyze):
+    text = """(footprint "T"
+        (pad "1" smd rect (at 0 0) (size 1 1) (layers "F.Cu"))
+        (pad "2" smd rect (at 0 0) (size 1 1) (layers "F.Cu"))
+        (pad "" smd rect (at 2 0) (size 1 1) (layers "F.Cu"))
+        (pad "3" smd rect (at 2 0) (size 1 1) (layers "F.Cu"))
+    )"""
+    footprint = verify.parse_footprint_text("T", text)
+    analyze([footprint])
+    assert footprint.stacked_pads == [(0, 1)]
+
+
+SYMBOL_LIB = """(kicad_symbol_lib
+    (symbol "X"
+        (property "Footprint" "{footprint}")
+        (symbol "X_1_1"
+            (pin passive line (at 0 0 0) (length 2.54) (name "A") (number "1"))
+        )
+    )
+)"""
+
+
+@pytest.mark.parametrize("search, status", [(True, "MISMATCH"), (False, "FOOTPRINT_NOT_FOUND")])
+def test_watch_resolves_bare_footprint_names_like_a_batch_run(tmp_path, search, status):
+    symbols = tmp_path / "test.kicad_sym"
+    symbols.write_text(SYMBOL_LIB.format(footprint="U_smd_WSON_8P"), encoding="utf-8")
+    session = verify.WatchSession([symbols], [("LCSC", PRETTY_DIR)], False, None, search=search)
+    assert [new.status for _, new in session.load()] == [status]
+
+    # A symbol edited to reference a footprint not loaded yet
+    symbols.write_text(SYMBOL_LIB.format(footprint="U_smd_HTSSOP_32P"), encoding="utf-8")
+    changes = session.apply({symbols.resolve()})
+    assert all(new.status == status for _, new in changes)
+    assert [result.status for result in session.results.values()] == [status]
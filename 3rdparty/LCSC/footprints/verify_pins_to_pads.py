@@ -7,24 +7,63 @@ assigned footprint. Reports mismatches to catch errors during symbol editing.
 
 Usage:
     python verify_pins_to_pads.py [options]
+    python verify_pins_to_pads.py -s '../symbols/*.kicad_sym' --fp-lib-table ~/.config/kicad/9.0/fp-lib-table
 
 Options:
-    --symbols PATH      Path to symbol library file(s), comma-separated
+    --symbols PATH      Path to symbol library file(s) or globs, comma-separated
     --footprints PATH   Path to footprint library directory (.pretty folder)
+    --fp-lib-table FILE Resolve footprint nicknames through a KiCad fp-lib-table
+                        instead (repeatable: project table, then global)
     --verbose           Show detailed per-symbol results
     --json              Output results as JSON
+    --format FORMAT     text, json, jsonl or sarif (jsonl/sarif stream results)
+    --all-footprints    Parse every footprint file, not only referenced ones
+    --jobs N            Parse footprint files on N worker processes
+    --benchmark         Report footprint parsing rate in files/sec
+    --no-cache          Re-parse everything, ignoring .verify_cache.db
+    --watch             Re-verify affected symbols whenever a library file changes
+    --geometry          Also check exposed/stacked pads against pin electrical types
+    --parts [CSV]       Also check each parts.csv row's Symbol/Footprint pair
 """
 
 import argparse
+import ctypes
+import ctypes.util
+import csv
+import glob
+import hashlib
 import json
+import os
 import re
+import select
+import sqlite3
+import statistics
+import struct
 import sys
+import time
+from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 from pathlib import Path
-from dataclasses import dataclass, field
-from typing import Optional
+from dataclasses import dataclass, field, replace
+from typing import NamedTuple, Optional
 
+try:
+    import numpy as np
+except ImportError:  # geometry checks fall back to plain Python
+    np = None
 
-@dataclass
+# The shared S-expression module lives with the other library tools
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "database"))
+import kicad_sexpr
+from kicad_sexpr import STRING_RE, list_end, unescape
+
+# Slotted dataclasses keep the per-symbol/footprint records compact, but
+# dataclass(slots=True) needs Python 3.10; on 3.9 they fall back to a __dict__
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_SLOTS)
 class Symbol:
     """Represents a KiCad symbol with its pins and footprint reference."""
     name: str
@@ -32,22 +71,42 @@ class Symbol:
     pin_numbers: set = field(default_factory=set)
     pin_occurrences: dict = field(default_factory=dict)  # pin -> count (for duplicate detection)
     lcsc: str = ""
+    extends: str = ""  # parent symbol name for derived symbols
+    pin_types: dict = field(default_factory=dict)  # pin -> electrical type (power_in, no_connect, ...)
+    line: int = 0  # line of the (symbol ...) in its library file
+    source: str = ""  # library file, as given on the command line
     
     def __repr__(self):
         return f"Symbol({self.name}, {len(self.pin_numbers)} pins → {self.footprint})"
 
 
-@dataclass
+class Pad(NamedTuple):
+    """One footprint pad: number, kind (smd/thru_hole/...), shape and geometry in mm."""
+    number: str
+    kind: str
+    shape: str
+    x: float
+    y: float
+    width: float
+    height: float
+    copper: bool
+    heatsink: bool
+
+
+@dataclass(**_SLOTS)
 class Footprint:
     """Represents a KiCad footprint with its pads."""
     name: str
     pad_numbers: set = field(default_factory=set)
+    pads: list = field(default_factory=list)  # Pad, in file order
+    exposed_pads: set = field(default_factory=set)  # indexes into pads, from analyze_pad_geometry
+    stacked_pads: list = field(default_factory=list)  # index tuples of pads sharing a position
     
     def __repr__(self):
         return f"Footprint({self.name}, {len(self.pad_numbers)} pads)"
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class VerificationResult:
     """Result of comparing a symbol against its footprint."""
     symbol_name: str
@@ -58,6 +117,9 @@ class VerificationResult:
     pads_without_pins: set
     footprint_found: bool = True
     duplicate_pins: dict = field(default_factory=dict)  # pin -> count
+    geometry_issues: list = field(default_factory=list)  # from --geometry
+    source: str = ""  # symbol library file and line, for SARIF locations
+    line: int = 0
     
     @property
     def matches(self) -> bool:
@@ -65,7 +127,7 @@ class VerificationResult:
     
     @property
     def has_warnings(self) -> bool:
-        return bool(self.duplicate_pins)
+        return bool(self.duplicate_pins or self.geometry_issues)
     
     @property
     def status(self) -> str:
@@ -77,116 +139,658 @@ class VerificationResult:
             return "MISMATCH"
 
 
-def parse_symbol_library(filepath: Path) -> list[Symbol]:
-    """Parse a KiCad symbol library file and extract symbols with their pins."""
+@dataclass(**_SLOTS)
+class PartResult:
+    """Result of checking one parts.csv row against the symbol it names."""
+    lcsc: str
+    symbol_ref: str
+    footprint_ref: str
+    source: str  # parts.csv path and row line, for SARIF locations
+    line: int
+    issues: list = field(default_factory=list)
+    result: Optional[VerificationResult] = None  # pin/pad check of the row's pair
+    
+    @property
+    def status(self) -> str:
+        if self.result is None or not self.result.footprint_found:
+            return "UNVERIFIED"
+        elif self.issues or not self.result.matches:
+            return "MISMATCH"
+        else:
+            return "OK"
+
+
+# parts.csv of the database library, for --parts
+PARTS_CSV = Path(__file__).parent.resolve().parent / "database" / "parts.csv"
+
+# Parse cache, next to LCSC.pretty; bump CACHE_VERSION when the cached
+# data changes shape
+CACHE_PATH = Path(__file__).parent.resolve() / ".verify_cache.db"
+CACHE_VERSION = 3
+
+# Pad header: (pad "X" smd rect or (pad X thru_hole circle
+PAD_RE = re.compile(r'\(pad\s+(?:"((?:[^"\\]|\\.)*)"|([^\s()"]+))\s+(\w+)\s+(\w+)')
+AT_RE = re.compile(r'\(at\s+(-?[\d.]+)\s+(-?[\d.]+)')
+SIZE_RE = re.compile(r'\(size\s+([\d.]+)\s+([\d.]+)')
+LAYERS_RE = re.compile(r'\(layers\s+([^()]*)\)')
+XY_RE = re.compile(r'\(xy\s+(-?[\d.]+)\s+(-?[\d.]+)')
+PIN_TYPE_RE = re.compile(r'\(pin\s+(\w+)')
+
+# An SMD pad at least this many times the median pad area, lying inside the
+# other pads' bounding box, is taken to be an exposed (thermal) pad
+EXPOSED_PAD_RATIO = 4.0
+
+# Pads closer than this (mm) count as sharing a position
+POSITION_TOLERANCE = 0.001
+
+# Below this many footprint files, a process pool costs more than it saves
+PARALLEL_THRESHOLD = 64
+
+# Most footprint files handed to one worker task
+CHUNK_SIZE = 256
+
+
+class ParseCache:
+    """On-disk cache of parsed symbol libraries and footprints.
+
+    Entries are keyed by absolute path and are fresh while the file's
+    mtime and size are unchanged. A stale entry whose content hash still
+    matches is reused without re-parsing (a touched or re-checked-out
+    file). The SQLite file is only read on the first lookup, and cached
+    data is only decoded for the files asked for.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries = None  # path -> (mtime_ns, size, digest, data)
+        self.updates = {}
+
+    def _load(self) -> dict:
+        if self.entries is None:
+            try:
+                with closing(sqlite3.connect(self.path)) as conn:
+                    if conn.execute("PRAGMA user_version").fetchone()[0] == CACHE_VERSION:
+                        rows = conn.execute("SELECT path, mtime_ns, size, digest, data FROM files")
+                        self.entries = {row[0]: row[1:] for row in rows}
+            except sqlite3.DatabaseError:
+                pass  # missing table or corrupt file: rebuilt on close()
+            if self.entries is None:
+                self.entries = {}
+        return self.entries
+
+    def get(self, path: Path, st: os.stat_result) -> tuple[Optional[str], Optional[str]]:
+        """Look up a file.
+
+        Returns:
+            (data, None) if the entry is fresh, (None, digest) if it is
+            stale (compare digest with the file's content hash and call
+            refresh() on a match), or (None, None) if there is no entry
+        """
+        entry = self._load().get(str(path))
+        if entry is None:
+            return None, None
+        mtime_ns, size, digest, data = entry
+        if mtime_ns == st.st_mtime_ns and size == st.st_size:
+            return data, None
+        return None, digest
+
+    def refresh(self, path: Path, st: os.stat_result) -> str:
+        """Mark a stale entry with an unchanged hash as fresh and return its data."""
+        _, _, digest, data = self._load()[str(path)]
+        self.put(path, st, digest, data)
+        return data
+
+    def put(self, path: Path, st: os.stat_result, digest: str, data: str):
+        entry = (st.st_mtime_ns, st.st_size, digest, data)
+        self._load()[str(path)] = entry
+        self.updates[str(path)] = entry
+
+    def close(self):
+        """Evict entries for files that no longer exist, then save changes."""
+        if self.entries is None:
+            return
+        missing = [path for path in self.entries if not os.path.exists(path)]
+        if self.updates or missing:
+            try:
+                self._save(missing)
+            except sqlite3.DatabaseError:
+                self.path.unlink(missing_ok=True)
+                self.updates = dict(self.entries)
+                self._save(missing)
+        self.entries = None
+        self.updates = {}
+
+    def _save(self, missing: list[str]):
+        with closing(sqlite3.connect(self.path)) as conn, conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != CACHE_VERSION:
+                conn.execute("DROP TABLE IF EXISTS files")
+                conn.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, digest TEXT, data TEXT)"
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO files (path, mtime_ns, size, digest, data) VALUES (?, ?, ?, ?, ?)",
+                [(path, *entry) for path, entry in self.updates.items()]
+            )
+            conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in missing])
+
+
+def content_digest(data: bytes) -> str:
+    """Content hash used to recognise unchanged files with a new mtime."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def symbols_to_json(symbols: list[Symbol]) -> str:
+    return json.dumps([[s.name, s.footprint, s.lcsc, s.extends, s.pin_occurrences, s.pin_types, s.line]
+                       for s in symbols])
+
+
+def symbols_from_json(data: str) -> list[Symbol]:
     symbols = []
-    content = filepath.read_text(encoding='utf-8')
-    
-    # Match top-level symbols (not sub-symbols like "SymbolName_0_1")
-    # Pattern: (symbol "NAME" at start, where NAME doesn't contain underscore followed by digits
-    symbol_pattern = re.compile(
-        r'\(symbol\s+"([^"]+)"\s*\n'
-        r'(?:.*?\n)*?'  # Non-greedy match of any lines
-        r'(?=\s*\(symbol\s+"[^"]+"|$)',  # Lookahead for next symbol or end
-        re.MULTILINE
-    )
+    for name, footprint, lcsc, extends, occurrences, pin_types, line in json.loads(data):
+        occurrences = {pin_id(pin): count for pin, count in occurrences.items()}
+        pin_types = {pin_id(pin): pin_type for pin, pin_type in pin_types.items()}
+        symbols.append(Symbol(name=name, footprint=footprint, pin_numbers=set(occurrences),
+                              pin_occurrences=occurrences, lcsc=lcsc, extends=extends,
+                              pin_types=pin_types, line=line))
+    return symbols
+
+
+def footprint_to_json(footprint: Footprint) -> str:
+    return json.dumps(footprint.pads)
+
+
+def footprint_from_json(name: str, data: str) -> Footprint:
+    pads = [Pad(pin_id(number), *rest) for number, *rest in json.loads(data)]
+    return Footprint(name=name, pad_numbers={pad.number for pad in pads if pad.number}, pads=pads)
+
+
+# Properties holding the LCSC part number, in order of preference
+LCSC_PROPERTIES = ("LCSC", "LCSC Part")
+
+
+NATURAL_RE = re.compile(r'(\d+)')
+BALL_RE = re.compile(r'([A-Za-z]+)(\d+)')
+
+# Interned pin/pad number -> sort key, filled in by pin_id()/pin_key()
+PIN_KEYS = {}
+
+
+def natural_key(value: str) -> tuple:
+    """Sort key that orders embedded numbers numerically: 2 < 10, A2 < A10."""
+    parts = NATURAL_RE.split(value)
+    parts[1::2] = map(int, parts[1::2])
+    return tuple(parts)
+
+
+def make_pin_key(pin: str) -> tuple:
+    """Sort key for a pin number: plain numbers, then BGA balls, then the rest.
     
-    # Split by top-level symbols more reliably
-    lines = content.split('\n')
-    current_symbol = None
-    current_symbol_content = []
+    BGA balls sort by row, then column, with rows ordered A..Y, AA..AY as
+    on the package: A1, A2, A10, B2, ..., Y20, AA1.
+    """
+    if pin.isdigit():
+        return (0, int(pin))
+    ball = BALL_RE.fullmatch(pin)
+    if ball:
+        row = ball.group(1).upper()
+        return (1, len(row), row, int(ball.group(2)))
+    return (2, natural_key(pin))
+
+
+def pin_id(value: str) -> str:
+    """Intern a pin/pad number, precomputing its sort key once."""
+    pin = sys.intern(value)
+    if pin not in PIN_KEYS:
+        PIN_KEYS[pin] = make_pin_key(pin)
+    return pin
+
+
+def pin_key(pin: str) -> tuple:
+    """Sort key of a pin/pad number (see make_pin_key), computed once per pin."""
+    key = PIN_KEYS.get(pin)
+    if key is None:
+        key = PIN_KEYS[pin_id(pin)]
+    return key
+
+
+def iter_symbols(text: str):
+    """Yield the top-level symbols of .kicad_sym text in a single scan.
+
+    Top-level symbols are recognised by nesting depth rather than by name,
+    so unit sub-symbols ("NAME_0_1") are folded into their parent whatever
+    they are called and any number of symbols may share a line. Pins are
+    collected from every unit. Derived symbols are yielded with extends
+    set and no pins of their own; parse_symbol_library() fills those in.
+
+    Raises:
+        ValueError: if the parentheses are unbalanced
+    """
+    count = text.count
     depth = 0
-    in_symbol = False
+    pos = 0
+    symbol = None
+    property_name = None  # property whose value is the next string
+    lcsc_rank = len(LCSC_PROPERTIES)
+    line, line_pos = 1, 0
+
+    # Only quoted strings are matched: the parentheses between two strings
+    # are structural, so they are counted with str.count and Python code
+    # runs once per string rather than once per token
+    for match in STRING_RE.finditer(text):
+        start = match.start()
+        opens = count('(', pos, start)
+        closes = count(')', pos, start)
+        if closes and symbol is not None and depth - closes <= 1:
+            # The symbol ends if the closes before the next open reach depth 1
+            first_open = text.find('(', pos, start)
+            if depth - count(')', pos, first_open if first_open >= 0 else start) <= 1:
+                yield symbol
+                symbol = None
+        depth += opens - closes
+        if depth < 0:
+            raise ValueError(f"unbalanced ')' before offset {start}")
+        pos = match.end()
+
+        if not opens:
+            if property_name is not None and not closes:
+                value = unescape(match.group(1))
+                if property_name == "Footprint":
+                    symbol.footprint = value
+                elif property_name in LCSC_PROPERTIES:
+                    rank = LCSC_PROPERTIES.index(property_name)
+                    if rank < lcsc_rank:
+                        symbol.lcsc = value
+                        lcsc_rank = rank
+            property_name = None
+            continue  # not the first argument of a list
+
+        # First argument: the list head is the word after the last '('
+        property_name = None
+        head = text[text.rfind('(', 0, start) + 1:start].strip()
+        if depth == 2:
+            if symbol is not None:
+                yield symbol
+                symbol = None
+            if head == "symbol":
+                line += count('\n', line_pos, start)
+                line_pos = start
+                symbol = Symbol(name=unescape(match.group(1)), footprint="", line=line)
+                lcsc_rank = len(LCSC_PROPERTIES)
+        elif symbol is None:
+            continue
+        elif head == "number":
+            pin = pin_id(unescape(match.group(1)))
+            symbol.pin_numbers.add(pin)
+            symbol.pin_occurrences[pin] = symbol.pin_occurrences.get(pin, 0) + 1
+            pin_type = PIN_TYPE_RE.match(text, text.rfind('(pin', 0, start))
+            if pin_type:
+                symbol.pin_types[pin] = pin_type.group(1)
+        elif depth == 3:
+            if head == "property":
+                property_name = unescape(match.group(1))
+            elif head == "extends":
+                symbol.extends = unescape(match.group(1))
+
+    depth += count('(', pos) - count(')', pos)
+    if depth != 0:
+        raise ValueError(f"unbalanced parentheses (depth {depth} at end of file)")
+    if symbol is not None:
+        yield symbol
+
+
+def parse_symbol_library(filepath: Path, cache: Optional[ParseCache] = None) -> list[Symbol]:
+    """Parse a KiCad symbol library file and extract symbols with their pins.
+
+    Derived symbols (extends) take their pins from the parent, and its
+    footprint and LCSC number unless they set their own.
+    """
+    return parse_symbol_libraries([filepath], 1, cache)[0]
+
+
+def scan_symbol_file(path: Path, known_digest: Optional[str]) -> tuple[str, Optional[list[Symbol]]]:
+    """Hash and, if changed, parse one symbol library (runs in worker processes).
+
+    Returns:
+        (digest, symbols), with symbols None where the digest equals
+        known_digest and the cached symbols can be reused
+
+    Raises:
+        ValueError: naming the file, if its parentheses are unbalanced
+    """
+    raw = path.read_bytes()
+    digest = content_digest(raw)
+    if digest == known_digest:
+        return digest, None
+    try:
+        return digest, resolve_derived_symbols(list(iter_symbols(raw.decode('utf-8'))))
+    except ValueError as e:
+        raise ValueError(f"{path}: {e}") from None
+
+
+def parse_symbol_libraries(paths: list[Path], jobs: int = 1,
+                           cache: Optional[ParseCache] = None) -> list[list[Symbol]]:
+    """Parse symbol libraries, one per worker process if there are several.
+
+    Returns:
+        Symbols of each library, in the same order as paths
+    """
+    libraries = [None] * len(paths)
+    pending = []  # (index, path, stat, known_digest)
+    for i, path in enumerate(paths):
+        if cache is None:
+            pending.append((i, path, None, None))
+            continue
+        path = path.resolve()
+        st = path.stat()
+        data, known_digest = cache.get(path, st)
+        if data is not None:
+            libraries[i] = symbols_from_json(data)
+        else:
+            pending.append((i, path, st, known_digest))
+
+    args = ([path for _, path, _, _ in pending], [known for _, _, _, known in pending])
+    if jobs <= 1 or len(pending) < 2:
+        scanned = list(map(scan_symbol_file, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(pending))) as pool:
+            scanned = list(pool.map(scan_symbol_file, *args))
+
+    for (i, path, st, _), (digest, symbols) in zip(pending, scanned):
+        if symbols is None:
+            symbols = symbols_from_json(cache.refresh(path, st))
+        elif cache is not None:
+            cache.put(path, st, digest, symbols_to_json(symbols))
+        libraries[i] = symbols
+    return libraries
+
+
+def resolve_derived_symbols(symbols: list[Symbol]) -> list[Symbol]:
+    """Give derived symbols their parent's pins (and footprint/LCSC if unset)."""
+    by_name = {symbol.name: symbol for symbol in symbols}
+    for symbol in symbols:
+        parent = symbol
+        seen = set()
+        while parent.extends and parent.extends in by_name and parent.name not in seen:
+            seen.add(parent.name)
+            parent = by_name[parent.extends]
+        if parent is symbol:
+            continue
+        symbol.pin_numbers = set(parent.pin_numbers)
+        symbol.pin_occurrences = dict(parent.pin_occurrences)
+        symbol.pin_types = dict(parent.pin_types)
+        symbol.footprint = symbol.footprint or parent.footprint
+        symbol.lcsc = symbol.lcsc or parent.lcsc
+
+    return symbols
+
+
+def parse_footprint_file(filepath: Path) -> Optional[Footprint]:
+    """Parse a single footprint file to extract pad numbers."""
+    return parse_footprint_text(filepath.stem, filepath.read_text(encoding='utf-8'))
+
+
+def parse_footprint_text(name: str, content: str) -> Footprint:
+    """Parse .kicad_mod text to extract pad numbers and pad geometry."""
+    # Use filename (without extension) as the footprint name
+    # This is what KiCad uses for resolution: LCSC:U_smd_LQFP_48P -> U_smd_LQFP_48P.kicad_mod
+    footprint = Footprint(name=name)
     
-    for line in lines:
-        # Track parenthesis depth
-        depth += line.count('(') - line.count(')')
+    for match in PAD_RE.finditer(content):
+        number = match.group(1)
+        number = pin_id(unescape(number) if number is not None else match.group(2))
+        kind, shape = match.group(3), match.group(4)
+        try:
+            body = content[match.end():list_end(content, match.start())]
+        except ValueError:  # truncated file: take the rest
+            body = content[match.end():]
         
-        # Check for new top-level symbol (after the library header)
-        match = re.match(r'\s*\(symbol\s+"([^"]+)"', line)
-        if match:
-            name = match.group(1)
-            # Skip sub-symbols (contain _0_1, _1_1, etc.)
-            if not re.search(r'_\d+_\d+$', name):
-                # Save previous symbol if exists
-                if current_symbol:
-                    symbols.append(parse_symbol_block(current_symbol, current_symbol_content))
-                current_symbol = name
-                current_symbol_content = [line]
-                in_symbol = True
-                continue
+        at = AT_RE.search(body)
+        size = SIZE_RE.search(body)
+        x, y = (float(at.group(1)), float(at.group(2))) if at else (0.0, 0.0)
+        width, height = (float(size.group(1)), float(size.group(2))) if size else (0.0, 0.0)
+        if shape == "custom":
+            # The real outline is the primitives, relative to the anchor
+            points = XY_RE.findall(body)
+            if points:
+                xs = [float(px) for px, _ in points]
+                ys = [float(py) for _, py in points]
+                width = max(width, max(xs) - min(xs))
+                height = max(height, max(ys) - min(ys))
+        layers = LAYERS_RE.search(body)
+        layer_names = layers.group(1).replace('"', '').split() if layers else []
+        copper = kind != "np_thru_hole" and any(layer.endswith(".Cu") for layer in layer_names)
         
-        if in_symbol:
-            current_symbol_content.append(line)
+        footprint.pads.append(Pad(number, kind, shape, x, y, width, height, copper,
+                                  "pad_prop_heatsink" in body))
+        if number:
+            footprint.pad_numbers.add(number)
     
-    # Don't forget the last symbol
-    if current_symbol:
-        symbols.append(parse_symbol_block(current_symbol, current_symbol_content))
-    
-    return symbols
+    return footprint
 
 
-def parse_symbol_block(name: str, lines: list[str]) -> Symbol:
-    """Parse a symbol block to extract footprint and pin numbers."""
-    content = '\n'.join(lines)
-    symbol = Symbol(name=name, footprint="")
-    
-    # Extract footprint property
-    fp_match = re.search(r'\(property\s+"Footprint"\s+"([^"]*)"', content)
-    if fp_match:
-        symbol.footprint = fp_match.group(1)
-    
-    # Extract LCSC property
-    lcsc_match = re.search(r'\(property\s+"(?:LCSC|LCSC Part)"\s+"([^"]*)"', content)
-    if lcsc_match:
-        symbol.lcsc = lcsc_match.group(1)
+def scan_footprint_chunk(items: list[tuple[Path, Optional[str]]]) -> list[tuple[str, Optional[Footprint]]]:
+    """Hash and, if changed, parse a batch of footprint files (runs in worker processes).
+
+    Args:
+        items: (path, known_digest) pairs; known_digest is the content hash
+            of a stale cache entry, or None
+
+    Returns:
+        (digest, footprint) per item, with footprint None where the digest
+        equals known_digest and the cached pads can be reused
+    """
+    results = []
+    for path, known_digest in items:
+        raw = path.read_bytes()
+        digest = content_digest(raw)
+        if digest == known_digest:
+            results.append((digest, None))
+        else:
+            results.append((digest, parse_footprint_text(path.stem, raw.decode('utf-8'))))
+    return results
+
+
+def parse_footprint_files(paths: list[Path], jobs: int = 1,
+                          cache: Optional[ParseCache] = None) -> list[Footprint]:
+    """Parse footprint files, fanning out over a process pool if worthwhile.
+
+    Files with a fresh cache entry are not read at all. The rest are
+    submitted in chunks so each task amortises the pickling and
+    scheduling overhead over many files, and chunk results are merged in
+    submission order.
+
+    Returns:
+        Footprints in the same order as paths
+    """
+    footprints = [None] * len(paths)
+    pending = []  # (index, path, stat, known_digest)
+    for i, path in enumerate(paths):
+        if cache is None:
+            pending.append((i, path, None, None))
+            continue
+        st = path.stat()
+        data, known_digest = cache.get(path, st)
+        if data is not None:
+            footprints[i] = footprint_from_json(path.stem, data)
+        else:
+            pending.append((i, path, st, known_digest))
+
+    items = [(path, known_digest) for _, path, _, known_digest in pending]
+    if jobs <= 1 or len(items) < PARALLEL_THRESHOLD:
+        scanned = scan_footprint_chunk(items)
+    else:
+        chunk_size = max(1, min(CHUNK_SIZE, len(items) // (jobs * 4)))
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        scanned = []
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(scan_footprint_chunk, chunk) for chunk in chunks]
+            for future in futures:
+                scanned.extend(future.result())
+
+    for (i, path, st, _), (digest, footprint) in zip(pending, scanned):
+        if footprint is None:
+            footprint = footprint_from_json(path.stem, cache.refresh(path, st))
+        elif cache is not None:
+            cache.put(path, st, digest, footprint_to_json(footprint))
+        footprints[i] = footprint
+    return footprints
+
+
+def load_footprint_libraries(lib_dirs: list[tuple[str, Path]], jobs: int = 1,
+                             cache: Optional[ParseCache] = None) -> dict[str, dict[str, Footprint]]:
+    """Parse every footprint in a list of (nickname, .pretty directory) pairs.
+
+    All files go through a single parse_footprint_files() call, so one
+    process pool is shared by every library.
+    """
+    paths = []
+    owners = []
+    for lib_name, dirpath in lib_dirs:
+        # Absolute paths, so parse cache keys do not depend on the cwd
+        for fp_file in sorted(dirpath.resolve().glob("*.kicad_mod")):
+            paths.append(fp_file)
+            owners.append(lib_name)
     
-    # Extract all pin numbers and track occurrences
-    # Pattern matches: (number "X" where X is the pin number
-    pin_pattern = re.compile(r'\(number\s+"([^"]+)"')
-    for match in pin_pattern.finditer(content):
-        pin = match.group(1)
-        symbol.pin_numbers.add(pin)
-        symbol.pin_occurrences[pin] = symbol.pin_occurrences.get(pin, 0) + 1
+    footprint_libs = {lib_name: {} for lib_name, _ in lib_dirs}
+    for lib_name, footprint in zip(owners, parse_footprint_files(paths, jobs, cache)):
+        footprint_libs[lib_name][footprint.name] = footprint
+    return footprint_libs
+
+
+def index_footprint_dirs(lib_dirs: dict[str, Path]) -> dict[str, tuple[str, str]]:
+    """Map footprint name -> (nickname, path string), first library wins, without parsing."""
+    index = {}
+    for lib_name, dirpath in lib_dirs.items():
+        with os.scandir(dirpath) as entries:
+            for entry in entries:
+                if entry.name.endswith(".kicad_mod") and entry.is_file():
+                    index.setdefault(entry.name[:-len(".kicad_mod")], (lib_name, entry.path))
+    return index
+
+
+def load_referenced_footprints(refs: set[str], lib_dirs: list[tuple[str, Path]], jobs: int = 1,
+                               cache: Optional[ParseCache] = None,
+                               search: bool = True) -> dict[str, dict[str, Footprint]]:
+    """Parse only the footprints that symbols reference.
+
+    A "LIB:name" reference to a known library maps straight to
+    <dir>/<name>.kicad_mod. Unqualified names, and names in libraries not
+    given on the command line, are looked up in a directory listing of
+    every library (built only if needed), matching the search order of
+    resolve_footprint_reference(). With search=False they are not loaded,
+    as KiCad itself only resolves "LIB:name" through the library table.
+
+    Returns:
+        nickname -> {name: Footprint}, holding only the referenced footprints
+    """
+    dirs = {lib_name: dirpath.resolve() for lib_name, dirpath in lib_dirs}
+    index = None
+    wanted = {}  # path -> nickname
+    for ref in sorted(refs):
+        lib_name, name = ref.split(':', 1) if ':' in ref else ("", ref)
+        if lib_name in dirs:
+            path = dirs[lib_name] / f"{name}.kicad_mod"
+            if path.is_file():
+                wanted[path] = lib_name
+            continue
+        if not search:
+            continue
+        if index is None:
+            index = index_footprint_dirs(dirs)
+        if name in index:
+            lib_name, path = index[name]
+            wanted[Path(path)] = lib_name
     
-    return symbol
+    paths = list(wanted)
+    footprint_libs = {lib_name: {} for lib_name in dirs}
+    for path, footprint in zip(paths, parse_footprint_files(paths, jobs, cache)):
+        footprint_libs[wanted[path]][footprint.name] = footprint
+    return footprint_libs
 
 
-def parse_footprint_library(dirpath: Path) -> dict[str, Footprint]:
+def parse_footprint_library(dirpath: Path, jobs: int = 1) -> dict[str, Footprint]:
     """Parse all footprint files in a .pretty directory."""
-    footprints = {}
-    
     if not dirpath.exists():
         print(f"Warning: Footprint directory not found: {dirpath}", file=sys.stderr)
-        return footprints
-    
-    for fp_file in dirpath.glob("*.kicad_mod"):
-        footprint = parse_footprint_file(fp_file)
-        if footprint:
-            footprints[footprint.name] = footprint
+        return {}
     
-    return footprints
+    return load_footprint_libraries([(dirpath.stem, dirpath)], jobs)[dirpath.stem]
 
 
-def parse_footprint_file(filepath: Path) -> Optional[Footprint]:
-    """Parse a single footprint file to extract pad numbers."""
-    content = filepath.read_text(encoding='utf-8')
-    
-    # Use filename (without extension) as the footprint name
-    # This is what KiCad uses for resolution: LCSC:U_smd_LQFP_48P -> U_smd_LQFP_48P.kicad_mod
-    footprint = Footprint(name=filepath.stem)
+def find_footprint_dirs(fp_dir: Path) -> list[tuple[str, Path]]:
+    """Return (nickname, directory) pairs for a .pretty folder or a folder of them."""
+    if fp_dir.suffix == '.pretty':
+        return [(fp_dir.stem, fp_dir)]
+    subdirs = sorted(fp_dir.glob("*.pretty"))
+    if subdirs:
+        return [(subdir.stem, subdir) for subdir in subdirs]
+    # A plain directory of .kicad_mod files
+    return [(fp_dir.name, fp_dir)]
+
+
+ENV_VAR_RE = re.compile(r'\$\{(\w+)\}|\$\((\w+)\)')
+
+
+def read_fp_lib_table(table_path: Path) -> list[tuple[str, Path]]:
+    """Return (nickname, directory) for the libraries KiCad would load from an fp-lib-table.
+
+    ${VAR} and $(VAR) in URIs expand from the environment, with KIPRJMOD
+    set to the table's directory, and relative URIs are relative to that
+    directory. Disabled rows, non-KiCad formats, unknown variables,
+    missing directories and repeated nicknames are skipped with a warning.
+    """
+    try:
+        table = kicad_sexpr.load(table_path)
+    except ValueError as e:
+        print(f"Error: {table_path}: {e}", file=sys.stderr)
+        sys.exit(1)
+    env = dict(os.environ, KIPRJMOD=str(table_path.parent.resolve()))
     
-    # Extract all pad numbers
-    # Pattern: (pad "X" or (pad X where X is the pad number/name
-    pad_pattern = re.compile(r'\(pad\s+"?([^"\s\)]+)"?')
-    for match in pad_pattern.finditer(content):
-        footprint.pad_numbers.add(match.group(1))
+    def expand(match):
+        name = match.group(1) or match.group(2)
+        if name not in env:
+            raise KeyError(name)
+        return env[name]
     
-    return footprint
+    libs = []
+    seen = set()
+    for entry in table.findall("lib"):
+        fields = {"name": entry.value("name", ""), "type": entry.value("type", "KiCad"),
+                  "uri": entry.value("uri", "")}
+        nickname = fields["name"]
+        if not nickname or entry.find("disabled") is not None:
+            continue
+        if nickname in seen:
+            print(f"Warning: {table_path}: duplicate nickname {nickname}, keeping the first",
+                  file=sys.stderr)
+            continue
+        if fields["type"] != "KiCad":
+            print(f"Warning: {table_path}: {nickname} is a {fields['type']} library, skipping",
+                  file=sys.stderr)
+            continue
+        try:
+            uri = ENV_VAR_RE.sub(expand, fields["uri"])
+        except KeyError as e:
+            print(f"Warning: {table_path}: {nickname} uses undefined variable {e.args[0]}, skipping",
+                  file=sys.stderr)
+            continue
+        dirpath = table_path.parent / uri
+        if not dirpath.is_dir():
+            print(f"Warning: {table_path}: {nickname} directory not found: {dirpath}", file=sys.stderr)
+            continue
+        seen.add(nickname)
+        libs.append((nickname, dirpath))
+    return libs
 
 
-def resolve_footprint_reference(fp_ref: str, footprint_libs: dict[str, dict[str, Footprint]]) -> Optional[Footprint]:
-    """Resolve a footprint reference like 'LCSC:U_smd_LQFP_48P' to actual footprint."""
+def resolve_footprint_reference(fp_ref: str, footprint_libs: dict[str, dict[str, Footprint]],
+                                search: bool = True) -> Optional[Footprint]:
+    """Resolve a footprint reference like 'LCSC:U_smd_LQFP_48P' to actual footprint.
+
+    With search=False only "LIB:name" with a known LIB resolves, as in KiCad.
+    """
     if ':' in fp_ref:
         lib_name, fp_name = fp_ref.split(':', 1)
     else:
@@ -196,7 +800,7 @@ def resolve_footprint_reference(fp_ref: str, footprint_libs: dict[str, dict[str,
     # Search in the appropriate library or all libraries
     if lib_name and lib_name in footprint_libs:
         return footprint_libs[lib_name].get(fp_name)
-    else:
+    elif search:
         # Search all libraries
         for lib in footprint_libs.values():
             if fp_name in lib:
@@ -205,9 +809,142 @@ def resolve_footprint_reference(fp_ref: str, footprint_libs: dict[str, dict[str,
     return None
 
 
-def verify_symbol(symbol: Symbol, footprint_libs: dict[str, dict[str, Footprint]]) -> VerificationResult:
+def analyze_pad_geometry(footprints: list[Footprint]):
+    """Find exposed and stacked pads, filling in exposed_pads/stacked_pads.
+    
+    An exposed (thermal) pad is a heatsink pad, or an SMD copper pad whose
+    area is at least EXPOSED_PAD_RATIO times the footprint's median pad
+    area and whose centre lies inside the bounding box of the other pads.
+    Stacked pads are numbered copper pads with different numbers at the
+    same position. Unnumbered pads and pads inside an exposed pad (thermal
+    vias) are left out. With NumPy every footprint is checked in one
+    batched pass.
+    """
+    footprints = [fp for fp in footprints if fp.pads]
+    if not footprints:
+        return
+    if np is None:
+        for footprint in footprints:
+            analyze_footprint_pads(footprint)
+        return
+    
+    counts = np.array([len(fp.pads) for fp in footprints])
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    owner = np.repeat(np.arange(len(footprints)), counts)
+    pads = [pad for fp in footprints for pad in fp.pads]
+    x, y, width, height = np.array([pad[3:7] for pad in pads]).T
+    area = width * height
+    copper = np.fromiter((pad.copper for pad in pads), bool, len(pads))
+    smd = np.fromiter((pad.kind == "smd" for pad in pads), bool, len(pads))
+    heatsink = np.fromiter((pad.heatsink for pad in pads), bool, len(pads))
+    
+    # Median copper pad area per footprint: sort by (footprint, non-copper
+    # last, area) and pick the middle of each footprint's copper run
+    order = np.lexsort((area, ~copper, owner))
+    copper_counts = np.bincount(owner, weights=copper, minlength=len(footprints)).astype(int)
+    low = starts + np.maximum(copper_counts - 1, 0) // 2
+    high = starts + copper_counts // 2
+    median = (area[order[low]] + area[order[high]]) / 2
+    
+    large = copper & smd & (area >= EXPOSED_PAD_RATIO * median[owner]) & (copper_counts[owner] > 1)
+    others = copper & ~large
+    min_x = np.minimum.reduceat(np.where(others, x, np.inf), starts)
+    max_x = np.maximum.reduceat(np.where(others, x, -np.inf), starts)
+    min_y = np.minimum.reduceat(np.where(others, y, np.inf), starts)
+    max_y = np.maximum.reduceat(np.where(others, y, -np.inf), starts)
+    inside = ((x >= min_x[owner]) & (x <= max_x[owner]) &
+              (y >= min_y[owner]) & (y <= max_y[owner]))
+    exposed = (large & inside) | (heatsink & copper)
+    
+    for i in np.flatnonzero(exposed):
+        footprints[owner[i]].exposed_pads.add(int(i - starts[owner[i]]))
+    
+    # Stacked pads: equal quantized positions sort next to each other
+    numbered = np.fromiter((bool(pad.number) for pad in pads), bool, len(pads))
+    stackable = copper & numbered
+    for i in np.flatnonzero(exposed):
+        first, last = starts[owner[i]], starts[owner[i]] + counts[owner[i]]
+        covered = ((np.abs(x[first:last] - x[i]) <= width[i] / 2) &
+                   (np.abs(y[first:last] - y[i]) <= height[i] / 2) & ~exposed[first:last])
+        stackable[first:last] &= ~covered
+    grid_x = np.round(x / POSITION_TOLERANCE).astype(np.int64)
+    grid_y = np.round(y / POSITION_TOLERANCE).astype(np.int64)
+    candidates = np.flatnonzero(stackable)
+    candidates = candidates[np.lexsort((grid_y[candidates], grid_x[candidates], owner[candidates]))]
+    key = np.stack((owner[candidates], grid_x[candidates], grid_y[candidates]), axis=1)
+    same = np.all(key[1:] == key[:-1], axis=1)
+    run_starts = np.flatnonzero(same & ~np.concatenate(([False], same[:-1])))
+    run_ends = np.flatnonzero(same & ~np.concatenate((same[1:], [False]))) + 2
+    for start, end in zip(run_starts, run_ends):
+        run = candidates[start:end]
+        footprint = footprints[owner[run[0]]]
+        add_stacked_pads(footprint, sorted(int(i - starts[owner[i]]) for i in run))
+
+
+def analyze_footprint_pads(footprint: Footprint):
+    """Pure-Python analyze_pad_geometry for one footprint."""
+    copper = [i for i, pad in enumerate(footprint.pads) if pad.copper]
+    areas = {i: footprint.pads[i].width * footprint.pads[i].height for i in copper}
+    median = statistics.median(areas.values()) if copper else 0.0
+    large = {i for i in copper if len(copper) > 1 and footprint.pads[i].kind == "smd"
+             and areas[i] >= EXPOSED_PAD_RATIO * median}
+    others = [footprint.pads[i] for i in copper if i not in large]
+    for i in large:
+        pad = footprint.pads[i]
+        if (others and min(p.x for p in others) <= pad.x <= max(p.x for p in others)
+                and min(p.y for p in others) <= pad.y <= max(p.y for p in others)):
+            footprint.exposed_pads.add(i)
+    footprint.exposed_pads.update(i for i in copper if footprint.pads[i].heatsink)
+    
+    exposed = [footprint.pads[i] for i in footprint.exposed_pads]
+    positions = {}
+    for i in copper:
+        pad = footprint.pads[i]
+        if not pad.number or (i not in footprint.exposed_pads and any(
+                abs(pad.x - e.x) <= e.width / 2 and abs(pad.y - e.y) <= e.height / 2 for e in exposed)):
+            continue
+        key = (round(pad.x / POSITION_TOLERANCE), round(pad.y / POSITION_TOLERANCE))
+        positions.setdefault(key, []).append(i)
+    for run in sorted(positions.values()):
+        if len(run) > 1:
+            add_stacked_pads(footprint, run)
+
+
+def add_stacked_pads(footprint: Footprint, indexes: list[int]):
+    """Record pads sharing a position, unless they are one pad stacked on itself."""
+    # Pads with the same number at the same spot (an SMD pad over a
+    # through-hole one) are deliberate
+    if len({footprint.pads[i].number for i in indexes}) > 1:
+        footprint.stacked_pads.append(tuple(indexes))
+
+
+def pad_geometry_issues(symbol: Symbol, footprint: Footprint) -> list[str]:
+    """Compare symbol pin types against the analyzed footprint pads."""
+    issues = []
+    for i in sorted(footprint.exposed_pads):
+        pad = footprint.pads[i]
+        if not pad.number:
+            issues.append(f"exposed pad at ({pad.x:g}, {pad.y:g}) has no number")
+        elif pad.number not in symbol.pin_numbers:
+            issues.append(f"exposed pad {pad.number} has no symbol pin")
+        elif symbol.pin_types.get(pad.number) == "no_connect":
+            issues.append(f"no_connect pin {pad.number} is on the exposed pad")
+    
+    for indexes in footprint.stacked_pads:
+        pad = footprint.pads[indexes[0]]
+        numbers = ', '.join(footprint.pads[i].number or '(unnumbered)' for i in indexes)
+        issues.append(f"pads {numbers} share position ({pad.x:g}, {pad.y:g})")
+    
+    copper_numbers = {pad.number for pad in footprint.pads if pad.copper}
+    for pin in sorted(symbol.pin_numbers & footprint.pad_numbers - copper_numbers):
+        issues.append(f"pin {pin} ({symbol.pin_types.get(pin, 'unknown')}) lands only on non-copper pads")
+    return issues
+
+
+def verify_symbol(symbol: Symbol, footprint_libs: dict[str, dict[str, Footprint]],
+                  geometry: bool = False, search: bool = True) -> VerificationResult:
     """Verify a symbol's pins match its footprint's pads."""
-    footprint = resolve_footprint_reference(symbol.footprint, footprint_libs)
+    footprint = resolve_footprint_reference(symbol.footprint, footprint_libs, search)
     
     # Find duplicate pins (expected for power pins like VCC, GND)
     duplicates = {pin: count for pin, count in symbol.pin_occurrences.items() if count > 1}
@@ -221,7 +958,9 @@ def verify_symbol(symbol: Symbol, footprint_libs: dict[str, dict[str, Footprint]
             pins_without_pads=symbol.pin_numbers.copy(),
             pads_without_pins=set(),
             footprint_found=False,
-            duplicate_pins=duplicates
+            duplicate_pins=duplicates,
+            source=symbol.source,
+            line=symbol.line
         )
     
     pins_without_pads = symbol.pin_numbers - footprint.pad_numbers
@@ -235,32 +974,636 @@ def verify_symbol(symbol: Symbol, footprint_libs: dict[str, dict[str, Footprint]
         pins_without_pads=pins_without_pads,
         pads_without_pins=pads_without_pins,
         footprint_found=True,
-        duplicate_pins=duplicates
+        duplicate_pins=duplicates,
+        geometry_issues=pad_geometry_issues(symbol, footprint) if geometry else [],
+        source=symbol.source,
+        line=symbol.line
     )
 
 
 def format_result(result: VerificationResult, verbose: bool = False) -> str:
     """Format a verification result for display."""
     if result.status == "OK":
-        line = f"✓ {result.symbol_name} ({result.symbol_pin_count} pins) → {result.footprint_name}"
+        lines = [f"✓ {result.symbol_name} ({result.symbol_pin_count} pins) → {result.footprint_name}"]
         if result.duplicate_pins and verbose:
-            dups = ', '.join(f"{p}×{c}" for p, c in sorted(result.duplicate_pins.items()))
-            line += f"\n    (repeated pin numbers: {dups})"
-        return line
+            dups = ', '.join(f"{p}×{c}" for p, c in sorted(result.duplicate_pins.items(), key=lambda item: pin_key(item[0])))
+            lines.append(f"    (repeated pin numbers: {dups})")
     elif result.status == "FOOTPRINT_NOT_FOUND":
         return f"? {result.symbol_name} → {result.footprint_name} (footprint not found)"
     else:
         lines = [f"✗ {result.symbol_name} ({result.symbol_pin_count} pins) → {result.footprint_name} ({result.footprint_pad_count} pads)"]
         if result.pins_without_pads:
-            sorted_pins = sorted(result.pins_without_pads, key=lambda x: (not x.isdigit(), int(x) if x.isdigit() else x))
+            sorted_pins = sorted(result.pins_without_pads, key=pin_key)
             lines.append(f"    Pins without matching pads: {', '.join(sorted_pins)}")
         if result.pads_without_pins:
-            sorted_pads = sorted(result.pads_without_pins, key=lambda x: (not x.isdigit(), int(x) if x.isdigit() else x))
+            sorted_pads = sorted(result.pads_without_pins, key=pin_key)
             lines.append(f"    Pads without matching pins: {', '.join(sorted_pads)}")
         if result.duplicate_pins:
-            dups = ', '.join(f"{p}×{c}" for p, c in sorted(result.duplicate_pins.items()))
+            dups = ', '.join(f"{p}×{c}" for p, c in sorted(result.duplicate_pins.items(), key=lambda item: pin_key(item[0])))
             lines.append(f"    (repeated pin numbers: {dups})")
-        return '\n'.join(lines)
+    for issue in result.geometry_issues:
+        lines.append(f"    Geometry: {issue}")
+    return '\n'.join(lines)
+
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+
+# SARIF rule id -> (level, short description)
+SARIF_RULES = {
+    "footprint-not-found": ("error", "Symbol footprint not found in the footprint libraries"),
+    "pin-without-pad": ("error", "Symbol pin has no matching footprint pad"),
+    "pad-without-pin": ("error", "Footprint pad has no matching symbol pin"),
+    "pad-geometry": ("warning", "Footprint pad geometry conflicts with the symbol pins"),
+    "part-mismatch": ("error", "parts.csv row does not match its symbol and footprint"),
+    "part-unverified": ("warning", "parts.csv row could not be verified"),
+}
+
+
+def iter_results(symbols: list[Symbol], footprint_libs: dict[str, dict[str, Footprint]],
+                 geometry: bool = False, search: bool = True):
+    """Yield a VerificationResult per symbol with a footprint, as each is computed."""
+    for symbol in symbols:
+        if not symbol.footprint:
+            continue  # Skip symbols without footprint assigned
+        yield verify_symbol(symbol, footprint_libs, geometry, search)
+
+
+def load_parts(csv_path: Path) -> dict[str, tuple[int, dict]]:
+    """Load parts.csv into LCSC number -> (line, row), keeping the first of duplicates."""
+    parts = {}
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            lcsc = (row.get("LCSC") or "").strip()
+            if not lcsc:
+                continue
+            if lcsc in parts:
+                print(f"Warning: {csv_path.name}:{reader.line_num}: duplicate LCSC number {lcsc}",
+                      file=sys.stderr)
+                continue
+            parts[lcsc] = (reader.line_num, row)
+    return parts
+
+
+def iter_part_results(parts: dict[str, tuple[int, dict]], symbols: list[Symbol],
+                      footprint_libs: dict[str, dict[str, Footprint]], csv_path: Path,
+                      geometry: bool = False, search: bool = True):
+    """Yield a PartResult per parts.csv row, joining it to the symbol it names.
+    
+    Symbols are indexed by "LIB:name" (LIB being the symbol file's name),
+    and each row's Symbol/Footprint pair is verified as KiCad's database
+    library will place it: the symbol with the row's footprint. Rows whose
+    symbol library was not given or whose footprint cannot be found come
+    out UNVERIFIED.
+    """
+    by_ref = {f"{Path(symbol.source).stem}:{symbol.name}": symbol for symbol in symbols}
+    libraries = {Path(symbol.source).stem for symbol in symbols}
+    for lcsc, (line, row) in parts.items():
+        symbol_ref = (row.get("Symbol") or "").strip()
+        footprint_ref = (row.get("Footprint") or "").strip()
+        part = PartResult(lcsc, symbol_ref, footprint_ref, str(csv_path), line)
+        symbol = by_ref.get(symbol_ref)
+        if symbol is None:
+            lib_name = symbol_ref.split(':', 1)[0] if ':' in symbol_ref else ""
+            if lib_name in libraries:
+                part.issues.append(f"symbol {symbol_ref} not found")
+            else:
+                part.issues.append(f"symbol library {lib_name or '(none)'} not loaded")
+            yield part
+            continue
+        if not footprint_ref:
+            part.issues.append("no footprint")
+            yield part
+            continue
+        
+        # Symbols without a Footprint property leave it to the database
+        if symbol.footprint and symbol.footprint != footprint_ref:
+            part.issues.append(f"symbol footprint {symbol.footprint} differs from the database's")
+        if symbol.lcsc and symbol.lcsc != lcsc:
+            part.issues.append(f"symbol LCSC property is {symbol.lcsc}")
+        part.result = verify_symbol(replace(symbol, footprint=footprint_ref), footprint_libs,
+                                    geometry, search)
+        if not part.result.footprint_found:
+            part.issues.append(f"footprint {footprint_ref} not found")
+        yield part
+
+
+def format_part(part: PartResult) -> str:
+    """Format a parts.csv row check for display."""
+    mark = {"OK": "✓", "MISMATCH": "✗", "UNVERIFIED": "?"}[part.status]
+    lines = [f"{mark} {part.lcsc} (line {part.line}): {part.symbol_ref} + {part.footprint_ref}"]
+    lines.extend(f"    {issue}" for issue in part.issues)
+    result = part.result
+    if result is not None and result.footprint_found:
+        if result.pins_without_pads:
+            lines.append(f"    Pins without matching pads: {', '.join(sorted(result.pins_without_pads, key=pin_key))}")
+        if result.pads_without_pins:
+            lines.append(f"    Pads without matching pins: {', '.join(sorted(result.pads_without_pins, key=pin_key))}")
+        lines.extend(f"    Geometry: {issue}" for issue in result.geometry_issues)
+    return '\n'.join(lines)
+
+
+def part_to_json(part: PartResult) -> dict:
+    """JSON-ready dict for one parts.csv row check."""
+    result = part.result
+    return {
+        'part': part.lcsc,
+        'line': part.line,
+        'symbol': part.symbol_ref,
+        'footprint': part.footprint_ref,
+        'status': part.status,
+        'issues': part.issues,
+        'pins_without_pads': sorted(result.pins_without_pads, key=pin_key) if result else [],
+        'pads_without_pins': sorted(result.pads_without_pins, key=pin_key) if result else [],
+        'geometry_issues': result.geometry_issues if result else []
+    }
+
+
+def tally_results(results, counts: dict):
+    """Pass results through, counting them per symbol library into counts."""
+    for result in results:
+        library = counts.setdefault(Path(result.source).name, dict.fromkeys(
+            ("OK", "MISMATCH", "FOOTPRINT_NOT_FOUND", "geometry"), 0))
+        library[result.status] += 1
+        if result.geometry_issues:
+            library["geometry"] += 1
+        yield result
+
+
+def format_library_summary(counts: dict, geometry: bool = False) -> str:
+    """Format the per-library counts collected by tally_results()."""
+    width = max(len(name) for name in counts)
+    lines = ["Per-library summary:"]
+    for name, library in counts.items():
+        line = (f"  {name:<{width}}  {library['OK']} OK, {library['MISMATCH']} mismatches, "
+                f"{library['FOOTPRINT_NOT_FOUND']} footprints not found")
+        if geometry:
+            line += f", {library['geometry']} with geometry issues"
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def result_to_json(result: VerificationResult) -> dict:
+    """JSON-ready dict for one result, with pins in natural order."""
+    return {
+        'library': Path(result.source).name,
+        'symbol': result.symbol_name,
+        'footprint': result.footprint_name,
+        'status': result.status,
+        'symbol_pins': result.symbol_pin_count,
+        'footprint_pads': result.footprint_pad_count,
+        'pins_without_pads': sorted(result.pins_without_pads, key=pin_key),
+        'pads_without_pins': sorted(result.pads_without_pins, key=pin_key),
+        'duplicate_pins': dict(sorted(result.duplicate_pins.items(), key=lambda item: pin_key(item[0]))),
+        'geometry_issues': result.geometry_issues
+    }
+
+
+def sarif_results(result: VerificationResult) -> list[dict]:
+    """SARIF result objects for one verification result (none if it is clean)."""
+    findings = []
+    if not result.footprint_found:
+        findings.append(("footprint-not-found", f"footprint {result.footprint_name} not found"))
+    else:
+        if result.pins_without_pads:
+            pins = ', '.join(sorted(result.pins_without_pads, key=pin_key))
+            findings.append(("pin-without-pad", f"pins without pads on {result.footprint_name}: {pins}"))
+        if result.pads_without_pins:
+            pads = ', '.join(sorted(result.pads_without_pins, key=pin_key))
+            findings.append(("pad-without-pin", f"pads of {result.footprint_name} without pins: {pads}"))
+        findings.extend(("pad-geometry", issue) for issue in result.geometry_issues)
+    return sarif_findings(findings, result.symbol_name, result.source, result.line)
+
+
+def part_sarif_results(part: PartResult) -> list[dict]:
+    """SARIF result objects for one parts.csv row check (none if it is clean)."""
+    if part.status == "OK":
+        return []
+    details = format_part(part).split('\n')[1:]
+    text = f"{part.symbol_ref} + {part.footprint_ref}: {'; '.join(d.strip() for d in details)}"
+    rule = "part-unverified" if part.status == "UNVERIFIED" else "part-mismatch"
+    return sarif_findings([(rule, text)], part.lcsc, part.source, part.line)
+
+
+def sarif_findings(findings: list[tuple[str, str]], name: str, source: str, line: int) -> list[dict]:
+    """SARIF result objects for (rule, message) pairs about one named item in a file."""
+    # Relative to the working directory (the checkout, in CI) where possible
+    path = Path(source).resolve()
+    try:
+        uri = path.relative_to(Path.cwd()).as_posix()
+    except ValueError:
+        uri = path.as_uri()
+    location = {
+        "physicalLocation": {
+            "artifactLocation": {"uri": uri},
+            "region": {"startLine": max(line, 1)},
+        },
+        "logicalLocations": [{"name": name, "kind": "object"}],
+    }
+    return [{
+        "ruleId": rule,
+        "level": SARIF_RULES[rule][0],
+        "message": {"text": f"{name}: {text}"},
+        "locations": [location],
+    } for rule, text in findings]
+
+
+class SarifWriter:
+    """Stream results as a SARIF 2.1.0 log, flushing as each one is written."""
+    
+    def __init__(self, out):
+        self.out = out
+        self.count = 0
+        driver = {
+            "name": "verify_pins_to_pads",
+            "informationUri": "https://github.com/goodbetterbestco/Kicad-LCSC",
+            "rules": [{"id": rule, "shortDescription": {"text": text},
+                       "defaultConfiguration": {"level": level}}
+                      for rule, (level, text) in SARIF_RULES.items()],
+        }
+        out.write(f'{{"$schema": "{SARIF_SCHEMA}", "version": "2.1.0", "runs": [{{'
+                  f'"tool": {{"driver": {json.dumps(driver)}}}, "results": [')
+    
+    def write(self, findings: list[dict]):
+        for finding in findings:
+            self.out.write((",\n" if self.count else "\n") + json.dumps(finding))
+            self.count += 1
+        self.out.flush()
+    
+    def close(self):
+        self.out.write("\n]}]}\n")
+        self.out.flush()
+
+
+# inotify event bits (linux/inotify.h)
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+INOTIFY_EVENT = struct.Struct("iIII")
+
+# Editors save in bursts (temp file, rename, touch); wait this long for quiet
+DEBOUNCE_SECONDS = 0.05
+
+
+def inotify_changes(watched: dict[Path, set[str]]):
+    """Watch directories with Linux inotify.
+
+    Args:
+        watched: directory -> file names of interest in it (an empty set
+            means every .kicad_mod file)
+
+    Returns:
+        Generator yielding sets of changed file paths, or None if events
+        were lost and everything must be rescanned
+
+    Raises:
+        OSError: if inotify is unavailable
+    """
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    fd = libc.inotify_init1(os.O_CLOEXEC)
+    if fd < 0:
+        raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+    wds = {}
+    for dirpath in watched:
+        wd = libc.inotify_add_watch(fd, os.fsencode(dirpath), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(errno, f"cannot watch {dirpath}")
+        wds[wd] = dirpath
+    return read_inotify(fd, wds, watched)
+
+
+def read_inotify(fd: int, wds: dict[int, Path], watched: dict[Path, set[str]]):
+    """Generator half of inotify_changes(): read, filter and debounce events."""
+    try:
+        while True:
+            select.select([fd], [], [])
+            changed = set()
+            overflow = False
+            while select.select([fd], [], [], DEBOUNCE_SECONDS)[0]:
+                buf = os.read(fd, 65536)
+                offset = 0
+                while offset < len(buf):
+                    wd, mask, _, length = INOTIFY_EVENT.unpack_from(buf, offset)
+                    offset += INOTIFY_EVENT.size
+                    name = buf[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+                    offset += length
+                    if mask & IN_Q_OVERFLOW:
+                        overflow = True
+                    elif wd in wds:
+                        names = watched[wds[wd]]
+                        if name in names or (not names and name.endswith(".kicad_mod")):
+                            changed.add(wds[wd] / name)
+            if overflow:
+                yield None
+            elif changed:
+                yield changed
+    finally:
+        os.close(fd)
+
+
+def poll_changes(watched: dict[Path, set[str]], interval: float):
+    """Yield sets of changed paths by comparing mtime/size snapshots.
+
+    Portable fallback for inotify_changes(), with the same arguments and
+    results.
+    """
+    def snapshot():
+        state = {}
+        for dirpath, names in watched.items():
+            try:
+                with os.scandir(dirpath) as entries:
+                    for entry in entries:
+                        if entry.name in names or (not names and entry.name.endswith(".kicad_mod")):
+                            st = entry.stat()
+                            state[dirpath / entry.name] = (st.st_mtime_ns, st.st_size)
+            except FileNotFoundError:
+                pass
+        return state
+
+    previous = snapshot()
+    while True:
+        time.sleep(interval)
+        current = snapshot()
+        changed = {path for path in previous.keys() | current.keys()
+                   if previous.get(path) != current.get(path)}
+        previous = current
+        if changed:
+            yield changed
+
+
+class WatchSession:
+    """In-memory symbol/footprint index that re-verifies only what changed.
+
+    A reverse dependency index maps each footprint name to the symbols
+    referencing it (by "LIB:name" or bare name), so a changed .kicad_mod
+    only re-verifies those symbols and a changed .kicad_sym only its own.
+    With search=False footprint references resolve as in KiCad, matching a
+    batch run with --fp-lib-table.
+    """
+
+    def __init__(self, symbol_files: list[Path], lib_dirs: list[tuple[str, Path]],
+                 all_footprints: bool, cache: Optional[ParseCache], search: bool = True):
+        self.symbol_files = [path.resolve() for path in symbol_files]
+        self.lib_dirs = [(lib_name, dirpath.resolve()) for lib_name, dirpath in lib_dirs]
+        self.dir_libs = {dirpath: lib_name for lib_name, dirpath in self.lib_dirs}
+        self.all_footprints = all_footprints
+        self.cache = cache
+        self.search = search
+        self.symbols = {}        # symbol file -> {name: Symbol}
+        self.footprint_libs = {}
+        self.results = {}        # (symbol file, name) -> VerificationResult
+        self.dependents = {}     # footprint name -> {(symbol file, name)}
+
+    def watched(self) -> dict[Path, set[str]]:
+        """Directories to watch -> file names of interest (empty: all .kicad_mod)."""
+        watched = {dirpath: set() for _, dirpath in self.lib_dirs}
+        for path in self.symbol_files:
+            watched.setdefault(path.parent, set()).add(path.name)
+        return watched
+
+    def load(self):
+        """Parse everything and verify every symbol.
+
+        Returns:
+            Changed (old, new) result pairs, as verify()
+        """
+        self.symbols = {}
+        for path in self.symbol_files:
+            self.symbols[path] = {sym.name: sym for sym in parse_symbol_library(path, self.cache)}
+        if self.all_footprints:
+            self.footprint_libs = load_footprint_libraries(self.lib_dirs, 1, self.cache)
+        else:
+            refs = {sym.footprint for syms in self.symbols.values() for sym in syms.values() if sym.footprint}
+            self.footprint_libs = load_referenced_footprints(refs, self.lib_dirs, 1, self.cache,
+                                                             search=self.search)
+        self.dependents = {}
+        for path in self.symbol_files:
+            self._index_symbols(path)
+        return self.verify(set(self.results) | {(path, name) for path, syms in self.symbols.items()
+                                                for name in syms})
+
+    def _index_symbols(self, path: Path):
+        for name, sym in self.symbols[path].items():
+            if sym.footprint:
+                fp_name = sym.footprint.split(':', 1)[-1]
+                self.dependents.setdefault(fp_name, set()).add((path, name))
+
+    def verify(self, keys) -> list[tuple[Optional[VerificationResult], Optional[VerificationResult]]]:
+        """Re-verify the given (symbol file, name) keys.
+
+        Returns:
+            (old, new) result pairs whose outcome changed; old is None for
+            a new symbol and new is None for a removed one
+        """
+        changes = []
+        for key in keys:
+            path, name = key
+            sym = self.symbols.get(path, {}).get(name)
+            old = self.results.pop(key, None)
+            new = verify_symbol(sym, self.footprint_libs, search=self.search) if sym and sym.footprint else None
+            if new is not None:
+                self.results[key] = new
+            if result_signature(old) != result_signature(new):
+                changes.append((old, new))
+        return changes
+
+    def apply(self, changed: Optional[set[Path]]):
+        """Update the index for changed files and re-verify affected symbols.
+
+        Returns:
+            Changed (old, new) result pairs, as verify()
+        """
+        if changed is None:
+            return self.load()
+
+        affected = set()
+        for path in sorted(changed):
+            if path in self.symbols:
+                affected |= self._update_symbol_file(path)
+            elif path.parent in self.dir_libs:
+                affected |= self._update_footprint(path)
+        return self.verify(affected)
+
+    def _update_symbol_file(self, path: Path) -> set:
+        old_keys = {(path, name) for name in self.symbols[path]}
+        for keys in self.dependents.values():
+            keys -= old_keys
+        try:
+            self.symbols[path] = {sym.name: sym for sym in parse_symbol_library(path, self.cache)}
+        except (OSError, ValueError) as e:
+            # Mid-save or broken file: keep the old results until it parses
+            print(f"Warning: {e}", file=sys.stderr)
+            self._index_symbols(path)
+            return set()
+        self._index_symbols(path)
+
+        # Load footprints the edited symbols now reference for the first time
+        refs = {sym.footprint for sym in self.symbols[path].values()
+                if sym.footprint
+                and resolve_footprint_reference(sym.footprint, self.footprint_libs, self.search) is None}
+        if refs:
+            loaded = load_referenced_footprints(refs, self.lib_dirs, 1, self.cache, search=self.search)
+            for lib_name, footprints in loaded.items():
+                self.footprint_libs.setdefault(lib_name, {}).update(footprints)
+        return old_keys | {(path, name) for name in self.symbols[path]}
+
+    def _update_footprint(self, path: Path) -> set:
+        lib_name = self.dir_libs[path.parent]
+        dependents = self.dependents.get(path.stem, set())
+        if not dependents and not self.all_footprints:
+            return set()
+        footprints = self.footprint_libs.setdefault(lib_name, {})
+        if path.exists():
+            try:
+                footprints[path.stem] = parse_footprint_files([path], 1, self.cache)[0]
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"Warning: {path.name}: {e}", file=sys.stderr)
+                return set()
+        else:
+            footprints.pop(path.stem, None)
+        return set(dependents)
+
+
+def result_signature(result: Optional[VerificationResult]):
+    """What a result looks like to the user, for spotting changes."""
+    if result is None:
+        return None
+    return (result.status, result.footprint_name, frozenset(result.pins_without_pads),
+            frozenset(result.pads_without_pins), tuple(sorted(result.duplicate_pins.items())))
+
+
+def format_change(old: Optional[VerificationResult], new: Optional[VerificationResult]) -> str:
+    """Format one watch-mode result change."""
+    if new is None:
+        return f"- {old.symbol_name} (removed, was {old.status})"
+    before = old.status if old is not None else "new"
+    return f"[{before} → {new.status}] " + format_result(new, verbose=True)
+
+
+def watch(session: WatchSession, interval: float):
+    """Verify once, then re-verify on every change until interrupted."""
+    initial = session.load()
+    counts = {}
+    for result in session.results.values():
+        counts[result.status] = counts.get(result.status, 0) + 1
+    for _, new in sorted(initial, key=lambda c: c[1].symbol_name):
+        if new.status != "OK":
+            print(format_result(new))
+    print(f"Watching {len(session.symbol_files)} symbol libraries and "
+          f"{len(session.lib_dirs)} footprint libraries "
+          f"({', '.join(f'{n} {status}' for status, n in sorted(counts.items()))})")
+    sys.stdout.flush()
+
+    watched = session.watched()
+    changes = None
+    if sys.platform.startswith("linux"):
+        try:
+            changes = inotify_changes(watched)
+        except OSError as e:
+            print(f"Warning: inotify unavailable ({e}), polling every {interval}s", file=sys.stderr)
+    if changes is None:
+        changes = poll_changes(watched, interval)
+
+    try:
+        for changed in changes:
+            start = time.perf_counter()
+            results = session.apply(changed)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            stamp = datetime.now().strftime("%H:%M:%S")
+            names = ", ".join(sorted(p.name for p in changed)) if changed else "rescan"
+            print(f"\n[{stamp}] {names}: {len(results)} changed results in {elapsed_ms:.1f} ms")
+            for old, new in sorted(results, key=lambda c: (c[1] or c[0]).symbol_name):
+                print(format_change(old, new))
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+
+
+def library_paths(args) -> tuple[list[Path], list[tuple[str, Path]]]:
+    """Return the symbol files and (nickname, directory) footprint libraries from the command line."""
+    symbol_files = []
+    for pattern in (p.strip() for p in args.symbols.split(',')):
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern))
+            if not matches:
+                print(f"Error: No symbol files match: {pattern}", file=sys.stderr)
+                sys.exit(1)
+            symbol_files.extend(Path(match) for match in matches)
+        else:
+            symbol_files.append(Path(pattern))
+    for sym_file in symbol_files:
+        if not sym_file.exists():
+            print(f"Error: Symbol file not found: {sym_file}", file=sys.stderr)
+            sys.exit(1)
+    
+    lib_dirs = []
+    if args.fp_lib_table:
+        # Earlier tables take precedence, like a project table over the global one
+        for table_path in args.fp_lib_table:
+            if not table_path.exists():
+                print(f"Error: Footprint library table not found: {table_path}", file=sys.stderr)
+                sys.exit(1)
+            known = {lib_name for lib_name, _ in lib_dirs}
+            lib_dirs.extend(lib for lib in read_fp_lib_table(table_path) if lib[0] not in known)
+        return symbol_files, lib_dirs
+    
+    footprint_dirs = [Path(p.strip()) for p in args.footprints.split(',')]
+    for fp_dir in footprint_dirs:
+        if not fp_dir.exists():
+            print(f"Error: Footprint directory not found: {fp_dir}", file=sys.stderr)
+            sys.exit(1)
+        lib_dirs.extend(find_footprint_dirs(fp_dir))
+    return symbol_files, lib_dirs
+
+
+def load_libraries(args, cache: Optional[ParseCache],
+                   extra_refs: set = frozenset()) -> tuple[list[Symbol], dict[str, dict[str, Footprint]]]:
+    """Parse the symbol and footprint libraries named on the command line.
+
+    Footprints named in extra_refs (the parts.csv Footprint column) are
+    loaded along with those the symbols reference.
+    """
+    symbol_files, lib_dirs = library_paths(args)
+    
+    # Parse symbol libraries, concurrently when there are several
+    try:
+        libraries = parse_symbol_libraries(symbol_files, args.jobs, cache)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    all_symbols = []
+    for sym_file, symbols in zip(symbol_files, libraries):
+        for symbol in symbols:
+            symbol.source = str(sym_file)
+        print(f"Loaded {len(symbols)} symbols from {sym_file.name}", file=sys.stderr)
+        all_symbols.extend(symbols)
+    
+    # Parse footprint libraries
+    start = time.perf_counter()
+    if args.all_footprints:
+        footprint_libs = load_footprint_libraries(lib_dirs, args.jobs, cache)
+        loaded = "footprints"
+    else:
+        refs = {symbol.footprint for symbol in all_symbols if symbol.footprint} | set(extra_refs)
+        footprint_libs = load_referenced_footprints(refs, lib_dirs, args.jobs, cache,
+                                                    search=not args.fp_lib_table)
+        loaded = "referenced footprints"
+    elapsed = time.perf_counter() - start
+    for lib_name in dict(lib_dirs):
+        print(f"Loaded {len(footprint_libs[lib_name])} {loaded} from {lib_name}", file=sys.stderr)
+    if args.benchmark:
+        file_count = sum(len(lib) for lib in footprint_libs.values())
+        rate = file_count / elapsed if elapsed > 0 else 0
+        print(f"Parsed {file_count} footprint files in {elapsed:.3f}s "
+              f"({rate:,.0f} files/sec, {args.jobs} jobs)", file=sys.stderr)
+    
+    return all_symbols, footprint_libs
 
 
 def main():
@@ -270,13 +1613,20 @@ def main():
     parser.add_argument(
         '--symbols', '-s',
         required=True,
-        help='Path to symbol library file(s), comma-separated'
+        help='Path to symbol library file(s) or glob(s), comma-separated'
     )
-    parser.add_argument(
+    footprints = parser.add_mutually_exclusive_group(required=True)
+    footprints.add_argument(
         '--footprints', '-f',
-        required=True,
         help='Path to footprint library directory (.pretty folder)'
     )
+    footprints.add_argument(
+        '--fp-lib-table',
+        type=Path,
+        action='append',
+        help='KiCad fp-lib-table to resolve footprint nicknames with; repeat to fall back '
+             'from a project table to the global one'
+    )
     parser.add_argument(
         '--verbose', '-v',
         action='store_true',
@@ -285,70 +1635,148 @@ def main():
     parser.add_argument(
         '--json',
         action='store_true',
-        help='Output results as JSON'
+        help='Output results as JSON (same as --format json)'
+    )
+    parser.add_argument(
+        '--format',
+        choices=('text', 'json', 'jsonl', 'sarif'),
+        default='text',
+        help='Output format; jsonl and sarif stream each result as it is verified (default: text)'
+    )
+    parser.add_argument(
+        '--all-footprints',
+        action='store_true',
+        help='Parse every footprint, not only those the symbols reference'
+    )
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='Worker processes for parsing footprint files (default: CPU count)'
+    )
+    parser.add_argument(
+        '--benchmark',
+        action='store_true',
+        help='Report footprint parsing time and files/sec'
+    )
+    parser.add_argument(
+        '--cache',
+        type=Path,
+        default=CACHE_PATH,
+        help=f'Parse cache file (default: {CACHE_PATH.name} next to this script)'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Ignore and do not update the parse cache'
+    )
+    parser.add_argument(
+        '--parts',
+        type=Path,
+        nargs='?',
+        const=PARTS_CSV,
+        help='Also check every parts.csv row against the symbol and footprint it names '
+             '(default: ../database/parts.csv)'
+    )
+    parser.add_argument(
+        '--geometry',
+        action='store_true',
+        help='Also check pad geometry: exposed pads, stacked pads and pin types'
+    )
+    
+    parser.add_argument(
+        '--watch', '-w',
+        action='store_true',
+        help='Keep running and re-verify affected symbols whenever a library file changes'
+    )
+    parser.add_argument(
+        '--interval',
+        type=float,
+        default=0.5,
+        help='Seconds between checks when --watch has to poll (default: 0.5)'
     )
     
     args = parser.parse_args()
+    if args.json:
+        args.format = 'json'
+    if args.watch and args.format != 'text':
+        parser.error("--watch only supports text output")
+    if args.watch and (args.geometry or args.parts):
+        parser.error("--watch cannot be combined with --geometry or --parts")
     
-    # Parse symbol libraries
-    symbol_files = [Path(p.strip()) for p in args.symbols.split(',')]
-    all_symbols = []
-    for sym_file in symbol_files:
-        if not sym_file.exists():
-            print(f"Error: Symbol file not found: {sym_file}", file=sys.stderr)
+    cache = None if args.no_cache else ParseCache(args.cache)
+    if args.watch:
+        symbol_files, lib_dirs = library_paths(args)
+        try:
+            session = WatchSession(symbol_files, lib_dirs, args.all_footprints, cache,
+                                   search=not args.fp_lib_table)
+            watch(session, args.interval)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
             sys.exit(1)
-        symbols = parse_symbol_library(sym_file)
-        print(f"Loaded {len(symbols)} symbols from {sym_file.name}", file=sys.stderr)
-        all_symbols.extend(symbols)
+        finally:
+            if cache is not None:
+                cache.close()
+        return
     
-    # Parse footprint libraries
-    footprint_dirs = [Path(p.strip()) for p in args.footprints.split(',')]
-    footprint_libs = {}
-    for fp_dir in footprint_dirs:
-        if not fp_dir.exists():
-            print(f"Error: Footprint directory not found: {fp_dir}", file=sys.stderr)
+    parts = {}
+    if args.parts:
+        if not args.parts.exists():
+            print(f"Error: Parts file not found: {args.parts}", file=sys.stderr)
             sys.exit(1)
-        # Use directory name (minus .pretty) as library name
-        lib_name = fp_dir.stem.replace('.pretty', '')
-        if fp_dir.suffix == '.pretty':
-            lib_name = fp_dir.stem
-        else:
-            # If it's a parent dir, look for .pretty subdirs
-            for subdir in fp_dir.glob("*.pretty"):
-                lib_name = subdir.stem
-                footprint_libs[lib_name] = parse_footprint_library(subdir)
-                print(f"Loaded {len(footprint_libs[lib_name])} footprints from {subdir.name}", file=sys.stderr)
-            if not footprint_libs:
-                footprint_libs[lib_name] = parse_footprint_library(fp_dir)
-                print(f"Loaded {len(footprint_libs.get(lib_name, {}))} footprints from {fp_dir.name}", file=sys.stderr)
-            continue
-        footprint_libs[lib_name] = parse_footprint_library(fp_dir)
-        print(f"Loaded {len(footprint_libs[lib_name])} footprints from {fp_dir.name}", file=sys.stderr)
+        parts = load_parts(args.parts)
+        print(f"Loaded {len(parts)} parts from {args.parts.name}", file=sys.stderr)
     
-    # Verify all symbols
-    results = []
-    for symbol in all_symbols:
-        if not symbol.footprint:
-            continue  # Skip symbols without footprint assigned
-        result = verify_symbol(symbol, footprint_libs)
-        results.append(result)
+    try:
+        refs = {row.get("Footprint") or "" for _, row in parts.values()} - {""}
+        all_symbols, footprint_libs = load_libraries(args, cache, refs)
+    finally:
+        if cache is not None:
+            cache.close()
+    
+    if args.geometry:
+        analyze_pad_geometry([fp for lib in footprint_libs.values() for fp in lib.values()])
+    
+    counts = {}  # symbol library -> status counts
+    search = not args.fp_lib_table
+    results = tally_results(iter_results(all_symbols, footprint_libs, args.geometry, search), counts)
+    part_results = iter_part_results(parts, all_symbols, footprint_libs, args.parts,
+                                     args.geometry, search)
     
     # Output results
-    if args.json:
-        json_results = []
+    if args.format in ('jsonl', 'sarif'):
+        sarif = SarifWriter(sys.stdout) if args.format == 'sarif' else None
+        failed = False
         for r in results:
-            json_results.append({
-                'symbol': r.symbol_name,
-                'footprint': r.footprint_name,
-                'status': r.status,
-                'symbol_pins': r.symbol_pin_count,
-                'footprint_pads': r.footprint_pad_count,
-                'pins_without_pads': sorted(r.pins_without_pads),
-                'pads_without_pins': sorted(r.pads_without_pins),
-                'duplicate_pins': dict(sorted(r.duplicate_pins.items()))
-            })
-        print(json.dumps(json_results, indent=2))
+            if sarif is not None:
+                sarif.write(sarif_results(r))
+            else:
+                sys.stdout.write(json.dumps(result_to_json(r)) + '\n')
+                sys.stdout.flush()
+            failed = failed or r.status == "MISMATCH" or bool(r.geometry_issues)
+        for part in part_results:
+            if sarif is not None:
+                sarif.write(part_sarif_results(part))
+            else:
+                sys.stdout.write(json.dumps(part_to_json(part)) + '\n')
+                sys.stdout.flush()
+            failed = failed or part.status != "OK"
+        if sarif is not None:
+            sarif.close()
+        if len(counts) > 1:
+            print(format_library_summary(counts, args.geometry), file=sys.stderr)
+        
+        # Exit with error code if mismatches found, as in text output
+        if failed:
+            sys.exit(1)
+    elif args.format == 'json':
+        records = [result_to_json(r) for r in results] + [part_to_json(p) for p in part_results]
+        print(json.dumps(records, indent=2))
+        if len(counts) > 1:
+            print(format_library_summary(counts, args.geometry), file=sys.stderr)
     else:
+        results = list(results)
+        part_results = list(part_results)
         ok_count = sum(1 for r in results if r.status == "OK")
         mismatch_count = sum(1 for r in results if r.status == "MISMATCH")
         not_found_count = sum(1 for r in results if r.status == "FOOTPRINT_NOT_FOUND")
@@ -373,6 +1801,22 @@ def main():
                 print(format_result(r, args.verbose))
                 print()
         
+        # Show geometry issues of otherwise matching symbols
+        geometry = [r for r in results if r.status == "OK" and r.geometry_issues]
+        if geometry:
+            print("GEOMETRY ISSUES:\n")
+            for r in geometry:
+                print(format_result(r, args.verbose))
+                print()
+        
+        # Show parts.csv rows that do not check out
+        bad_parts = [p for p in part_results if p.status != "OK"]
+        if bad_parts:
+            print("PARTS DATABASE:\n")
+            for part in bad_parts:
+                print(format_part(part))
+                print()
+        
         # Show OK if verbose
         if args.verbose:
             ok_results = [r for r in results if r.status == "OK"]
@@ -383,11 +1827,22 @@ def main():
         
         # Summary
         print(f"\n{'='*60}")
-        print(f"Summary: {ok_count} OK, {mismatch_count} mismatches, {not_found_count} footprints not found")
+        if len(counts) > 1:
+            print(format_library_summary(counts, args.geometry))
+            print()
+        summary = f"Summary: {ok_count} OK, {mismatch_count} mismatches, {not_found_count} footprints not found"
+        if args.geometry:
+            summary += f", {sum(1 for r in results if r.geometry_issues)} with geometry issues"
+        print(summary)
+        if args.parts:
+            part_counts = {status: sum(1 for p in part_results if p.status == status)
+                           for status in ("OK", "MISMATCH", "UNVERIFIED")}
+            print(f"Parts: {part_counts['OK']} OK, {part_counts['MISMATCH']} mismatches, "
+                  f"{part_counts['UNVERIFIED']} unverified")
         print(f"{'='*60}")
         
-        # Exit with error code if mismatches found
-        if mismatch_count > 0:
+        # Exit with error code if mismatches (or, with --geometry, geometry issues) found
+        if mismatch_count > 0 or geometry or bad_parts:
             sys.exit(1)
 
 